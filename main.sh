@@ -1,7 +1,4 @@
 #!/bin/bash
 
-# Activate virtual environment and run main.py
-.venv/bin/python src/main.py
-
-# Start web server in public directory
-cd public && python3 -m http.server 8888
+# Build the site, serve docs/ and rebuild with live reload on every change
+.venv/bin/python src/main.py serve --watch --port 8888
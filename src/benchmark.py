@@ -0,0 +1,534 @@
+"""Benchmark the markdown-to-HTML pipeline on synthetic corpora.
+
+Usage:
+    python src/benchmark.py --pages 1000 10000 --mix links --output bench.json
+    python src/benchmark.py --pages 1000 --compare bench.json
+    python src/benchmark.py --pages 10000 --memory
+    python src/benchmark.py --patterns
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from block_markdown import (
+    BlockType,
+    block_to_block_type,
+    block_to_html_node,
+    clear_inline_cache,
+    inline_cache_info,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    set_inline_cache_size,
+)
+from inline_markdown import (
+    INLINE_PARSERS,
+    get_inline_parser,
+    set_inline_parser,
+    text_to_textnodes,
+)
+from inline_patterns import IMAGE_PATTERN, LINK_PATTERN, token_pattern
+from parentnode import ParentNode
+from template import CompiledTemplate
+
+STAGES = (
+    "markdown_to_blocks",
+    "block_to_block_type",
+    "text_to_textnodes",
+    "block_to_html_node",
+    "to_html",
+    "template_fill",
+    "file_write",
+)
+
+# Relative weights of each block kind per corpus mix
+MIXES = {
+    "mixed": {"paragraph": 4, "links": 2, "list": 2, "code": 1, "quote": 1, "heading": 1},
+    "links": {"paragraph": 1, "links": 8, "list": 1, "code": 0, "quote": 0, "heading": 1},
+    "lists": {"paragraph": 1, "links": 1, "list": 8, "code": 0, "quote": 0, "heading": 1},
+    "code": {"paragraph": 2, "links": 0, "list": 0, "code": 8, "quote": 0, "heading": 1},
+}
+
+WORDS = (
+    "elves hobbits ring mountain river forest shadow valley song tower road "
+    "wizard dwarf king sword star lantern bridge harbor ship"
+).split()
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>"""
+
+BATCH_SIZE = 500
+
+
+def _words(rnd, count):
+    return " ".join(rnd.choice(WORDS) for _ in range(count))
+
+
+def _inline(rnd):
+    choice = rnd.randrange(6)
+    if choice == 0:
+        return f"**{_words(rnd, 2)}**"
+    if choice == 1:
+        return f"_{_words(rnd, 2)}_"
+    if choice == 2:
+        return f"`{rnd.choice(WORDS)}()`"
+    if choice == 3:
+        return f"[{_words(rnd, 2)}](/{rnd.choice(WORDS)}/{rnd.randrange(1000)})"
+    return _words(rnd, rnd.randint(3, 8))
+
+
+def _block(rnd, kind):
+    if kind == "heading":
+        return "#" * rnd.randint(2, 4) + " " + _words(rnd, 3)
+    if kind == "paragraph":
+        lines = [
+            " ".join(_inline(rnd) for _ in range(rnd.randint(2, 5)))
+            for _ in range(rnd.randint(1, 4))
+        ]
+        return "\n".join(lines)
+    if kind == "links":
+        return " ".join(
+            f"[{_words(rnd, 2)}](https://example.com/{rnd.choice(WORDS)}/{i}) "
+            f"![{rnd.choice(WORDS)}](/images/{rnd.choice(WORDS)}.png)"
+            for i in range(rnd.randint(5, 15))
+        )
+    if kind == "list":
+        if rnd.random() < 0.5:
+            items = [f"- {_inline(rnd)} {_inline(rnd)}" for _ in range(rnd.randint(3, 10))]
+        else:
+            items = [f"{i}. {_inline(rnd)}" for i in range(1, rnd.randint(4, 11))]
+        return "\n".join(items)
+    if kind == "code":
+        lines = [
+            f"    {rnd.choice(WORDS)} = {rnd.choice(WORDS)}({rnd.randrange(100)})"
+            for _ in range(rnd.randint(3, 15))
+        ]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if kind == "quote":
+        return "\n".join(f"> {_inline(rnd)}" for _ in range(rnd.randint(1, 4)))
+    raise ValueError(f"Unknown block kind: {kind}")
+
+
+def generate_corpus(pages, mix="mixed", seed=0, blocks_per_page=12):
+    """
+    Generate deterministic synthetic markdown pages.
+
+    Args:
+        pages (int): Number of pages to generate
+        mix (str): Name of a block mix from MIXES
+        seed (int): Random seed, so runs on different commits see the same input
+        blocks_per_page (int): Average number of blocks after the title
+
+    Yields:
+        str: Markdown source of each page
+    """
+    if mix not in MIXES:
+        raise ValueError(f"Unknown corpus mix: {mix}")
+    kinds = [kind for kind, weight in MIXES[mix].items() if weight]
+    weights = [MIXES[mix][kind] for kind in kinds]
+    rnd = random.Random(seed)
+    for page in range(pages):
+        count = rnd.randint(blocks_per_page // 2, blocks_per_page * 3 // 2)
+        blocks = [f"# Page {page} {_words(rnd, 2)}"]
+        blocks.extend(_block(rnd, kind) for kind in rnd.choices(kinds, weights, k=count))
+        yield "\n\n".join(blocks) + "\n"
+
+
+def _inline_texts(blocks_with_types):
+    # The text each block hands to text_to_textnodes, as block_to_html_node does
+    texts = []
+    for block, block_type in blocks_with_types:
+        if block_type == BlockType.CODE:
+            continue
+        if block_type == BlockType.HEADING:
+            texts.append(block.lstrip("#")[1:])
+        elif block_type in (BlockType.ORDERED_LIST, BlockType.UNORDERED_LIST):
+            texts.extend(line.split(" ", 1)[1] for line in block.split("\n"))
+        elif block_type == BlockType.QUOTE:
+            texts.append(" ".join(line.lstrip(">").strip() for line in block.split("\n")))
+        else:
+            texts.append(" ".join(block.split("\n")))
+    return texts
+
+
+def _time_batch(batch, template, out_dir, totals):
+    clock = time.perf_counter
+
+    start = clock()
+    page_blocks = [markdown_to_blocks(markdown) for markdown in batch]
+    totals["markdown_to_blocks"] += clock() - start
+
+    start = clock()
+    page_types = [[block_to_block_type(block) for block in blocks] for blocks in page_blocks]
+    totals["block_to_block_type"] += clock() - start
+
+    texts = [
+        _inline_texts(zip(blocks, types)) for blocks, types in zip(page_blocks, page_types)
+    ]
+    start = clock()
+    for page_texts in texts:
+        for text in page_texts:
+            text_to_textnodes(text)
+    totals["text_to_textnodes"] += clock() - start
+
+    start = clock()
+    trees = [
+        ParentNode("div", [block_to_html_node(block) for block in blocks])
+        for blocks in page_blocks
+    ]
+    totals["block_to_html_node"] += clock() - start
+
+    start = clock()
+    bodies = [tree.to_html() for tree in trees]
+    totals["to_html"] += clock() - start
+
+    start = clock()
+    pages = [template.render("Benchmark", body) for body in bodies]
+    totals["template_fill"] += clock() - start
+
+    start = clock()
+    for i, html in enumerate(pages):
+        with open(os.path.join(out_dir, f"{i}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+    totals["file_write"] += clock() - start
+
+    return sum(len(markdown) for markdown in batch)
+
+
+def run_benchmark(pages, mix="mixed", parser="split", seed=0, repeat=1):
+    """
+    Time each pipeline stage over a synthetic corpus.
+
+    Pages are processed in batches so memory stays flat at large scales. With
+    repeat > 1 the fastest time of each stage is kept.
+
+    Args:
+        pages (int): Number of pages in the corpus
+        mix (str): Name of a block mix from MIXES
+        parser (str): Inline parser to benchmark
+        seed (int): Corpus random seed
+        repeat (int): Number of runs
+
+    Returns:
+        dict: Corpus description and per-stage timings in seconds
+    """
+    previous_parser = get_inline_parser()
+    set_inline_parser(parser)
+    template = CompiledTemplate(TEMPLATE)
+    best = None
+    markdown_bytes = 0
+    try:
+        for _ in range(repeat):
+            totals = dict.fromkeys(STAGES, 0.0)
+            markdown_bytes = 0
+            clear_inline_cache()
+            out_dir = tempfile.mkdtemp(prefix="ssg-bench-")
+            try:
+                batch = []
+                for markdown in generate_corpus(pages, mix, seed):
+                    batch.append(markdown)
+                    if len(batch) == BATCH_SIZE:
+                        markdown_bytes += _time_batch(batch, template, out_dir, totals)
+                        batch = []
+                if batch:
+                    markdown_bytes += _time_batch(batch, template, out_dir, totals)
+            finally:
+                shutil.rmtree(out_dir)
+            cache = inline_cache_info()
+            if best is None:
+                best = totals
+            else:
+                best = {stage: min(best[stage], totals[stage]) for stage in STAGES}
+    finally:
+        set_inline_parser(previous_parser)
+
+    total = sum(best.values())
+    return {
+        "pages": pages,
+        "mix": mix,
+        "parser": parser,
+        "seed": seed,
+        "markdown_bytes": markdown_bytes,
+        "stages": {
+            stage: {
+                "seconds": round(best[stage], 6),
+                "us_per_page": round(best[stage] / pages * 1e6, 3) if pages else 0.0,
+            }
+            for stage in STAGES
+        },
+        "total_seconds": round(total, 6),
+        "inline_cache": {"hits": cache.hits, "misses": cache.misses},
+    }
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def run_memory_benchmark(pages, mix="mixed", seed=0):
+    """
+    Measure the memory held by the parsed node trees of a synthetic corpus.
+
+    Every page's tree is kept alive, as cross-page features do, while
+    tracemalloc records the peak. The inline cache is disabled so shared
+    cached nodes do not hide the per-node cost. Run it in a fresh process
+    for a meaningful max_rss_bytes, which is the whole process's peak.
+
+    Args:
+        pages (int): Number of pages in the corpus
+        mix (str): Name of a block mix from MIXES
+        seed (int): Corpus random seed
+
+    Returns:
+        dict: Peak traced bytes, bytes per page and the process's peak RSS
+    """
+    cache_size = inline_cache_info().maxsize
+    set_inline_cache_size(0)
+    corpus = list(generate_corpus(pages, mix, seed))
+    try:
+        tracemalloc.start()
+        trees = [markdown_to_html_node(markdown) for markdown in corpus]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        set_inline_cache_size(cache_size)
+    del trees
+
+    return {
+        "pages": pages,
+        "mix": mix,
+        "seed": seed,
+        "peak_traced_bytes": peak,
+        "bytes_per_page": round(peak / pages, 1) if pages else 0.0,
+        "mb_per_10k_pages": round(peak / pages * 10000 / 2**20, 2) if pages else 0.0,
+        "max_rss_bytes": _max_rss_bytes(),
+    }
+
+
+# The pattern forms in use before the compiled registry, kept as baselines
+RAW_IMAGE_PATTERN = IMAGE_PATTERN.pattern
+RAW_LINK_PATTERN = LINK_PATTERN.pattern
+_ALTERNATION_TEXT = r"(?:[^\[\]_`*]|\*(?!\*))*"
+_ALTERNATION_URL = r"(?:[^\(\)_`*]|\*(?!\*))*"
+ALTERNATION_TOKEN_PATTERN = (
+    r"(?P<bold>\*\*)|(?P<italic>_)|(?P<code>`)"
+    rf"|!\[(?P<image_alt>{_ALTERNATION_TEXT})\]\((?P<image_url>{_ALTERNATION_URL})\)"
+    rf"|(?<!!)\[(?P<link_text>{_ALTERNATION_TEXT})\]\((?P<link_url>{_ALTERNATION_URL})\)"
+)
+
+
+def _per_call_ns(function, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(texts) * 1e9
+
+
+def run_pattern_benchmark(texts=2000, seed=0, repeat=5):
+    """
+    Time single pattern calls on link-dense text, before and after compiling.
+
+    "extract_links" and "extract_images" compare re.findall() with a raw
+    pattern string, which goes through the re module's cache on every call,
+    against the shared compiled patterns. "scan_tokens" compares the
+    scanner's old per-character alternation for span text with the unrolled
+    form, finding every token of each text.
+
+    Args:
+        texts (int): Number of link-dense paragraphs to time
+        seed (int): Corpus random seed
+        repeat (int): Runs per case; the fastest is reported
+
+    Returns:
+        dict: Nanoseconds per call before and after, and the speedup, per case
+    """
+    rnd = random.Random(seed)
+    corpus = [_block(rnd, "links") for _ in range(texts)]
+    alternation = re.compile(ALTERNATION_TOKEN_PATTERN)
+    unrolled = token_pattern()
+    cases = {
+        "extract_links": (
+            lambda text: re.findall(RAW_LINK_PATTERN, text),
+            LINK_PATTERN.findall,
+        ),
+        "extract_images": (
+            lambda text: re.findall(RAW_IMAGE_PATTERN, text),
+            IMAGE_PATTERN.findall,
+        ),
+        "scan_tokens": (
+            lambda text: list(alternation.finditer(text)),
+            lambda text: list(unrolled.finditer(text)),
+        ),
+    }
+    results = {}
+    for name, (before, after) in cases.items():
+        before_ns = _per_call_ns(before, corpus, repeat)
+        after_ns = _per_call_ns(after, corpus, repeat)
+        results[name] = {
+            "before_ns": round(before_ns, 1),
+            "after_ns": round(after_ns, 1),
+            "speedup": round(before_ns / after_ns, 2),
+        }
+    return {"texts": texts, "seed": seed, "cases": results}
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _result_key(result):
+    return (result["pages"], result["mix"], result["parser"])
+
+
+def compare(baseline, current):
+    """
+    Print the per-stage change between two benchmark reports.
+
+    Args:
+        baseline (dict): Earlier report, as written by main()
+        current (dict): Report to compare against it
+    """
+    previous = {_result_key(result): result for result in baseline["results"]}
+    for result in current["results"]:
+        old = previous.get(_result_key(result))
+        if old is None:
+            continue
+        print(f"{result['pages']} pages, {result['mix']}, {result['parser']}:")
+        for stage in STAGES:
+            before = old["stages"][stage]["seconds"]
+            after = result["stages"][stage]["seconds"]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {stage:<20} {before:9.4f}s -> {after:9.4f}s  {change:+7.1f}%")
+
+    previous = {
+        (result["pages"], result["mix"]): result for result in baseline.get("memory", [])
+    }
+    for result in current.get("memory", []):
+        old = previous.get((result["pages"], result["mix"]))
+        if old is None:
+            continue
+        before = old["mb_per_10k_pages"]
+        after = result["mb_per_10k_pages"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(
+            f"{result['pages']} pages, {result['mix']}, memory: "
+            f"{before:.2f} -> {after:.2f} MB per 10k pages  {change:+7.1f}%"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000])
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["mixed"])
+    parser.add_argument("--parser", nargs="+", choices=INLINE_PARSERS, default=["split"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="measure memory held by parsed trees instead of stage timings",
+    )
+    parser.add_argument(
+        "--patterns",
+        action="store_true",
+        help="time single inline pattern calls on link-dense text instead",
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON report to compare with")
+    args = parser.parse_args(argv)
+
+    results = []
+    memory = []
+    patterns = None
+    if args.patterns:
+        patterns = run_pattern_benchmark(seed=args.seed, repeat=max(args.repeat, 5))
+        for name, case in patterns["cases"].items():
+            print(
+                f"{name:<15} {case['before_ns']:9.1f}ns -> {case['after_ns']:9.1f}ns "
+                f"per call  {case['speedup']:.2f}x",
+                file=sys.stderr,
+            )
+    for pages in [] if args.patterns else args.pages:
+        for mix in args.mix:
+            if args.memory:
+                result = run_memory_benchmark(pages, mix, args.seed)
+                print(
+                    f"{pages} pages, {mix}: "
+                    f"{result['mb_per_10k_pages']:.2f} MB per 10k pages",
+                    file=sys.stderr,
+                )
+                memory.append(result)
+                continue
+            for inline_parser in args.parser:
+                result = run_benchmark(pages, mix, inline_parser, args.seed, args.repeat)
+                print(
+                    f"{pages} pages, {mix}, {inline_parser}: "
+                    f"{result['total_seconds']:.3f}s",
+                    file=sys.stderr,
+                )
+                results.append(result)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "memory": memory,
+    }
+    if patterns is not None:
+        report["patterns"] = patterns
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import re
 from enum import Enum
+from functools import lru_cache
 from textnode import TextNode, TextType, text_node_to_html_node
 from parentnode import ParentNode
 from leafnode import LeafNode
 from inline_markdown import text_to_textnodes
+from inline_patterns import add_registry_listener
 
 
 class BlockType(Enum):
@@ -15,6 +17,111 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 
+# Bump whenever a change alters the trees markdown_to_html_node() builds or
+# the titles pages get, so parse_cache drops stale entries
+PARSER_VERSION = 4
+
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+CODE_FENCE = "```"
+# One or more blank lines, including lines holding only whitespace; the
+# group keeps the separators so a fenced block can be glued back together
+BLOCK_BREAK_PATTERN = re.compile(r"(\n\s*\n)")
+
+
+class Block:
+    """
+    A stripped markdown block found by scan_blocks, already classified.
+    """
+
+    __slots__ = ("block_type", "text")
+
+    def __init__(self, block_type, text):
+        self.block_type = block_type
+        self.text = text
+
+    def __eq__(self, other):
+        if not isinstance(other, Block):
+            return False
+        return self.block_type == other.block_type and self.text == other.text
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.text!r})"
+
+
+class MarkdownDocument:
+    """
+    A parsed markdown document and its title, found while building the tree.
+
+    Args:
+        node (ParentNode): Root node of the document
+        title (str): Text of the first h1 heading block, or None if none
+        title_node (ParentNode): The h1 node the title comes from, or None
+    """
+
+    __slots__ = ("node", "title", "title_node")
+
+    def __init__(self, node, title=None, title_node=None):
+        self.node = node
+        self.title = title
+        self.title_node = title_node
+
+    def __repr__(self):
+        return f"MarkdownDocument(title={self.title!r})"
+
+
+def _opens_fence(text):
+    # True if text starts a code fence that it does not also close
+    if not text.startswith(CODE_FENCE):
+        return False
+    if "\n" not in text:
+        return len(text) < 6 or not text.endswith(CODE_FENCE)
+    return not text.endswith(CODE_FENCE)
+
+
+def scan_blocks(markdown):
+    """
+    Split markdown text into classified blocks in a single pass.
+
+    Blocks are separated by one or more blank lines, where a line holding
+    only whitespace counts as blank and "\\r\\n" or "\\r" line endings are
+    treated as "\\n". A block that opens a code fence without closing it
+    continues across blank lines up to the block that ends with the closing
+    fence, so blank lines inside fenced code do not split it.
+
+    Args:
+        markdown (str): Raw markdown text
+
+    Returns:
+        list: List of Block objects
+    """
+    if "\r" in markdown:
+        markdown = markdown.replace("\r\n", "\n").replace("\r", "\n")
+    # Chunks at even indexes, the blank lines between them at odd ones
+    parts = BLOCK_BREAK_PATTERN.split(markdown)
+    count = len(parts)
+    # Chunk index from which no later chunk closes a fence, found by an
+    # earlier failed search; keeps unclosed fences from going quadratic
+    unclosed_from = count
+    blocks = []
+    i = 0
+    while i < count:
+        text = parts[i].strip()
+        i += 2
+        if not text:
+            continue
+        if i - 2 < unclosed_from and _opens_fence(text):
+            close = i
+            while close < count and not parts[close].rstrip().endswith(CODE_FENCE):
+                close += 2
+            if close < count:
+                text = "".join(parts[i - 2 : close + 1]).strip()
+                i = close + 2
+            else:
+                unclosed_from = i - 2
+        blocks.append(Block(block_to_block_type(text), text))
+    return blocks
+
+
 def markdown_to_blocks(markdown):
     """
     Split markdown text into individual blocks.
@@ -25,72 +132,107 @@ def markdown_to_blocks(markdown):
     Returns:
         list: List of block strings
     """
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        stripped_block = block.strip()
-        if stripped_block:  # Only add non-empty blocks after stripping
-            filtered_blocks.append(stripped_block)
-    return filtered_blocks
+    return [block.text for block in scan_blocks(markdown)]
 
 
 def block_to_block_type(block):
     """
     Determine the type of a markdown block.
 
+    Lines after the first are checked without splitting the block: every
+    "\\n- " in a list starts a new item, so counting them against the number
+    of newlines checks every line at once.
+
     Args:
         block (str): A single markdown block
 
     Returns:
         BlockType: The type of the block
     """
-    lines = block.split("\n")
+    first = block[:1]
+
+    if first == "#":
+        if block.startswith(HEADING_PREFIXES):
+            return BlockType.HEADING
+
+    elif first == "`":
+        if block.startswith(CODE_FENCE) and block.endswith(CODE_FENCE):
+            return BlockType.CODE
+
+    elif first == ">":
+        if block.count("\n>") == block.count("\n"):
+            return BlockType.QUOTE
+
+    elif first == "-" or first == "*":
+        if block.startswith(("- ", "* ")) and (
+            block.count("\n- ") + block.count("\n* ") == block.count("\n")
+        ):
+            return BlockType.UNORDERED_LIST
+
+    elif first == "1":
+        if block.startswith("1. "):
+            number = 2
+            pos = block.find("\n")
+            while pos != -1:
+                if not block.startswith(f"{number}. ", pos + 1):
+                    return BlockType.PARAGRAPH
+                number += 1
+                pos = block.find("\n", pos + 1)
+            return BlockType.ORDERED_LIST
 
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-        return BlockType.HEADING
+    return BlockType.PARAGRAPH
 
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
 
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return BlockType.PARAGRAPH
-        return BlockType.QUOTE
+def _parse_inline(text):
+    return tuple(text_node_to_html_node(node) for node in text_to_textnodes(text))
 
-    if block.startswith(("- ", "* ")):
-        for line in lines:
-            if not (line.startswith("- ") or line.startswith("* ")):
-                return BlockType.PARAGRAPH
-        return BlockType.UNORDERED_LIST
 
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return BlockType.PARAGRAPH
-            i += 1
-        return BlockType.ORDERED_LIST
+INLINE_CACHE_SIZE = 8192
+_cached_parse_inline = lru_cache(maxsize=INLINE_CACHE_SIZE)(_parse_inline)
 
-    return BlockType.PARAGRAPH
+
+def set_inline_cache_size(maxsize):
+    """
+    Resize the inline-markdown cache used by text_to_children.
+
+    The cache is emptied and its statistics reset.
+
+    Args:
+        maxsize (int): Maximum number of cached spans; 0 disables caching
+    """
+    global _cached_parse_inline
+    _cached_parse_inline = lru_cache(maxsize=maxsize)(_parse_inline)
+
+
+def inline_cache_info():
+    """Return the hits, misses, maxsize and currsize of the inline cache."""
+    return _cached_parse_inline.cache_info()
+
+
+def clear_inline_cache():
+    """Empty the inline cache and reset its statistics."""
+    _cached_parse_inline.cache_clear()
+
+
+# Spans parsed before a syntax was registered or removed may parse differently
+add_registry_listener(clear_inline_cache)
 
 
 def text_to_children(text):
     """
     Convert text with inline markdown to list of child HTMLNodes.
 
+    Results are memoized per span in a bounded LRU cache, since navigation,
+    footers and list items repeat the same text across many pages. Cached
+    nodes are shared between trees, so they must not be modified.
+
     Args:
         text (str): Text potentially containing inline markdown
 
     Returns:
         list: List of HTMLNode objects
     """
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        children.append(html_node)
-    return children
+    return list(_cached_parse_inline(text))
 
 
 def markdown_to_html_node(markdown):
@@ -103,25 +245,85 @@ def markdown_to_html_node(markdown):
     Returns:
         ParentNode: Root HTMLNode containing all converted blocks
     """
-    blocks = markdown_to_blocks(markdown)
-    children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
+    children = [block_to_html_node(block) for block in scan_blocks(markdown)]
     return ParentNode("div", children)
 
 
+def markdown_to_document(markdown):
+    """
+    Convert a markdown document to an HTMLNode tree, noting its first h1.
+
+    The title is taken from the first line of the first "# " heading block
+    as the blocks are converted, so no second pass over the source is needed.
+
+    Args:
+        markdown (str): Complete markdown document
+
+    Returns:
+        MarkdownDocument: The tree, with title and title_node left None if
+        the document has no non-empty h1 heading block
+    """
+    children = []
+    title = title_node = None
+    for block in scan_blocks(markdown):
+        node = block_to_html_node(block)
+        if (
+            title is None
+            and block.block_type is BlockType.HEADING
+            and block.text.startswith("# ")
+        ):
+            title = block.text.partition("\n")[0][2:].strip() or None
+            if title is not None:
+                title_node = node
+        children.append(node)
+    return MarkdownDocument(ParentNode("div", children), title, title_node)
+
+
+def find_title(markdown):
+    """
+    Find a page's title in markdown, by the rule every page title follows.
+
+    The first line of the first "# " heading block is the title, as in
+    markdown_to_document(). Failing that, the first "# " line inside some
+    other block is, except in fenced code.
+
+    Args:
+        markdown (str): Markdown text, without front matter
+
+    Returns:
+        str: The title, or None if the text has no non-empty h1
+    """
+    fallback = None
+    for block in scan_blocks(markdown):
+        if block.block_type is BlockType.HEADING and block.text.startswith("# "):
+            title = block.text.partition("\n")[0][2:].strip()
+            if title:
+                return title
+        if fallback is None and block.block_type is not BlockType.CODE:
+            for line in block.text.split("\n"):
+                line = line.strip()
+                if line.startswith("# ") and line[2:].strip():
+                    fallback = line[2:].strip()
+                    break
+    return fallback
+
+
 def block_to_html_node(block):
     """
     Convert a single markdown block to HTMLNode.
 
     Args:
-        block (str): A single markdown block
+        block (Block or str): A block from scan_blocks, or a single markdown
+            block string, which is classified first
 
     Returns:
         ParentNode or LeafNode: HTMLNode representing the block
     """
-    block_type = block_to_block_type(block)
+    if isinstance(block, Block):
+        block_type = block.block_type
+        block = block.text
+    else:
+        block_type = block_to_block_type(block)
     if block_type == BlockType.PARAGRAPH:
         return paragraph_to_html_node(block)
     if block_type == BlockType.HEADING:
@@ -139,20 +341,14 @@ def block_to_html_node(block):
 
 def paragraph_to_html_node(block):
     """Convert paragraph block to HTMLNode."""
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
+    paragraph = block.replace("\n", " ")
     children = text_to_children(paragraph)
     return ParentNode("p", children)
 
 
 def heading_to_html_node(block):
     """Convert heading block to HTMLNode."""
-    level = 0
-    for char in block:
-        if char == "#":
-            level += 1
-        else:
-            break
+    level = len(block) - len(block.lstrip("#"))
     if level + 1 >= len(block):
         raise ValueError(f"Invalid heading level: {level}")
     text = block[level + 1 :]
@@ -176,7 +372,7 @@ def ordered_list_to_html_node(block):
     items = block.split("\n")
     html_items = []
     for item in items:
-        text = item[3:]  # Remove "1. ", "2. ", etc.
+        text = item.partition(". ")[2]  # Remove "1. ", "2. ", etc.
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
@@ -187,13 +383,7 @@ def unordered_list_to_html_node(block):
     items = block.split("\n")
     html_items = []
     for item in items:
-        # Handle both "- " and "* " prefixes
-        if item.startswith("- "):
-            text = item[2:]
-        elif item.startswith("* "):
-            text = item[2:]
-        else:
-            text = item[2:]  # fallback
+        text = item[2:]  # Remove "- " or "* "
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
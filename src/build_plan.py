@@ -0,0 +1,135 @@
+import os
+
+PAGE = "page"
+STATIC = "static"
+
+
+class BuildJob:
+    """
+    One file of the build: a markdown page to generate or a static file to copy.
+
+    The source's stat results are taken from the directory scan, so later
+    stages can compare sizes and modification times without another stat.
+    """
+
+    __slots__ = ("source", "dest", "kind", "key", "mtime_ns", "size", "ino", "dev")
+
+    def __init__(
+        self, source, dest, kind, key=None, mtime_ns=None, size=None, ino=None, dev=None
+    ):
+        self.source = source
+        self.dest = dest
+        self.kind = kind
+        self.key = key
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.ino = ino
+        self.dev = dev
+
+    def __eq__(self, other):
+        if not isinstance(other, BuildJob):
+            return False
+        return (
+            self.source == other.source
+            and self.dest == other.dest
+            and self.kind == other.kind
+        )
+
+    def __repr__(self):
+        return f"BuildJob({self.kind}, {self.source} -> {self.dest})"
+
+
+def as_page_job(page):
+    """Return page as a BuildJob, wrapping a (source_path, dest_path) tuple."""
+    if isinstance(page, BuildJob):
+        return page
+    source, dest = page
+    return BuildJob(source, dest, PAGE)
+
+
+def page_output_path(path):
+    """Return the output path of a markdown page, e.g. "blog/post.html"."""
+    directory, slash, filename = path.rpartition("/")
+    return directory + slash + filename.replace(".md", ".html")
+
+
+def _scan_dir(dir_path, dest_dir_path, prefix, kind, jobs, dirs):
+    with os.scandir(dir_path) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        name = entry.name
+        if entry.is_dir():
+            dirs.append(prefix + name)
+            _scan_dir(
+                entry.path,
+                os.path.join(dest_dir_path, name),
+                prefix + name + "/",
+                kind,
+                jobs,
+                dirs,
+            )
+            continue
+        if not entry.is_file():
+            continue
+        if kind == PAGE:
+            if not name.endswith(".md"):
+                continue
+            name = name.replace(".md", ".html")
+        stat = entry.stat()
+        jobs.append(
+            BuildJob(
+                entry.path,
+                os.path.join(dest_dir_path, name),
+                kind,
+                prefix + name,
+                stat.st_mtime_ns,
+                stat.st_size,
+                stat.st_ino,
+                stat.st_dev,
+            )
+        )
+
+
+def scan_tree(dir_path, dest_dir_path, kind):
+    """
+    Walk a source directory once and list its build jobs.
+
+    Args:
+        dir_path (str): Content or static directory
+        dest_dir_path (str): Output directory mirroring it
+        kind (str): PAGE to list markdown files as pages, STATIC for every file
+
+    Returns:
+        tuple: (jobs, dirs) where jobs is a list of BuildJob sorted by path
+        and dirs lists the subdirectories, relative to dir_path with "/"
+    """
+    jobs = []
+    dirs = []
+    _scan_dir(dir_path, dest_dir_path, "", kind, jobs, dirs)
+    return jobs, dirs
+
+
+class BuildPlan:
+    """
+    Every page and static file of a build, found by one walk of each tree.
+
+    Args:
+        pages (list): BuildJob objects for the markdown pages
+        static (list): BuildJob objects for the static files
+        static_dirs (list): Static subdirectories, including empty ones
+    """
+
+    def __init__(self, pages, static, static_dirs):
+        self.pages = pages
+        self.static = static
+        self.static_dirs = static_dirs
+
+    @classmethod
+    def scan(cls, dir_path_content, dir_path_static, dest_dir_path):
+        """Walk the content and static directories into a plan for dest_dir_path."""
+        pages, _ = scan_tree(dir_path_content, dest_dir_path, PAGE)
+        static, static_dirs = scan_tree(dir_path_static, dest_dir_path, STATIC)
+        return cls(pages, static, static_dirs)
+
+    def __repr__(self):
+        return f"BuildPlan(pages={len(self.pages)}, static={len(self.static)})"
@@ -0,0 +1,258 @@
+import json
+import os
+import re
+import time
+from xml.sax.saxutils import escape
+
+from manifest import write_if_changed
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+# Children of these tags are separate runs of text, not one inline run
+BLOCK_TAGS = ("div", "ul", "ol", "li", "blockquote", "pre") + HEADING_TAGS
+SITEMAP_FILENAME = "sitemap.xml"
+# Page summaries, relative to the project root; see BuildManifest
+SUMMARIES_PATH = os.path.join(".cache", "summaries.json")
+SEARCH_DIRNAME = "search"
+# Shard names are alphanumeric or "_", so this can never clash with one
+SEARCH_PAGES_FILENAME = "_pages.json"
+SEARCH_PREFIX_LENGTH = 2
+TERM_PATTERN = re.compile(r"\w\w+")
+
+
+class PageSummary:
+    """
+    What collectors need to know about a page, gathered while it is generated.
+
+    Args:
+        title (str): The page title
+        headings (list): [level, text] pairs in document order
+        text (str): Plain text of the page, whitespace collapsed
+    """
+
+    __slots__ = ("title", "headings", "text")
+
+    def __init__(self, title=None, headings=None, text=None):
+        self.title = title
+        self.headings = headings if headings is not None else []
+        self.text = text
+
+    def fill(self, html_node, title):
+        """Summarize a page from its parsed node tree and title."""
+        self.title = title
+        self.headings = [
+            [int(child.tag[1]), " ".join(_node_text(child).split())]
+            for child in html_node.children or ()
+            if child.tag in HEADING_TAGS
+        ]
+        self.text = " ".join(_node_text(html_node).split())
+        return self
+
+    def fill_from(self, other):
+        """Copy the fields of another summary, such as one from the parse cache."""
+        self.title = other.title
+        self.headings = other.headings
+        self.text = other.text
+        return self
+
+    def to_dict(self):
+        return {"title": self.title, "headings": self.headings, "text": self.text}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["title"], data["headings"], data["text"])
+
+    def __eq__(self, other):
+        if not isinstance(other, PageSummary):
+            return False
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"PageSummary({self.title!r}, headings={len(self.headings)})"
+
+
+def _node_text(node):
+    if node.children is None:
+        return node.value or ""
+    separator = " " if node.tag in BLOCK_TAGS else ""
+    return separator.join(_node_text(child) for child in node.children)
+
+
+def page_url(key, basepath="/"):
+    """
+    Return the URL of a generated page.
+
+    Args:
+        key (str): Manifest key of the page, e.g. "blog/post/index.html"
+        basepath (str): Base path of the site
+
+    Returns:
+        str: The page URL, e.g. "/blog/post/"; index.html maps to its directory
+    """
+    if key == "index.html":
+        key = ""
+    elif key.endswith("/index.html"):
+        key = key[: -len("index.html")]
+    return basepath + key
+
+
+class Collector:
+    """
+    Base class for outputs built from every page of the site.
+
+    After pages are generated, add() is called once per page in URL order,
+    for skipped pages too, and then write() produces the output files.
+    """
+
+    def add(self, url, summary, mtime_ns=None):
+        """
+        Take in one page.
+
+        Args:
+            url (str): Page URL including the base path
+            summary (PageSummary): Title, headings and text of the page
+            mtime_ns (int): Modification time of the page's source, if known
+        """
+        raise NotImplementedError("Subclasses should implement this method")
+
+    def write(self, dest_dir_path):
+        """
+        Write the collected output into the output directory.
+
+        Returns:
+            list: Paths of the output files, including ones left untouched
+            because their contents did not change
+        """
+        raise NotImplementedError("Subclasses should implement this method")
+
+
+class SitemapCollector(Collector):
+    """
+    Writes sitemap.xml listing every page.
+
+    Args:
+        site_url (str): Origin the site is served from, e.g.
+            "https://example.com"; page URLs already include the base path
+    """
+
+    def __init__(self, site_url):
+        self.site_url = site_url.rstrip("/")
+        self.entries = []
+
+    def add(self, url, summary, mtime_ns=None):
+        lastmod = None
+        if mtime_ns is not None:
+            lastmod = time.strftime("%Y-%m-%d", time.gmtime(mtime_ns // 10**9))
+        self.entries.append((self.site_url + url, lastmod))
+
+    def write(self, dest_dir_path):
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        ]
+        for loc, lastmod in self.entries:
+            lastmod = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+            lines.append(f"  <url><loc>{escape(loc)}</loc>{lastmod}</url>")
+        lines.append("</urlset>")
+        path = os.path.join(dest_dir_path, SITEMAP_FILENAME)
+        write_if_changed(path, ("\n".join(lines) + "\n").encode("utf-8"))
+        return [path]
+
+
+def shard_name(term, prefix_length=SEARCH_PREFIX_LENGTH):
+    """Return the search index shard a term belongs to."""
+    prefix = term[:prefix_length]
+    if prefix.isascii() and prefix.isalnum():
+        return prefix
+    return "_"
+
+
+class SearchIndexCollector(Collector):
+    """
+    Writes a client-side search index sharded by term prefix.
+
+    search/_pages.json lists every page as {"u": url, "t": title, "h":
+    headings}. Each search/<prefix>.json maps the lowercased terms starting
+    with that prefix to the sorted positions of the pages containing them
+    in _pages.json, so a client only fetches the shard its query starts with.
+    Terms outside ASCII letters and digits share the "_" shard.
+
+    Args:
+        prefix_length (int): Characters of a term that pick its shard
+    """
+
+    def __init__(self, prefix_length=SEARCH_PREFIX_LENGTH):
+        self.prefix_length = prefix_length
+        self.pages = []
+        self.postings = {}
+
+    def add(self, url, summary, mtime_ns=None):
+        doc_id = len(self.pages)
+        self.pages.append(
+            {"u": url, "t": summary.title, "h": [text for _, text in summary.headings]}
+        )
+        for term in set(TERM_PATTERN.findall(summary.text.lower())):
+            self.postings.setdefault(term, []).append(doc_id)
+
+    def write(self, dest_dir_path):
+        shards = {}
+        for term in sorted(self.postings):
+            shards.setdefault(shard_name(term, self.prefix_length), {})[term] = (
+                self.postings[term]
+            )
+
+        search_dir = os.path.join(dest_dir_path, SEARCH_DIRNAME)
+        os.makedirs(search_dir, exist_ok=True)
+        files = {SEARCH_PAGES_FILENAME: self.pages}
+        files.update((name + ".json", shard) for name, shard in shards.items())
+        written = []
+        for filename, data in files.items():
+            path = os.path.join(search_dir, filename)
+            text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+            write_if_changed(path, text.encode("utf-8"))
+            written.append(path)
+
+        # Drop shards whose terms have all disappeared since the last build
+        with os.scandir(search_dir) as entries:
+            stale = [
+                entry.path
+                for entry in entries
+                if entry.name.endswith(".json") and entry.name not in files
+            ]
+        for path in stale:
+            os.remove(path)
+        return written
+
+
+def run_collectors(collectors, manifest, basepath="/"):
+    """
+    Feed every page recorded in the manifest to collectors and write them.
+
+    Pages are summarized as they are generated and their summaries kept by
+    the manifest, so pages skipped by an incremental build are included
+    without being read again. The manifest also records the files written,
+    and files an earlier build's collectors wrote that none wrote this time,
+    such as sitemap.xml after --sitemap is dropped, are deleted; so this is
+    called even when there are no collectors.
+
+    Args:
+        collectors (list): Collector instances
+        manifest (BuildManifest): Manifest of the finished build
+        basepath (str): Base path of the site
+
+    Returns:
+        tuple: (written, removed), the paths of the files written and the
+        manifest keys of the stale ones deleted
+    """
+    if collectors:
+        for key in sorted(manifest.pages, key=page_url):
+            summary = manifest.summary(os.path.join(manifest.root, *key.split("/")))
+            if summary is None:
+                continue
+            summary = PageSummary.from_dict(summary)
+            mtime_ns = manifest.pages[key].get("source_mtime_ns")
+            for collector in collectors:
+                collector.add(page_url(key, basepath), summary, mtime_ns)
+    written = []
+    for collector in collectors:
+        written.extend(collector.write(manifest.root))
+    return written, manifest.update_collected(written)
@@ -1,16 +1,146 @@
 import os
 import shutil
 
+from build_plan import STATIC, scan_tree
+from manifest import hash_file, remove_empty_dirs
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
-
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
-        else:
-            copy_files_recursive(from_path, dest_path)
+# Linux ioctl that clones a file's extents (a reflink) on btrfs, XFS and others
+FICLONE = 0x40049409
+
+
+def _reflink(from_path, dest_path):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(from_path, "rb") as src, open(dest_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        return False
+    shutil.copystat(from_path, dest_path)
+    return True
+
+
+def place_file(from_path, dest_path, link=True):
+    """
+    Put a copy of from_path at dest_path as cheaply as the filesystem allows.
+
+    Tries a reflink, then a hard link, then falls back to a regular copy. An
+    existing destination is unlinked first, so a hard-linked destination is
+    never written through to its source.
+
+    Args:
+        from_path (str): File to copy
+        dest_path (str): Destination path
+        link (bool): Allow reflinks and hard links
+
+    Returns:
+        str: "reflink", "link" or "copy"
+    """
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    if link:
+        if _reflink(from_path, dest_path):
+            return "reflink"
+        try:
+            os.link(from_path, dest_path)
+            return "link"
+        except OSError:
+            pass
+    shutil.copy2(from_path, dest_path)
+    return "copy"
+
+
+def _is_unchanged(job, use_hash):
+    try:
+        dest_stat = os.stat(job.dest)
+    except FileNotFoundError:
+        return False
+    if dest_stat.st_ino == job.ino and dest_stat.st_dev == job.dev:
+        return True
+    if dest_stat.st_size != job.size:
+        return False
+    if use_hash:
+        return hash_file(job.source) == hash_file(job.dest)
+    return dest_stat.st_mtime_ns == job.mtime_ns
+
+
+def sync_static(
+    jobs, dest_dir_path, manifest=None, use_hash=False, link=True, dirs=()
+):
+    """
+    Incrementally mirror the static files of a build plan into the output.
+
+    Files whose size and modification time (or, with use_hash, contents)
+    match the destination are left alone; the source side of the comparison
+    comes from the stat taken when the plan was scanned. When a manifest is
+    given, files recorded by the previous sync that are no longer in the plan
+    are removed from the output, and the manifest's asset list is updated.
+
+    Args:
+        jobs (list): Static BuildJob objects from a BuildPlan
+        dest_dir_path (str): Output directory
+        manifest (BuildManifest): Optional manifest of the output directory
+        use_hash (bool): Compare file contents instead of modification times
+        link (bool): Allow reflinks and hard links instead of copies
+        dirs (list): Static subdirectories to create even if they are empty
+
+    Returns:
+        tuple: (updated, removed) lists of paths relative to dest_dir_path
+    """
+    os.makedirs(dest_dir_path, exist_ok=True)
+    for key in dirs:
+        os.makedirs(os.path.join(dest_dir_path, *key.split("/")), exist_ok=True)
+
+    synced = []
+    updated = []
+    for job in jobs:
+        synced.append(job.key)
+        if not _is_unchanged(job, use_hash):
+            place_file(job.source, job.dest, link)
+            updated.append(job.key)
+
+    removed = []
+    if manifest is not None:
+        for key in sorted(set(manifest.assets) - set(synced)):
+            dest_path = os.path.join(dest_dir_path, *key.split("/"))
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+                remove_empty_dirs(dest_dir_path, os.path.dirname(dest_path))
+            removed.append(key)
+        manifest.assets = synced
+
+    for key in updated:
+        print(f" * {key}")
+    for key in removed:
+        print(f" - {key}")
+    print(
+        f"Static files: {len(updated)} updated, "
+        f"{len(synced) - len(updated)} unchanged, {len(removed)} removed"
+    )
+    return updated, removed
+
+
+def sync_files_recursive(
+    source_dir_path, dest_dir_path, manifest=None, use_hash=False, link=True
+):
+    """
+    Scan a static directory and mirror it into the output directory.
+
+    See sync_static() for how files are compared and removed.
+
+    Args:
+        source_dir_path (str): Static files directory
+        dest_dir_path (str): Output directory
+        manifest (BuildManifest): Optional manifest of the output directory
+        use_hash (bool): Compare file contents instead of modification times
+        link (bool): Allow reflinks and hard links instead of copies
+
+    Returns:
+        tuple: (updated, removed) lists of paths relative to dest_dir_path
+    """
+    jobs, dirs = scan_tree(source_dir_path, dest_dir_path, STATIC)
+    return sync_static(jobs, dest_dir_path, manifest, use_hash, link, dirs)
@@ -0,0 +1,427 @@
+"""Development server with watch mode and browser live reload.
+
+Usage:
+    python src/main.py serve --watch [--port 8888] [--interval 0.1]
+"""
+
+import argparse
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from build_plan import STATIC, BuildPlan, scan_tree
+from copystatic import sync_static
+from generate_page import collect_pages, generate_pages, page_dest_path
+from images import IMAGE_CACHE_DIRNAME, VARIANT_WIDTHS, ImagePipeline, width_list
+from listings import generate_listings
+from manifest import BuildManifest
+from metadata_index import MetadataIndex
+from parse_cache import PARSE_CACHE_DIRNAME, ParseCache
+from template import TemplateSet
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    "<script>new EventSource(%r).onmessage = function () {"
+    " location.reload(); };</script>" % LIVERELOAD_PATH
+).encode("utf-8")
+
+
+def snapshot(paths):
+    """
+    Record the size and modification time of every file under some paths.
+
+    Args:
+        paths (list): Files and directories to scan recursively
+
+    Returns:
+        dict: Maps each file path to a (st_mtime_ns, st_size) tuple
+    """
+    state = {}
+    pending = list(paths)
+    while pending:
+        path = pending.pop()
+        try:
+            if not os.path.isdir(path):
+                stat = os.stat(path)
+                state[path] = (stat.st_mtime_ns, stat.st_size)
+                continue
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            continue
+    return state
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots.
+
+    Returns:
+        tuple: (changed, removed) sorted lists of paths; changed includes
+        files that were added
+    """
+    changed = sorted(path for path, state in new.items() if old.get(path) != state)
+    removed = sorted(path for path in old if path not in new)
+    return changed, removed
+
+
+class ReloadBroadcaster:
+    """Wakes every waiting live-reload client when the site is rebuilt."""
+
+    def __init__(self):
+        self.version = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, seen, timeout=None):
+        """Block until the version moves past seen; return the current version."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.version != seen or self.closed, timeout
+            )
+            return self.version
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class SiteWatcher:
+    """
+    Keeps a build warm in memory and rebuilds only what a change affects.
+
+    The compiled templates, the build manifest and the metadata index stay
+    loaded between rebuilds, and drafts are built too, for previewing. A
+    changed markdown file regenerates its own page, a deleted one removes
+    its page and a static change re-syncs static files. A changed image
+    under static/images/ gets new variants, and if that changes any image's
+    dimensions or variants every page is regenerated. A changed template
+    or partial regenerates the pages the dependency graph says were built
+    from it; a new file in the templates directory can change which
+    template any page uses, so every page is checked against the manifest.
+    Blog listing pages are brought up to date after every rebuild.
+    """
+
+    def __init__(
+        self,
+        dir_path_content,
+        dir_path_static,
+        template_path,
+        dest_dir_path,
+        basepath="/",
+        broadcaster=None,
+        parse_cache=None,
+        templates_dir=None,
+        image_pipeline=None,
+    ):
+        self.dir_path_content = dir_path_content
+        self.dir_path_static = dir_path_static
+        self.template_path = template_path
+        self.templates_dir = templates_dir
+        self.dest_dir_path = dest_dir_path
+        self.basepath = basepath
+        self.broadcaster = broadcaster
+        self.parse_cache = parse_cache
+        self.image_pipeline = image_pipeline
+        self.images = None
+        self.manifest = BuildManifest.load(dest_dir_path)
+        self.templates = self._load_templates()
+        self.metadata = MetadataIndex(dir_path_content)
+        self.state = {}
+
+    def _load_templates(self):
+        return TemplateSet(
+            self.template_path,
+            self.templates_dir,
+            self.dir_path_content,
+            self.basepath,
+        )
+
+    def watched_paths(self):
+        paths = [self.dir_path_content, self.dir_path_static, self.template_path]
+        if self.templates_dir is not None:
+            paths.append(self.templates_dir)
+        return paths
+
+    def build(self):
+        """Run an incremental build of the whole site and start watching."""
+        self.state = snapshot(self.watched_paths())
+        plan = BuildPlan.scan(
+            self.dir_path_content, self.dir_path_static, self.dest_dir_path
+        )
+        sync_static(
+            plan.static, self.dest_dir_path, self.manifest, dirs=plan.static_dirs
+        )
+        self._process_images(plan.static)
+        generate_pages(
+            plan.pages,
+            self.templates,
+            self.basepath,
+            self.manifest,
+            parse_cache=self.parse_cache,
+            metadata=self.metadata,
+            images=self.images,
+        )
+        self._generate_listings()
+        self.manifest.prune()
+        self.manifest.save()
+        if self.parse_cache is not None:
+            self.parse_cache.prune()
+
+    def poll(self):
+        """
+        Rebuild whatever changed since the last poll.
+
+        Returns:
+            bool: True if anything was rebuilt
+        """
+        new_state = snapshot(self.watched_paths())
+        changed, removed = diff_snapshots(self.state, new_state)
+        self.state = new_state
+        if not changed and not removed:
+            return False
+
+        start = time.perf_counter()
+        try:
+            self.rebuild(changed, removed)
+        except Exception as error:
+            print(f"Rebuild failed: {error}")
+            return False
+        print(f"Rebuilt in {(time.perf_counter() - start) * 1000:.1f}ms")
+        if self.broadcaster is not None:
+            self.broadcaster.notify()
+        return True
+
+    def rebuild(self, changed, removed):
+        """Apply a set of changed and removed source paths to the output."""
+        paths = changed + removed
+        content_prefix = os.path.join(self.dir_path_content, "")
+        static_prefix = os.path.join(self.dir_path_static, "")
+
+        images_changed = False
+        if any(path.startswith(static_prefix) for path in paths):
+            static, dirs = scan_tree(self.dir_path_static, self.dest_dir_path, STATIC)
+            sync_static(static, self.dest_dir_path, self.manifest, dirs=dirs)
+            images_changed = self._process_images(static)
+
+        pages = [
+            (path, self._dest(path))
+            for path in changed
+            if path.startswith(content_prefix) and path.endswith(".md")
+        ]
+        for path in removed:
+            if path.startswith(content_prefix) and path.endswith(".md"):
+                print(f"Removing page for deleted {path}")
+                self.manifest.remove(self._dest(path))
+                self.metadata.remove(path)
+
+        template_paths = [path for path in paths if self._is_template(path)]
+        if template_paths:
+            self.templates = self._load_templates()
+            graph = self.manifest.graph
+            if all(graph.tracks(path) for path in template_paths):
+                keys = {
+                    key for path in template_paths for key in graph.dependents(path)
+                }
+                # Sources are recorded relative to the output directory, so
+                # they resolve wherever the project was built. Listing pages
+                # have no source; they are checked below anyway
+                sources = [(self.manifest.source(key), key) for key in sorted(keys)]
+                pages.extend(
+                    (source, self._output(key))
+                    for source, key in sources
+                    if source is not None
+                )
+                pages = list(dict.fromkeys(pages))
+            else:
+                pages = collect_pages(self.dir_path_content, self.dest_dir_path)
+        if images_changed:
+            pages = collect_pages(self.dir_path_content, self.dest_dir_path)
+
+        try:
+            generate_pages(
+                pages,
+                self.templates,
+                self.basepath,
+                self.manifest,
+                parse_cache=self.parse_cache,
+                metadata=self.metadata,
+                images=self.images,
+            )
+            self._generate_listings()
+        finally:
+            self.manifest.save()
+
+    def _process_images(self, static):
+        # Returns True if the ImageSet the pages are sized with changed
+        if self.image_pipeline is None:
+            return False
+        before = self.images.fingerprint if self.images is not None else None
+        self.images = self.image_pipeline.process(
+            static, self.dest_dir_path, self.manifest
+        )
+        return self.images.fingerprint != before
+
+    def _generate_listings(self):
+        generate_listings(
+            self.metadata,
+            self.templates,
+            self.dest_dir_path,
+            self.basepath,
+            self.manifest,
+            drafts=True,
+        )
+
+    def _dest(self, source_path):
+        return page_dest_path(source_path, self.dir_path_content, self.dest_dir_path)
+
+    def _output(self, key):
+        return os.path.join(self.dest_dir_path, *key.split("/"))
+
+    def _is_template(self, path):
+        if path == self.template_path:
+            return True
+        return self.templates_dir is not None and path.startswith(
+            os.path.join(self.templates_dir, "")
+        )
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """Serves the output directory, injecting the live-reload client into HTML."""
+
+    broadcaster = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == LIVERELOAD_PATH:
+            self._serve_events()
+            return
+        file_path = self.translate_path(path)
+        if os.path.isdir(file_path):
+            if not path.endswith("/"):
+                # Let the base class redirect to the trailing-slash URL
+                super().do_GET()
+                return
+            file_path = os.path.join(file_path, "index.html")
+        if file_path.endswith(".html") and os.path.isfile(file_path):
+            self._serve_html(file_path)
+            return
+        super().do_GET()
+
+    def _serve_html(self, file_path):
+        with open(file_path, "rb") as f:
+            body = f.read()
+        index = body.rfind(b"</body>")
+        if index == -1:
+            body += LIVERELOAD_SCRIPT
+        else:
+            body = body[:index] + LIVERELOAD_SCRIPT + body[index:]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_events(self):
+        broadcaster = self.broadcaster
+        seen = broadcaster.version
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            while not broadcaster.closed:
+                version = broadcaster.wait(seen, timeout=15)
+                if version == seen:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    seen = version
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        if self.path != LIVERELOAD_PATH:
+            super().log_message(format, *args)
+
+
+def make_server(dest_dir_path, broadcaster, host="127.0.0.1", port=8888):
+    """Create a threaded HTTP server for the output directory."""
+    handler = functools.partial(
+        type("Handler", (LiveReloadHandler,), {"broadcaster": broadcaster}),
+        directory=dest_dir_path,
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_main(argv, project_root):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description="Serve the site for local development."
+    )
+    parser.add_argument("--watch", action="store_true", help="rebuild on changes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.1,
+        help="seconds between polls of the watched files (default: 0.1)",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=width_list,
+        default=list(VARIANT_WIDTHS),
+        metavar="W,W",
+        help="widths of the resized image variants, as for a build (default: "
+        f"{','.join(map(str, VARIANT_WIDTHS))})",
+    )
+    args = parser.parse_args(argv)
+
+    broadcaster = ReloadBroadcaster()
+    watcher = SiteWatcher(
+        os.path.join(project_root, "content"),
+        os.path.join(project_root, "static"),
+        os.path.join(project_root, "template.html"),
+        os.path.join(project_root, "docs"),
+        broadcaster=broadcaster,
+        parse_cache=ParseCache(os.path.join(project_root, PARSE_CACHE_DIRNAME)),
+        templates_dir=os.path.join(project_root, "templates"),
+        image_pipeline=ImagePipeline(
+            os.path.join(project_root, IMAGE_CACHE_DIRNAME), args.image_widths
+        ),
+    )
+    watcher.build()
+
+    server = make_server(watcher.dest_dir_path, broadcaster, args.host, args.port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {watcher.dest_dir_path} at http://{args.host}:{server.server_port}/")
+
+    try:
+        while True:
+            time.sleep(args.interval)
+            if args.watch:
+                watcher.poll()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broadcaster.close()
+        server.shutdown()
+        server.server_close()
@@ -1,16 +1,14 @@
-import re
 from textnode import TextNode, TextType
 from split_delimiter import split_nodes_delimiter
+from inline_patterns import IMAGE_PATTERN, LINK_PATTERN
 
 
 def extract_markdown_images(text):
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes):
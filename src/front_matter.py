@@ -0,0 +1,169 @@
+"""Front matter: a block of page metadata at the top of a markdown file.
+
+    ---
+    date: 2024-03-01
+    tags: [tolkien, essays]
+    template: post
+    draft: true
+    ---
+    # Why Tom Bombadil Was a Mistake
+
+Each line is "key: value". A value in brackets is a list of comma-separated
+strings, true and false are booleans, quotes around a value are dropped and
+anything else is a string; dates stay ISO strings, so they sort by date.
+The title and template keys must be strings.
+"""
+
+from block_markdown import CODE_FENCE, find_title
+
+FENCE = "---"
+# Keys whose value goes into a page or names a file, so cannot be a list
+STRING_KEYS = ("title", "template")
+# Characters read_header() reads at most while looking for the end of a header
+HEADER_LIMIT = 16 * 1024
+
+
+def _parse_value(value):
+    if value.startswith("[") and value.endswith("]"):
+        return [
+            _unquote(item.strip())
+            for item in value[1:-1].split(",")
+            if item.strip()
+        ]
+    if value in ("true", "false"):
+        return value == "true"
+    return _unquote(value)
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def parse_front_matter(lines):
+    """
+    Parse the lines between the front matter fences.
+
+    Args:
+        lines (iterable): Lines of the block, without the fences
+
+    Returns:
+        dict: The metadata, in the order of the lines
+
+    Raises:
+        ValueError: If a line is not "key: value", or a key in STRING_KEYS
+            has a list or boolean value
+    """
+    metadata = {}
+    for number, line in enumerate(lines, 2):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, colon, value = line.partition(":")
+        key = key.strip()
+        if not colon or not key:
+            raise ValueError(f"Invalid front matter on line {number}: {line!r}")
+        value = _parse_value(value.strip())
+        if key in STRING_KEYS and not isinstance(value, str):
+            raise ValueError(
+                f"Front matter {key!r} on line {number} must be a string, "
+                f"not {value!r}"
+            )
+        metadata[key] = value
+    return metadata
+
+
+def _parse_block(lines, path):
+    try:
+        return parse_front_matter(lines)
+    except ValueError as error:
+        if path is None:
+            raise
+        raise ValueError(f"{error}: {path}") from None
+
+
+def split_front_matter(markdown, path=None):
+    """
+    Separate the front matter of a markdown source from its body.
+
+    Args:
+        markdown (str): Markdown source text
+        path (str): Optional name of the source, for error messages
+
+    Returns:
+        tuple: (metadata, body); a source without front matter gives an
+        empty dict and the source itself
+
+    Raises:
+        ValueError: If the front matter is malformed or never closed
+    """
+    if not markdown.startswith(FENCE):
+        return {}, markdown
+    lines = markdown.split("\n")
+    if lines[0].rstrip() != FENCE:
+        return {}, markdown
+    for index in range(1, len(lines)):
+        if lines[index].rstrip() == FENCE:
+            metadata = _parse_block(lines[1:index], path)
+            return metadata, "\n".join(lines[index + 1 :])
+    message = "Front matter is not closed by a --- line"
+    raise ValueError(message if path is None else f"{message}: {path}")
+
+
+def read_header(path, limit=HEADER_LIMIT):
+    """
+    Read a page's metadata without parsing its body.
+
+    The title comes from the front matter or else from find_title(), the
+    rule the page itself is titled by. Reading stops at the first line
+    that starts a "# " heading block, unless a code fence came before it,
+    and in any case after limit characters; a page titled further into the
+    file is left without one.
+
+    Args:
+        path (str): Markdown source
+        limit (int): Most characters to read
+
+    Returns:
+        dict: The front matter, with "title" added from the body if found
+
+    Raises:
+        ValueError: If the front matter is malformed or never closed
+    """
+    metadata = {}
+    block = None
+    body = []
+    # Whether the next line starts a block, and whether a fence was seen
+    block_start = True
+    fenced = False
+    read = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            read += len(line)
+            if number == 0 and line.rstrip() == FENCE:
+                block = []
+                continue
+            if block is not None:
+                if line.rstrip() == FENCE:
+                    metadata = _parse_block(block, path)
+                    block = None
+                    if "title" in metadata:
+                        return metadata
+                    continue
+                block.append(line)
+            else:
+                body.append(line)
+                text = line.strip()
+                fenced = fenced or text.startswith(CODE_FENCE)
+                if block_start and not fenced and text.startswith("# "):
+                    break
+                block_start = not text
+            if read > limit:
+                break
+    if block is not None:
+        raise ValueError(f"Front matter is not closed by a --- line: {path}")
+    title = find_title("".join(body))
+    if title is not None:
+        metadata["title"] = title
+    return metadata
@@ -1,50 +1,544 @@
 import os
-from block_markdown import markdown_to_html_node
-from extract_title import extract_title
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+from build_plan import PAGE, as_page_job, scan_tree
+from block_markdown import (
+    PARSER_VERSION,
+    find_title,
+    inline_cache_info,
+    markdown_to_document,
+    set_inline_cache_size,
+)
+from collectors import PageSummary
+from front_matter import split_front_matter
+from images import add_image_sizes
+from inline_markdown import get_inline_parser, set_inline_parser
+from inline_patterns import syntax_fingerprint
+from manifest import hash_file, write_chunks_if_changed
+from metadata_index import MetadataIndex
+from profiling import NULL_TIMINGS
+from template import (
+    join_links,
+    load_template,
+    load_templates,
+    rebase_links,
+    split_links,
+)
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
 
-    with open(from_path, "r", encoding="utf-8") as f:
-        markdown_content = f.read()
+class BuildError(Exception):
+    """Raised when one or more pages fail to generate in a parallel build."""
 
-    with open(template_path, "r", encoding="utf-8") as f:
-        template_content = f.read()
+    def __init__(self, failures):
+        self.failures = failures
+        details = "\n".join(f"  {path}: {error!r}" for path, error in failures)
+        super().__init__(f"{len(failures)} page(s) failed to generate:\n{details}")
 
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
 
-    title = extract_title(markdown_content)
+def _init_worker(inline_parser, inline_cache_size):
+    # Carry the parent's parsing settings into each pool process
+    set_inline_parser(inline_parser)
+    set_inline_cache_size(inline_cache_size)
 
-    final_html = template_content.replace("{{ Title }}", title)
-    final_html = final_html.replace("{{ Content }}", html_content)
 
-    final_html = final_html.replace('href="/', f'href="{basepath}')
-    final_html = final_html.replace('src="/', f'src="{basepath}')
+def build_version():
+    """
+    Identify the parser and renderer pages are generated with.
 
-    dest_dir = os.path.dirname(dest_path)
-    if dest_dir and not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
+    The manifest records it with every page, so a build with a new parser
+    version, another inline parser or other registered inline syntaxes
+    regenerates pages whose sources did not change.
 
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    Returns:
+        str: PARSER_VERSION, the inline parser's name and the fingerprint
+        of any extra inline syntaxes
+    """
+    version = f"{PARSER_VERSION}-{get_inline_parser()}"
+    fingerprint = syntax_fingerprint()
+    if fingerprint:
+        version += f"-{fingerprint}"
+    return version
 
 
-def generate_pages_recursive(
-    dir_path_content, template_path, dest_dir_path, basepath="/"
+def read_page_source(from_path, timings=None):
+    """Read a markdown source, timing it as the page's "read" stage."""
+    with (timings or NULL_TIMINGS).stage("read"):
+        with open(from_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+
+def render_page(
+    markdown_content,
+    template,
+    basepath="/",
+    timings=None,
+    parse_cache=None,
+    summary=None,
+    images=None,
 ):
-    for entry in os.listdir(dir_path_content):
-        entry_path = os.path.join(dir_path_content, entry)
-
-        if os.path.isfile(entry_path):
-            if entry.endswith(".md"):
-                html_filename = entry.replace(".md", ".html")
-                dest_path = os.path.join(dest_dir_path, html_filename)
-                generate_page(entry_path, template_path, dest_path, basepath)
+    """
+    Turn markdown into the fragments of a complete HTML page.
+
+    Front matter at the top of the source is not part of the page; a title
+    it sets replaces the h1 in {{ Title }}. Images found in the optional
+    ImageSet get their dimensions and srcset.
+
+    Args:
+        markdown_content (str): Markdown source text
+        template (CompiledTemplate): Template compiled for basepath
+        basepath (str): Base path for root-relative links
+        timings (PageTimings): Optional per-stage timings to fill in
+        parse_cache (ParseCache): Optional cache of rendered page content
+        summary (PageSummary): Optional summary to fill in for collectors
+        images (ImageSet): Optional processed images of the site
+
+    Returns:
+        iterable: Page fragments; a lazy generator unless timings is given
+    """
+    timer = timings or NULL_TIMINGS
+    images_hash = images.fingerprint if images is not None else None
+
+    with timer.stage("parse"):
+        key = cached = None
+        if parse_cache is not None:
+            key = parse_cache.key(markdown_content, images_hash)
+            if key is not None:
+                cached = parse_cache.get(key)
+            if cached is not None and summary is not None and cached[2] is None:
+                # Cached before collectors were used; parse again to summarize
+                cached = None
+        if cached is None:
+            metadata, body = split_front_matter(markdown_content)
+            document = markdown_to_document(body)
+            html_node = document.node
+            if images_hash is not None:
+                html_node = add_image_sizes(html_node, images)
+            title = metadata.get("title") or document.title
+            if title is None:
+                # Only an h1 line outside a heading block is left to find
+                title = find_title(body)
+                if title is None:
+                    raise ValueError("No h1 header found in markdown content")
+            if summary is not None:
+                summary.fill(html_node, title)
         else:
-            dest_subdir = os.path.join(dest_dir_path, entry)
-            if not os.path.exists(dest_subdir):
-                os.makedirs(dest_subdir)
+            title, content_parts, cached_summary = cached
+            if summary is not None:
+                summary.fill_from(cached_summary)
+
+    with timer.stage("render"):
+        if key is None:
+            content_chunks = rebase_links(html_node, basepath).to_html_chunks()
+            if timings is not None:
+                # Materialize so rendering is timed apart from the template
+                content_chunks = list(content_chunks)
+        else:
+            if cached is None:
+                content_parts = split_links(html_node)
+                parse_cache.put(key, title, content_parts, summary)
+            content_chunks = [join_links(content_parts, basepath)]
+
+    if timings is None:
+        return template.render_chunks(title, content_chunks)
+    with timings.stage("template"):
+        return list(template.render_chunks(title, content_chunks))
+
+
+def render_node(html_node, title, template, basepath="/", summary=None):
+    """
+    Turn a node tree built in code, rather than parsed, into a complete page.
+
+    Args:
+        html_node (HTMLNode): Content of the page, for {{ Content }}
+        title (str): Title of the page, for {{ Title }}
+        template (CompiledTemplate): Template compiled for basepath
+        basepath (str): Base path for root-relative links
+        summary (PageSummary): Optional summary to fill in for collectors
+
+    Returns:
+        iterable: Page fragments, as from render_page()
+    """
+    if summary is not None:
+        summary.fill(html_node, title)
+    content_chunks = rebase_links(html_node, basepath).to_html_chunks()
+    return template.render_chunks(title, content_chunks)
+
+
+def write_page(dest_path, chunks, timings=None, made_dirs=None):
+    """
+    Write page fragments to dest_path, creating its directory if needed.
+
+    The fragments are streamed to disk as they are produced, never joined
+    into one string. The write is atomic, and an existing file that already
+    holds the same page is left untouched, so its modification time only
+    moves when the page really changes.
+
+    Args:
+        dest_path (str): Output HTML path
+        chunks (iterable): Page fragments from render_page()
+        timings (PageTimings): Optional timings; this is the "write" stage
+        made_dirs (set): Optional set of directories known to exist, shared
+            across pages so each directory is only created once
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+    """
+    with (timings or NULL_TIMINGS).stage("write"):
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir and (made_dirs is None or dest_dir not in made_dirs):
+            os.makedirs(dest_dir, exist_ok=True)
+            if made_dirs is not None:
+                made_dirs.add(dest_dir)
+
+        return write_chunks_if_changed(dest_path, chunks)
+
+
+def generate_page(
+    from_path,
+    template,
+    dest_path,
+    basepath="/",
+    timings=None,
+    parse_cache=None,
+    summary=None,
+    images=None,
+):
+    """
+    Generate one HTML page from a markdown file.
+
+    Args:
+        from_path (str): Markdown source
+        template (str or CompiledTemplate): Template or path to one
+        dest_path (str): Output HTML path
+        basepath (str): Base path for root-relative links
+        timings (PageTimings): Optional per-stage timings to fill in
+        parse_cache (ParseCache): Optional cache of rendered page content
+        summary (PageSummary): Optional summary to fill in for collectors
+        images (ImageSet): Optional processed images of the site
+
+    Returns:
+        PageTimings: The filled-in timings, or None when not profiling
+    """
+    template = load_template(template, basepath)
+    print(f"Generating page from {from_path} to {dest_path}")
+
+    with (timings or NULL_TIMINGS).profiled():
+        markdown_content = read_page_source(from_path, timings)
+        chunks = render_page(
+            markdown_content,
+            template,
+            basepath,
+            timings,
+            parse_cache,
+            summary,
+            images,
+        )
+        write_page(dest_path, chunks, timings)
+
+    return timings
+
+
+def _generate_page_in_worker(
+    from_path, template, dest_path, basepath, timings, parse_cache, collect, images
+):
+    # A pool process cannot fill in the parent's objects, so send both back
+    summary = PageSummary() if collect else None
+    timings = generate_page(
+        from_path,
+        template,
+        dest_path,
+        basepath,
+        timings,
+        parse_cache,
+        summary,
+        images,
+    )
+    return timings, summary
 
-            generate_pages_recursive(entry_path, template_path, dest_subdir, basepath)
+
+def page_dest_path(source_path, dir_path_content, dest_dir_path):
+    """Return the output path of a markdown source inside a content directory."""
+    rel_dir, filename = os.path.split(os.path.relpath(source_path, dir_path_content))
+    return os.path.join(dest_dir_path, rel_dir, filename.replace(".md", ".html"))
+
+
+def collect_pages(dir_path_content, dest_dir_path):
+    """
+    Walk a content directory and list the pages to generate.
+
+    Args:
+        dir_path_content (str): Directory containing markdown sources
+        dest_dir_path (str): Output directory mirroring the content tree
+
+    Returns:
+        list: Sorted list of (source_path, dest_path) tuples
+    """
+    jobs, _ = scan_tree(dir_path_content, dest_dir_path, PAGE)
+    return [(job.source, job.dest) for job in jobs]
+
+
+def _record(
+    manifest, job, source_hash, template, basepath, summary=None, images=None
+):
+    manifest.record(
+        job.dest,
+        job.source,
+        source_hash,
+        template.hash,
+        basepath,
+        job.mtime_ns,
+        job.size,
+        summary,
+        template.dependencies,
+        images.fingerprint if images is not None else None,
+        build_version(),
+    )
+
+
+def _generate_pages_pipelined(
+    todo, basepath, manifest, profiler, parse_cache, io_threads, collect, images
+):
+    # Sources are read ahead and pages written behind on a thread pool while
+    # this thread parses and renders. At most `depth` reads and `depth`
+    # writes are in flight, which bounds the pages held in memory.
+    depth = io_threads * 2
+    made_dirs = set()
+    pending = iter(todo)
+    reads = deque()
+    writes = deque()
+
+    def read_next():
+        for job, source_hash, template in pending:
+            timings = profiler.page(job.source) if profiler is not None else None
+            future = executor.submit(read_page_source, job.source, timings)
+            reads.append((job, source_hash, template, timings, future))
+            return
+
+    def finish_write():
+        job, source_hash, template, timings, summary, future = writes.popleft()
+        future.result()
+        if profiler is not None:
+            profiler.add(timings)
+        if manifest is not None:
+            _record(manifest, job, source_hash, template, basepath, summary, images)
+
+    with ThreadPoolExecutor(max_workers=io_threads) as executor:
+        try:
+            for _ in range(depth):
+                read_next()
+            while reads:
+                job, source_hash, template, timings, future = reads.popleft()
+                read_next()
+                markdown_content = future.result()
+                print(f"Generating page from {job.source} to {job.dest}")
+                summary = PageSummary() if collect else None
+                with (timings or NULL_TIMINGS).profiled():
+                    html = "".join(
+                        render_page(
+                            markdown_content,
+                            template,
+                            basepath,
+                            timings,
+                            parse_cache,
+                            summary,
+                            images,
+                        )
+                    )
+                future = executor.submit(
+                    write_page, job.dest, [html], timings, made_dirs
+                )
+                writes.append((job, source_hash, template, timings, summary, future))
+                if len(writes) > depth:
+                    finish_write()
+            while writes:
+                finish_write()
+        except BaseException:
+            for *_, future in reads:
+                future.cancel()
+            # Keep the pages rendered before the failure, as a serial build does
+            while writes:
+                try:
+                    finish_write()
+                except Exception:
+                    pass
+            raise
+
+
+def generate_pages(
+    pages,
+    template,
+    basepath="/",
+    manifest=None,
+    jobs=1,
+    profiler=None,
+    parse_cache=None,
+    io_threads=0,
+    collect=False,
+    metadata=None,
+    images=None,
+):
+    """
+    Generate a list of pages, optionally across a pool of worker processes.
+
+    Each page gets its template from a TemplateSet, by the name in its front
+    matter or else by its directory, and the manifest records the template
+    files it used. Pages already up to date in the manifest,
+    including their template, are skipped. With more than one job, every
+    page is attempted and failures are reported together, in the order of
+    the page list, once the pool has finished. A single-process
+    build with io_threads reads sources ahead and writes pages in the
+    background on that many threads, which hides file system latency. With
+    collect, each generated page's PageSummary is kept by the manifest
+    for run_collectors(), and skipped pages without one are regenerated.
+    Pages are sized with the ImageSet, if given, and regenerated when its
+    fingerprint changes.
+
+    Args:
+        pages (list): BuildJob objects from a BuildPlan, or (source_path,
+            dest_path) tuples from collect_pages()
+        template (str, CompiledTemplate or TemplateSet): Template of every
+            page or path to one, or a TemplateSet choosing one per page
+        basepath (str): Base path for generated links
+        manifest (BuildManifest): Optional manifest for incremental builds
+        jobs (int): Number of worker processes; 0 means one per CPU
+        profiler (BuildProfiler): Optional profiler collecting page timings
+        parse_cache (ParseCache): Optional cache of rendered page content
+        io_threads (int): Threads for background reads and writes in a
+            single-process build; 0 does all file I/O inline
+        collect (bool): Summarize pages for collectors; needs a manifest
+        metadata (MetadataIndex): Optional index of the pages' front matter;
+            without one, the header of every page is read
+        images (ImageSet): Optional processed images of the site
+
+    Raises:
+        BuildError: If any page fails to generate in a parallel build
+    """
+    templates = load_templates(template, basepath)
+    if metadata is None:
+        metadata = MetadataIndex()
+    images_hash = images.fingerprint if images is not None else None
+    version = build_version()
+
+    todo = []
+    for job in map(as_page_job, pages):
+        template = templates.for_source(
+            job.source, metadata.get(job).get("template")
+        )
+        source_hash = None
+        if manifest is not None:
+            # A source whose size and mtime match the manifest is not rehashed
+            source_hash = manifest.cached_source_hash(
+                job.dest, job.mtime_ns, job.size
+            ) or hash_file(job.source)
+            if manifest.is_fresh(
+                job.dest,
+                source_hash,
+                template.hash,
+                basepath,
+                job.mtime_ns,
+                job.size,
+                images_hash,
+                version,
+            ) and (not collect or manifest.summary(job.dest) is not None):
+                continue
+        todo.append((job, source_hash, template))
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1 or len(todo) < 2:
+        if io_threads and len(todo) > 1:
+            _generate_pages_pipelined(
+                todo,
+                basepath,
+                manifest,
+                profiler,
+                parse_cache,
+                io_threads,
+                collect,
+                images,
+            )
+            return
+        for job, source_hash, template in todo:
+            timings = profiler.page(job.source) if profiler is not None else None
+            summary = PageSummary() if collect else None
+            generate_page(
+                job.source,
+                template,
+                job.dest,
+                basepath,
+                timings,
+                parse_cache,
+                summary,
+                images,
+            )
+            if profiler is not None:
+                profiler.add(timings)
+            if manifest is not None:
+                _record(manifest, job, source_hash, template, basepath, summary, images)
+        return
+
+    failures = []
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(todo)),
+        initializer=_init_worker,
+        initargs=(get_inline_parser(), inline_cache_info().maxsize),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _generate_page_in_worker,
+                job.source,
+                template,
+                job.dest,
+                basepath,
+                profiler.page(job.source) if profiler is not None else None,
+                parse_cache,
+                collect,
+                images,
+            )
+            for job, _, template in todo
+        ]
+        for (job, source_hash, template), future in zip(todo, futures):
+            try:
+                timings, summary = future.result()
+            except Exception as error:
+                failures.append((job.source, error))
+                continue
+            if profiler is not None:
+                profiler.add(timings)
+            if manifest is not None:
+                _record(manifest, job, source_hash, template, basepath, summary, images)
+
+    if failures:
+        raise BuildError(failures)
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template,
+    dest_dir_path,
+    basepath="/",
+    manifest=None,
+    jobs=1,
+    profiler=None,
+    parse_cache=None,
+    io_threads=0,
+    collect=False,
+    metadata=None,
+    images=None,
+):
+    pages, _ = scan_tree(dir_path_content, dest_dir_path, PAGE)
+    generate_pages(
+        pages,
+        template,
+        basepath,
+        manifest,
+        jobs,
+        profiler,
+        parse_cache,
+        io_threads,
+        collect,
+        metadata,
+        images,
+    )
@@ -1,4 +1,7 @@
 class HTMLNode:
+    # Pages create thousands of nodes; slots avoid a __dict__ per instance
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -6,6 +9,10 @@ class HTMLNode:
         self.children = children
 
     def to_html(self):
+        return "".join(self.to_html_chunks())
+
+    def to_html_chunks(self):
+        """Yield the node's HTML as a sequence of string fragments."""
         raise NotImplementedError("Subclasses should implement this method")
 
     def props_to_html(self):
@@ -0,0 +1,414 @@
+"""Resized variants of the site's PNG images, and the <img> props using them.
+
+Every PNG under static/images/ gets narrower copies at a few fixed widths,
+recompressed, in a _variants directory next to it in the output:
+images/tom.png gives images/_variants/tom-480w.png and so on. The directory
+is reserved; a static file that is in the way of a variant is kept, and the
+variant is not made. Image tags of pages that show a processed
+image get its intrinsic width and height, which lets the browser lay the
+page out before the image arrives, and a srcset listing the variants, so
+small screens download a small file.
+
+Variants are cached in .cache/images/ under the hash of the image they were
+made from, and the hash of each image is kept with its size and mtime, so a
+build where no image changed neither decodes nor hashes any of them. The
+variants of an image that was edited or removed are dropped from the cache.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from copystatic import place_file
+from leafnode import LeafNode
+from manifest import atomic_write, hash_file, remove_empty_dirs
+from parentnode import ParentNode
+from png import decode_png, drop_opaque_alpha, encode_png, read_png_size, resize
+
+IMAGE_CACHE_DIRNAME = os.path.join(".cache", "images")
+IMAGE_CACHE_VERSION = 1
+IMAGE_DIR = "images"
+# Subdirectory next to each image that its variants go in
+VARIANT_DIRNAME = "_variants"
+VARIANT_WIDTHS = (480, 960)
+
+
+class ImageInfo:
+    """
+    Dimensions of an image and the variants made of it.
+
+    Args:
+        width (int): Width of the original, in pixels
+        height (int): Height of the original, in pixels
+        variants (list): (width, url) pairs of the narrower variants,
+            narrowest first
+    """
+
+    __slots__ = ("width", "height", "variants")
+
+    def __init__(self, width, height, variants=()):
+        self.width = width
+        self.height = height
+        self.variants = list(variants)
+
+    def props(self, src):
+        """
+        Return the props an <img> showing the image gets.
+
+        Args:
+            src (str): URL of the original, the last candidate of srcset
+
+        Returns:
+            dict: width and height, plus srcset and sizes if there are variants
+        """
+        props = {"width": str(self.width), "height": str(self.height)}
+        if self.variants:
+            candidates = [f"{url} {width}w" for width, url in self.variants]
+            candidates.append(f"{src} {self.width}w")
+            props["srcset"] = ", ".join(candidates)
+            props["sizes"] = f"(max-width: {self.width}px) 100vw, {self.width}px"
+        return props
+
+    def __repr__(self):
+        widths = [width for width, _ in self.variants]
+        return f"ImageInfo({self.width}x{self.height}, variants={widths})"
+
+
+class ImageSet:
+    """
+    The processed images of a site, keyed by the root-relative URL of each.
+
+    Args:
+        images (dict): Maps URLs such as "/images/tom.png" to ImageInfo
+    """
+
+    def __init__(self, images=None):
+        self.images = images if images is not None else {}
+        self._fingerprint = None
+
+    def get(self, src):
+        """Return the ImageInfo of an <img> src, or None if it is not processed."""
+        return self.images.get(src)
+
+    @property
+    def fingerprint(self):
+        """
+        Hash of every image's dimensions and variants, or None if there are none.
+
+        Pages rendered with the set depend on it, rather than on the image
+        files: replacing an image with one of the same size changes nothing.
+        """
+        if not self.images:
+            return None
+        if self._fingerprint is None:
+            data = [
+                [src, info.width, info.height, [width for width, _ in info.variants]]
+                for src, info in sorted(self.images.items())
+            ]
+            digest = hashlib.sha256(json.dumps(data).encode("utf-8"))
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def __len__(self):
+        return len(self.images)
+
+
+def add_image_sizes(node, images):
+    """
+    Give the <img> nodes of a tree the props of the images they show.
+
+    The tree is not modified: as in rebase_links(), image nodes are copied,
+    along with their ancestors, and every other subtree is shared with the
+    input, so nodes cached by the inline parser are never touched.
+
+    Args:
+        node (HTMLNode): Root of the tree
+        images (ImageSet): Processed images of the site
+
+    Returns:
+        HTMLNode: The tree with sized images
+    """
+    if node.tag == "img":
+        src = node.props.get("src") if node.props else None
+        info = images.get(src)
+        if info is None:
+            return node
+        return LeafNode(node.tag, node.value, {**node.props, **info.props(src)})
+
+    children = node.children
+    if not children:
+        return node
+    sized = [add_image_sizes(child, images) for child in children]
+    if all(new is old for new, old in zip(sized, children)):
+        return node
+    return ParentNode(node.tag, sized, node.props)
+
+
+def width_list(value):
+    """
+    Parse a comma-separated list of variant widths, for argparse.
+
+    Raises:
+        argparse.ArgumentTypeError: If a width is not a positive integer
+    """
+    try:
+        widths = [int(width) for width in value.split(",") if width.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid width list: {value!r}")
+    if any(width < 1 for width in widths):
+        raise argparse.ArgumentTypeError("image widths must be positive integers")
+    return widths
+
+
+def variant_key(key, width):
+    """Return the output key of a variant, e.g. "images/_variants/tom-480w.png"."""
+    directory, slash, filename = key.rpartition("/")
+    stem, ext = os.path.splitext(filename)
+    return f"{directory}{slash}{VARIANT_DIRNAME}/{stem}-{width}w{ext}"
+
+
+class ImagePipeline:
+    """
+    Makes, caches and places the resized variants of a site's PNG images.
+
+    Args:
+        cache_dir (str): Directory the variants are cached in
+        widths (tuple): Widths to make variants at; an image gets those
+            narrower than itself
+        image_dir (str): Static subdirectory whose PNGs are processed
+    """
+
+    def __init__(self, cache_dir, widths=VARIANT_WIDTHS, image_dir=IMAGE_DIR):
+        self.cache_dir = cache_dir
+        self.widths = tuple(sorted(set(widths)))
+        self.image_dir = image_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.sources = {}
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != IMAGE_CACHE_VERSION:
+            return {}
+        return data.get("sources", {})
+
+    def _save_index(self):
+        data = {"version": IMAGE_CACHE_VERSION, "sources": self.sources}
+        atomic_write(self.index_path, json.dumps(data, sort_keys=True).encode("utf-8"))
+
+    def _source_hash(self, job):
+        # An image whose size and mtime match the index is not hashed again
+        entry = self.sources.get(job.key)
+        if (
+            entry is not None
+            and job.mtime_ns is not None
+            and entry["mtime_ns"] == job.mtime_ns
+            and entry["size"] == job.size
+        ):
+            return entry["hash"]
+        source_hash = hash_file(job.source)
+        self.sources[job.key] = {
+            "mtime_ns": job.mtime_ns,
+            "size": job.size,
+            "hash": source_hash,
+        }
+        return source_hash
+
+    def _cache_path(self, source_hash, suffix):
+        return os.path.join(self.cache_dir, source_hash[:2], source_hash + suffix)
+
+    def _plan(self, job):
+        # Dimensions and cached variants of an image, without decoding it
+        source_hash = self._source_hash(job)
+        info_path = self._cache_path(source_hash, ".json")
+        try:
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            cached = True
+        except (OSError, ValueError):
+            with open(job.source, "rb") as f:
+                width, height = read_png_size(f.read(24))
+            info = {"width": width, "height": height}
+            cached = False
+            os.makedirs(os.path.dirname(info_path), exist_ok=True)
+        wanted = []
+        if "error" not in info:
+            wanted = [w for w in self.widths if w < info["width"]]
+        paths = {w: self._cache_path(source_hash, f"-{w}w.png") for w in wanted}
+        missing = {w: path for w, path in paths.items() if not os.path.isfile(path)}
+        return info_path, info, cached, paths, missing
+
+    def _make_variants(self, todo, workers):
+        # Returns make_variants() results in the order of todo
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        sources = [job.source for job, _ in todo]
+        targets = [missing for _, missing in todo]
+        if workers == 1 or len(todo) < 2:
+            return list(map(make_variants, sources, targets))
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as executor:
+            return list(executor.map(make_variants, sources, targets))
+
+    def prune(self):
+        """
+        Delete cached variants of images no longer in the index.
+
+        Returns:
+            int: Number of files removed
+        """
+        live = {entry["hash"] for entry in self.sources.values()}
+        removed = 0
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                subdirs = [entry.path for entry in entries if entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        for subdir in subdirs:
+            with os.scandir(subdir) as entries:
+                # Files are named <hash>.json or <hash>-<width>w.png
+                stale = [entry.path for entry in entries if entry.name[:64] not in live]
+            for path in stale:
+                os.remove(path)
+            removed += len(stale)
+            remove_empty_dirs(self.cache_dir, subdir)
+        return removed
+
+    def process(self, jobs, dest_dir_path, manifest=None, link=True, workers=1):
+        """
+        Bring the image variants in the output up to date.
+
+        Variants already in place, linked to the cached file or a copy of
+        it with the same size and mtime, are left alone without reading
+        either. Images whose variants are missing from the cache are resized
+        on workers processes, each image decoded once for all its widths.
+        A variant whose key is taken by a static file is skipped. When a
+        manifest is given, variants it lists that this build did not produce
+        are removed, and its variant list is updated. Cached variants of
+        images that were edited or removed are deleted.
+
+        Args:
+            jobs (list): Static BuildJob objects from a BuildPlan
+            dest_dir_path (str): Output directory
+            manifest (BuildManifest): Optional manifest of the output directory
+            link (bool): Allow reflinks and hard links instead of copies
+            workers (int): Processes to resize images on; 0 means one per CPU
+
+        Returns:
+            ImageSet: The processed images, for add_image_sizes()
+        """
+        self.sources = self._load_index()
+        prefix = self.image_dir + "/"
+        planned = []
+        for job in jobs:
+            if not job.key.startswith(prefix) or not job.key.lower().endswith(".png"):
+                continue
+            try:
+                planned.append((job, *self._plan(job)))
+            except ValueError as error:
+                print(f"Skipping image {job.key}: {error}")
+
+        todo = [(job, missing) for job, *_, missing in planned if missing]
+        errors = dict(
+            zip((job.key for job, _ in todo), self._make_variants(todo, workers))
+        )
+        static_keys = {job.key for job in jobs}
+        images = {}
+        produced = []
+        updated = []
+        for job, info_path, info, cached, paths, missing in planned:
+            error = errors.get(job.key)
+            if error is not None:
+                print(f"Not resizing image {job.key}: {error}")
+                info["error"] = error
+                paths = {}
+            if not cached or error is not None:
+                atomic_write(info_path, json.dumps(info).encode("utf-8"))
+            variants = []
+            for variant_width, cache_path in sorted(paths.items()):
+                key = variant_key(job.key, variant_width)
+                if key in static_keys:
+                    print(f"Not placing variant {key}: a static file has that path")
+                    continue
+                dest_path = os.path.join(dest_dir_path, *key.split("/"))
+                if not _is_placed(cache_path, dest_path):
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    place_file(cache_path, dest_path, link)
+                    updated.append(key)
+                produced.append(key)
+                variants.append((variant_width, "/" + key))
+            images["/" + job.key] = ImageInfo(info["width"], info["height"], variants)
+
+        removed = []
+        if manifest is not None:
+            # A static file now at a variant's old path belongs to sync_static
+            for key in sorted(set(manifest.variants) - set(produced) - static_keys):
+                dest_path = os.path.join(dest_dir_path, *key.split("/"))
+                if os.path.isfile(dest_path):
+                    os.remove(dest_path)
+                    remove_empty_dirs(dest_dir_path, os.path.dirname(dest_path))
+                removed.append(key)
+            manifest.variants = produced
+
+        # Forget the images that are gone from static/, then their variants
+        self.sources = {
+            key: entry for key, entry in self.sources.items() if key in static_keys
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._save_index()
+        self.prune()
+
+        for key in updated:
+            print(f" * {key}")
+        for key in removed:
+            print(f" - {key}")
+        print(
+            f"Images: {len(images)} found, {len(todo)} resized, "
+            f"{len(updated)} variant(s) updated, {len(removed)} removed"
+        )
+        return ImageSet(images)
+
+
+def make_variants(source_path, targets):
+    """
+    Decode an image once and write a resized copy of it for each width.
+
+    Runs in pool processes, so it only takes and returns plain values.
+
+    Args:
+        source_path (str): PNG image to resize
+        targets (dict): Maps each width to the file to write the variant to
+
+    Returns:
+        str: None, or why the image cannot be decoded
+    """
+    with open(source_path, "rb") as f:
+        data = f.read()
+    try:
+        image = drop_opaque_alpha(decode_png(data))
+    except ValueError as error:
+        return str(error)
+    for width, path in sorted(targets.items()):
+        atomic_write(path, encode_png(resize(image, width)))
+    return None
+
+
+def _is_placed(cache_path, dest_path):
+    # As in sync_static: a link to the cached variant, or a copy with its size
+    # and mtime, is up to date. Cached variants are named by the hash of their
+    # image, so a different variant is always a different cache file
+    try:
+        cache_stat = os.stat(cache_path)
+        dest_stat = os.stat(dest_path)
+    except OSError:
+        return False
+    if (dest_stat.st_ino, dest_stat.st_dev) == (cache_stat.st_ino, cache_stat.st_dev):
+        return True
+    return (
+        dest_stat.st_size == cache_stat.st_size
+        and dest_stat.st_mtime_ns == cache_stat.st_mtime_ns
+    )
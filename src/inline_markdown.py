@@ -1,6 +1,41 @@
-import re
 from textnode import TextNode, TextType
 from split_delimiter import split_nodes_delimiter
+from inline_scanner import scan_inline
+# The syntax registry is re-exported so extensions can register from here
+from inline_patterns import (
+    IMAGE_PATTERN,
+    LINK_PATTERN,
+    InlineSyntax,
+    extra_syntax_pattern,
+    inline_syntax,
+    inline_syntaxes,
+    register_inline_syntax,
+    unregister_inline_syntax,
+)
+
+INLINE_PARSERS = ("split", "scan")
+_inline_parser = "split"
+
+
+def set_inline_parser(name):
+    """Select the default inline parser used by text_to_textnodes.
+
+    Args:
+        name (str): "split" for the multi-pass split_nodes functions, or
+            "scan" for the single-scan tokenizer
+
+    Raises:
+        ValueError: If the parser name is unknown
+    """
+    global _inline_parser
+    if name not in INLINE_PARSERS:
+        raise ValueError(f"Unknown inline parser: {name}")
+    _inline_parser = name
+
+
+def get_inline_parser():
+    """Return the name of the default inline parser."""
+    return _inline_parser
 
 
 def extract_markdown_images(text):
@@ -12,8 +47,7 @@ def extract_markdown_images(text):
     Returns:
         list: List of tuples (alt_text, url) for each image found
     """
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
@@ -25,8 +59,7 @@ def extract_markdown_links(text):
     Returns:
         list: List of tuples (link_text, url) for each link found
     """
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    return re.findall(pattern, text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes):
@@ -117,15 +150,56 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
-def text_to_textnodes(text):
+def split_nodes_syntaxes(old_nodes):
+    """Split out every registered span syntax beyond links and images in one pass.
+
+    Args:
+        old_nodes (list): List of TextNode objects
+
+    Returns:
+        list: List of TextNode objects with registered spans split out
+    """
+    pattern = extra_syntax_pattern()
+    if pattern is None:
+        return old_nodes
+    new_nodes = []
+
+    for old_node in old_nodes:
+        if old_node.text_type != TextType.TEXT:
+            new_nodes.append(old_node)
+            continue
+
+        text = old_node.text
+        pos = 0
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if start > pos:
+                new_nodes.append(TextNode(text[pos:start], TextType.TEXT))
+            new_nodes.append(inline_syntax(match.lastgroup).to_node(match))
+            pos = end
+
+        if pos == 0:
+            new_nodes.append(old_node)
+        elif pos < len(text):
+            new_nodes.append(TextNode(text[pos:], TextType.TEXT))
+
+    return new_nodes
+
+
+def text_to_textnodes(text, parser=None):
     """Convert text with inline markdown to TextNodes.
 
     Args:
         text (str): Raw text potentially containing inline markdown
+        parser (str): "split" or "scan"; defaults to the parser chosen with
+            set_inline_parser()
 
     Returns:
         list: List of TextNode objects representing the parsed text
     """
+    if (parser or _inline_parser) == "scan":
+        return scan_inline(text)
+
     initial_node = TextNode(text, TextType.TEXT)
     nodes = [initial_node]
 
@@ -138,4 +212,7 @@ def text_to_textnodes(text):
     nodes = split_nodes_image(nodes)
     nodes = split_nodes_link(nodes)
 
+    # Then any syntaxes registered beyond those, all in a single pass
+    nodes = split_nodes_syntaxes(nodes)
+
     return nodes
@@ -0,0 +1,178 @@
+"""Compiled inline markdown patterns shared by every inline parsing path.
+
+Patterns are compiled once at import, so parsing a text node never goes
+through the re module's pattern cache. Span syntaxes, such as links and
+images, live in a registry: the single-scan parser matches all of them with
+one combined pattern, and the multi-pass parser splits every syntax beyond
+the built-in ones out in one extra pass, so registering a syntax never adds
+a pass per syntax.
+"""
+
+import hashlib
+import re
+
+from textnode import TextNode, TextType
+
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# Link and image spans in the scanner never contain a delimiter, so that a
+# span crossing a "**", "_" or "`" is split by the delimiter first, as in the
+# split_nodes path. Written unrolled, as normal* (special normal*)*, so each
+# run of ordinary characters is eaten by one character class rather than by
+# trying an alternation per character.
+SPAN_TEXT = r"[^\[\]_`*]*(?:\*(?!\*)[^\[\]_`*]*)*"
+SPAN_URL = r"[^\(\)_`*]*(?:\*(?!\*)[^\(\)_`*]*)*"
+
+DELIMITER_TOKENS = r"(?P<bold>\*\*)|(?P<italic>_)|(?P<code>`)"
+BUILTIN_SYNTAXES = ("image", "link")
+
+
+class InlineSyntax:
+    """
+    A span syntax recognized by the inline parsers.
+
+    Args:
+        name (str): Identifier of the syntax, also the name of the group that
+            wraps its pattern in the combined pattern
+        pattern (str): Regular expression for one whole span; its groups must
+            be named, and prefixed with name so they stay unique
+        to_node (callable): Builds the TextNode for a match object
+    """
+
+    __slots__ = ("name", "pattern", "to_node")
+
+    def __init__(self, name, pattern, to_node):
+        self.name = name
+        self.pattern = pattern
+        self.to_node = to_node
+
+    def __repr__(self):
+        return f"InlineSyntax({self.name}, {self.pattern!r})"
+
+
+_syntaxes = {}
+_listeners = []
+_token_pattern = None
+_extra_pattern = None
+
+
+def _combine(syntaxes, prefix=""):
+    alternatives = [f"(?P<{syntax.name}>{syntax.pattern})" for syntax in syntaxes]
+    if prefix:
+        alternatives.insert(0, prefix)
+    return re.compile("|".join(alternatives))
+
+
+def _rebuild():
+    global _token_pattern, _extra_pattern
+    syntaxes = list(_syntaxes.values())
+    extras = [syntax for syntax in syntaxes if syntax.name not in BUILTIN_SYNTAXES]
+    _token_pattern = _combine(syntaxes, DELIMITER_TOKENS)
+    _extra_pattern = _combine(extras) if extras else None
+    for listener in _listeners:
+        listener()
+
+
+def register_inline_syntax(name, pattern, to_node):
+    """
+    Add a span syntax to both inline parsers.
+
+    Syntaxes are tried in registration order after the delimiters, and the
+    inline parse cache is cleared. Register syntaxes before building, so pool
+    workers and the on-disk parse cache see them too.
+
+    Args:
+        name (str): Identifier of the syntax
+        pattern (str): Regular expression for one whole span, with named groups
+        to_node (callable): Builds the TextNode for a match object
+
+    Returns:
+        InlineSyntax: The registered syntax
+
+    Raises:
+        ValueError: If the name is taken or the pattern does not compile
+    """
+    if not name.isidentifier() or name in ("bold", "italic", "code"):
+        raise ValueError(f"Invalid inline syntax name: {name}")
+    if name in _syntaxes:
+        raise ValueError(f"Inline syntax already registered: {name}")
+    syntax = InlineSyntax(name, pattern, to_node)
+    _syntaxes[name] = syntax
+    try:
+        _rebuild()
+    except re.error as error:
+        del _syntaxes[name]
+        _rebuild()
+        raise ValueError(f"Invalid pattern for inline syntax {name}: {error}")
+    return syntax
+
+
+def unregister_inline_syntax(name):
+    """Remove a registered span syntax."""
+    del _syntaxes[name]
+    _rebuild()
+
+
+def inline_syntax(name):
+    """Return the registered span syntax called name."""
+    return _syntaxes[name]
+
+
+def inline_syntaxes():
+    """Return the registered span syntaxes in the order they are tried."""
+    return tuple(_syntaxes.values())
+
+
+def add_registry_listener(listener):
+    """Call listener() whenever a syntax is registered or removed."""
+    _listeners.append(listener)
+
+
+def token_pattern():
+    """Return the scanner's pattern: delimiters, then every span syntax."""
+    return _token_pattern
+
+
+def extra_syntax_pattern():
+    """Return the pattern of the non-built-in syntaxes, or None if there are none."""
+    return _extra_pattern
+
+
+def syntax_fingerprint():
+    """
+    Identify the non-built-in syntaxes, for caches of parsed output.
+
+    Returns:
+        str: A short hash of their names and patterns, or "" if there are none
+    """
+    extras = [
+        f"{syntax.name}={syntax.pattern}"
+        for syntax in _syntaxes.values()
+        if syntax.name not in BUILTIN_SYNTAXES
+    ]
+    if not extras:
+        return ""
+    return hashlib.sha256("\n".join(extras).encode("utf-8")).hexdigest()[:12]
+
+
+def _image_node(match):
+    alt, url = match.group("image_alt", "image_url")
+    return TextNode(alt, TextType.IMAGE, url)
+
+
+def _link_node(match):
+    text, url = match.group("link_text", "link_url")
+    return TextNode(text, TextType.LINK, url)
+
+
+register_inline_syntax(
+    "image",
+    rf"!\[(?P<image_alt>{SPAN_TEXT})\]\((?P<image_url>{SPAN_URL})\)",
+    _image_node,
+)
+register_inline_syntax(
+    "link",
+    rf"(?<!!)\[(?P<link_text>{SPAN_TEXT})\]\((?P<link_url>{SPAN_URL})\)",
+    _link_node,
+)
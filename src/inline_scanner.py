@@ -0,0 +1,83 @@
+from textnode import TextNode, TextType
+from split_delimiter import split_nodes_delimiter
+from inline_patterns import inline_syntax, token_pattern
+
+
+def _unmatched(text, delimiter):
+    # Replay the delimiter passes so the error names the same delimiter as
+    # the multi-pass parser would; this only runs on invalid input.
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    split_nodes_delimiter(nodes, "`", TextType.CODE)
+    return ValueError(
+        f"Invalid markdown syntax: matching closing delimiter '{delimiter}' not found"
+    )
+
+
+def scan_inline(text):
+    """Convert text with inline markdown to TextNodes in a single scan.
+
+    Produces the same nodes as running split_nodes_delimiter for bold, italic
+    and code, then split_nodes_image and split_nodes_link, but walks the text
+    once: one compiled pattern finds the next delimiter or registered span
+    syntax and str.find locates the closing delimiter. As in the multi-pass path, bold takes precedence over
+    italic, which takes precedence over code, so a higher-precedence
+    delimiter inside a lower one is an unmatched-delimiter error.
+
+    Args:
+        text (str): Raw text potentially containing inline markdown
+
+    Returns:
+        list: List of TextNode objects representing the parsed text
+
+    Raises:
+        ValueError: If a delimiter has no matching closing delimiter
+    """
+    nodes = []
+    pos = 0
+    length = len(text)
+    search = token_pattern().search
+
+    while pos < length:
+        match = search(text, pos)
+        if match is None:
+            nodes.append(TextNode(text[pos:], TextType.TEXT))
+            break
+
+        start = match.start()
+        if start > pos:
+            nodes.append(TextNode(text[pos:start], TextType.TEXT))
+        end = match.end()
+        kind = match.lastgroup
+
+        if kind == "bold":
+            close = text.find("**", end)
+            if close == -1:
+                raise _unmatched(text, "**")
+            if close > end:
+                nodes.append(TextNode(text[end:close], TextType.BOLD))
+            pos = close + 2
+        elif kind == "italic":
+            close = text.find("_", end)
+            if close == -1 or text.find("**", end, close) != -1:
+                raise _unmatched(text, "_")
+            if close > end:
+                nodes.append(TextNode(text[end:close], TextType.ITALIC))
+            pos = close + 1
+        elif kind == "code":
+            close = text.find("`", end)
+            if (
+                close == -1
+                or text.find("**", end, close) != -1
+                or text.find("_", end, close) != -1
+            ):
+                raise _unmatched(text, "`")
+            if close > end:
+                nodes.append(TextNode(text[end:close], TextType.CODE))
+            pos = close + 1
+        else:
+            nodes.append(inline_syntax(kind).to_node(match))
+            pos = end
+
+    return nodes
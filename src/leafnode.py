@@ -2,18 +2,21 @@ from htmlnode import HTMLNode
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
-    def to_html(self):
+    def to_html_chunks(self):
         if self.value is None:
             raise ValueError("All leaf nodes must have a value")
 
         if self.tag is None:
-            return self.value
+            yield self.value
+            return
 
         props_html = ""
         if self.props:
             props_html = " " + self.props_to_html().strip()
 
-        return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
+        yield f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
@@ -0,0 +1,278 @@
+"""Blog archive, tag and pagination pages generated from the metadata index.
+
+Posts are the pages at content/blog/<slug>/index.md, newest first by their
+front matter date. Each listing page is built as a node tree, the same
+shape a markdown list of links would parse to, and rendered through
+render_node() and the page's template like any other page, so it takes the
+blog directory's template. Titles and tags go into text nodes as they are,
+never through the markdown parser, so a title such as "snake_case names"
+shows as written. A listing is built from the index alone, without reading
+a post, and the hash of its HTML is recorded in the build manifest, so only
+the listings whose posts were added, removed or edited in a way they show
+are regenerated.
+"""
+
+import html
+import os
+import re
+
+from build_plan import page_output_path
+from collectors import PageSummary, page_url
+from generate_page import build_version, render_node, write_page
+from leafnode import LeafNode
+from metadata_index import is_draft
+from parentnode import ParentNode
+from template import hash_text
+
+BLOG_SECTION = "blog"
+PAGE_SIZE = 10
+
+
+class Listing:
+    """
+    One page of a post list.
+
+    Args:
+        key (str): Output path of the page, e.g. "blog/page/2/index.html"
+        title (str): Heading of the list, without the page number
+        posts (list): (key, metadata) pairs of the posts on this page
+        number (int): Page number, from 1
+        count (int): Number of pages in the list
+        newer (str): Key of the previous page, or None on the first
+        older (str): Key of the next page, or None on the last
+    """
+
+    __slots__ = ("key", "title", "posts", "number", "count", "newer", "older")
+
+    def __init__(self, key, title, posts, number=1, count=1, newer=None, older=None):
+        self.key = key
+        self.title = title
+        self.posts = posts
+        self.number = number
+        self.count = count
+        self.newer = newer
+        self.older = older
+
+    def source_key(self):
+        """Return the content path the page stands in for, to pick its template."""
+        return self.key[: -len(".html")] + ".md"
+
+    def heading(self):
+        """Return the page's title, with the page number on a paginated list."""
+        if self.count > 1:
+            return f"{self.title} (page {self.number} of {self.count})"
+        return self.title
+
+    def to_node(self):
+        """
+        Return the content of the page as a node tree.
+
+        Returns:
+            ParentNode: A div with the heading, a list of links to the posts
+            and, on a paginated list, a paragraph of links to the other pages
+        """
+        children = [LeafNode("h1", _text(self.heading()))]
+        items = []
+        for key, metadata in self.posts:
+            title = _text(metadata.get("title", key))
+            item = [LeafNode("a", title, {"href": page_url(key)})]
+            date = metadata.get("date")
+            if date:
+                item.append(LeafNode(None, _text(f" ({date})")))
+            items.append(ParentNode("li", item))
+        if items:
+            children.append(ParentNode("ul", items))
+        links = []
+        if self.newer is not None:
+            links.append(LeafNode("a", "Newer posts", {"href": page_url(self.newer)}))
+        if self.older is not None:
+            if links:
+                links.append(LeafNode(None, " "))
+            links.append(LeafNode("a", "Older posts", {"href": page_url(self.older)}))
+        if links:
+            children.append(ParentNode("p", links))
+        return ParentNode("div", children)
+
+    def __repr__(self):
+        return f"Listing({self.key}, {len(self.posts)} posts)"
+
+
+def _text(value):
+    return html.escape(str(value), quote=False)
+
+
+def tag_slug(tag):
+    """Return the URL segment of a tag, e.g. "middle-earth" for "Middle Earth"."""
+    return re.sub(r"[^\w-]+", "-", tag.strip()).strip("-").lower()
+
+
+def blog_posts(index, section=BLOG_SECTION, drafts=False):
+    """
+    List the posts of a section, newest first.
+
+    Args:
+        index (MetadataIndex): Metadata of every page
+        section (str): Content directory holding one directory per post
+        drafts (bool): Include posts marked as drafts
+
+    Returns:
+        list: (key, metadata) pairs, keyed by output path, sorted by date
+        from newest to oldest and then by path; undated posts come last
+    """
+    posts = []
+    for source_key, metadata in index.pages():
+        parts = source_key.split("/")
+        if len(parts) != 3 or parts[0] != section or parts[2] != "index.md":
+            continue
+        if is_draft(metadata) and not drafts:
+            continue
+        posts.append((page_output_path(source_key), metadata))
+    posts.sort(key=lambda post: post[0])
+    posts.sort(key=lambda post: str(post[1].get("date", "")), reverse=True)
+    return posts
+
+
+def paginate(key_dir, title, posts, page_size=PAGE_SIZE):
+    """
+    Split a post list into pages at key_dir/index.html, key_dir/page/2/...
+
+    Returns:
+        list: Listing objects, one per page
+    """
+    chunks = [posts[i : i + page_size] for i in range(0, len(posts), page_size)]
+    keys = [f"{key_dir}/index.html"] + [
+        f"{key_dir}/page/{number}/index.html" for number in range(2, len(chunks) + 1)
+    ]
+    return [
+        Listing(
+            key,
+            title,
+            chunk,
+            number,
+            len(chunks),
+            keys[number - 2] if number > 1 else None,
+            keys[number] if number < len(keys) else None,
+        )
+        for number, (key, chunk) in enumerate(zip(keys, chunks), 1)
+    ]
+
+
+def plan_listings(posts, section=BLOG_SECTION, page_size=PAGE_SIZE):
+    """
+    Lay out the archive and tag pages for a list of posts.
+
+    Args:
+        posts (list): (key, metadata) pairs from blog_posts()
+        section (str): Directory the listings go in
+        page_size (int): Posts per page
+
+    Returns:
+        list: Listing objects: the archive at <section>/index.html, then each
+        tag's list at <section>/tags/<tag>/index.html, all paginated
+    """
+    listings = paginate(section, "Blog", posts, page_size)
+    tags = {}
+    for post in posts:
+        metadata = post[1]
+        post_tags = metadata.get("tags", [])
+        if isinstance(post_tags, str):
+            post_tags = [post_tags]
+        for tag in post_tags:
+            slug = tag_slug(str(tag))
+            if slug:
+                tags.setdefault(slug, (tag, []))[1].append(post)
+    for slug, (tag, tagged) in sorted(tags.items()):
+        listings += paginate(
+            f"{section}/tags/{slug}", f'Posts tagged "{tag}"', tagged, page_size
+        )
+    return listings
+
+
+def site_listings(index, page_size=PAGE_SIZE, drafts=False):
+    """
+    Lay out the listing pages of a site, leaving out those content/ takes.
+
+    Args:
+        index (MetadataIndex): Metadata of every page, drafts included
+        page_size (int): Posts per page
+        drafts (bool): List posts marked as drafts
+
+    Returns:
+        list: Listing objects, as from plan_listings(), whose output path no
+        page in the index is written to
+    """
+    taken = {page_output_path(source_key) for source_key, _ in index.pages()}
+    listings = plan_listings(blog_posts(index, drafts=drafts), page_size=page_size)
+    return [listing for listing in listings if listing.key not in taken]
+
+
+def generate_listings(
+    index,
+    templates,
+    dest_dir_path,
+    basepath="/",
+    manifest=None,
+    page_size=PAGE_SIZE,
+    collect=False,
+    drafts=False,
+):
+    """
+    Generate the blog's listing pages, skipping those already up to date.
+
+    A listing page taken by a page written in content/ is not generated.
+    Listing pages in the manifest that are no longer listed, such as the
+    pages of a tag no post has any more, are deleted.
+
+    Args:
+        index (MetadataIndex): Up-to-date metadata of every page
+        templates (TemplateSet): Templates of the site
+        dest_dir_path (str): Output directory
+        basepath (str): Base path for generated links
+        manifest (BuildManifest): Optional manifest for incremental builds;
+            listing pages are recorded in it without a source
+        page_size (int): Posts per page
+        collect (bool): Summarize pages for collectors; needs a manifest
+        drafts (bool): List posts marked as drafts
+
+    Returns:
+        list: Keys of the listing pages generated, sorted
+    """
+    listed = set()
+    version = build_version()
+    generated = []
+    for listing in site_listings(index, page_size, drafts):
+        listed.add(listing.key)
+        dest_path = os.path.join(dest_dir_path, *listing.key.split("/"))
+        node = listing.to_node()
+        source_hash = hash_text(node.to_html())
+        template = templates.for_page(listing.source_key())
+        if manifest is not None and manifest.is_fresh(
+            dest_path, source_hash, template.hash, basepath, build_version=version
+        ):
+            if not collect or manifest.summary(dest_path) is not None:
+                continue
+        print(f"Generating listing page {listing.key}")
+        summary = PageSummary() if collect else None
+        write_page(
+            dest_path,
+            render_node(node, listing.heading(), template, basepath, summary),
+        )
+        if manifest is not None:
+            manifest.record(
+                dest_path,
+                None,
+                source_hash,
+                template.hash,
+                basepath,
+                summary=summary,
+                dependencies=template.dependencies,
+                build_version=version,
+            )
+        generated.append(listing.key)
+
+    if manifest is not None:
+        for key, entry in sorted(manifest.pages.items()):
+            if entry.get("source") is None and key not in listed:
+                print(f"Removing listing page {key}")
+                manifest.remove(os.path.join(dest_dir_path, *key.split("/")))
+    return sorted(generated)
@@ -1,33 +1,343 @@
+import argparse
 import os
-import shutil
 import sys
 
-from copystatic import copy_files_recursive
-from generate_page import generate_pages_recursive
+from block_markdown import (
+    INLINE_CACHE_SIZE,
+    inline_cache_info,
+    set_inline_cache_size,
+)
+from build_plan import BuildPlan
+from collectors import (
+    SUMMARIES_PATH,
+    SearchIndexCollector,
+    SitemapCollector,
+    run_collectors,
+)
+from copystatic import sync_static
+from devserver import serve_main
+from generate_page import generate_pages
+from images import IMAGE_CACHE_DIRNAME, VARIANT_WIDTHS, ImagePipeline, width_list
+from inline_markdown import INLINE_PARSERS, set_inline_parser
+from listings import PAGE_SIZE, generate_listings
+from manifest import DEPS_FILENAME, MANIFEST_FILENAME, BuildManifest
+from metadata_index import METADATA_INDEX_PATH, MetadataIndex, is_draft
+from parse_cache import PARSE_CACHE_DIRNAME, PARSE_CACHE_SIZE, ParseCache
+from profiling import BuildProfiler
+from staging import StagedOutput
+from template import TemplateSet
 
 
-def main():
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the static site. Use 'main.py serve --watch' to "
+        "serve it with live reload."
+    )
+    parser.add_argument(
+        "basepath", nargs="?", default="/", help="base path for generated links"
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="rebuild every page and drop files the build did not produce "
+        "(implies --staged)",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="build into a hard-linked copy of the docs directory and swap it "
+        "into place at the end, so docs is never half-built",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages whose front matter has draft: true",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        metavar="N",
+        help="posts per page of the generated blog archive and tag pages "
+        f"(default: {PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="generate pages with N worker processes (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=0,
+        metavar="N",
+        help="prefetch sources and write pages on N background threads while "
+        "parsing (single-process builds; default: 0, inline I/O)",
+    )
+    parser.add_argument(
+        "--inline-parser",
+        choices=INLINE_PARSERS,
+        default="split",
+        help="inline markdown parser: multi-pass 'split' or single-scan 'scan'",
+    )
+    parser.add_argument(
+        "--inline-cache-size",
+        type=int,
+        default=INLINE_CACHE_SIZE,
+        metavar="N",
+        help=f"inline spans kept in the parse cache (default: {INLINE_CACHE_SIZE}, "
+        "0 disables it)",
+    )
+    parser.add_argument(
+        "--parse-cache-size",
+        type=int,
+        default=PARSE_CACHE_SIZE // (1024 * 1024),
+        metavar="MB",
+        help="size cap of the on-disk cache of parsed pages in "
+        f"{PARSE_CACHE_DIRNAME} (default: {PARSE_CACHE_SIZE // (1024 * 1024)}, "
+        "0 disables it)",
+    )
+    parser.add_argument(
+        "--sitemap",
+        metavar="URL",
+        help="write sitemap.xml for the site served from URL, e.g. "
+        "https://example.com (page URLs add the base path)",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write a prefix-sharded JSON search index to docs/search/",
+    )
+    parser.add_argument(
+        "--static-hash",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=width_list,
+        default=list(VARIANT_WIDTHS),
+        metavar="W,W",
+        help="widths of the resized variants made of static/images/*.png "
+        f"(default: {','.join(map(str, VARIANT_WIDTHS))}; an empty list makes "
+        "none, but images still get their width and height)",
+    )
+    parser.add_argument(
+        "--no-link",
+        action="store_true",
+        help="always copy static files instead of reflinking or hard linking",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="record per-stage timings for every generated page",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed by --profile (default: 10)",
+    )
+    parser.add_argument(
+        "--cprofile",
+        metavar="GLOB",
+        help="dump cProfile stats for sources matching GLOB (implies --profile)",
+    )
+    args = parser.parse_args(argv)
+    if args.inline_cache_size < 0:
+        parser.error("--inline-cache-size must be zero or a positive integer")
+    if args.parse_cache_size < 0:
+        parser.error("--parse-cache-size must be zero or a positive integer")
+    if args.page_size < 1:
+        parser.error("--page-size must be a positive integer")
+    if args.jobs < 0:
+        parser.error("--jobs must be zero or a positive integer")
+    if args.io_threads < 0:
+        parser.error("--io-threads must be zero or a positive integer")
+    return args
 
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
+
+def main(argv=None, project_root=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if project_root is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        project_root = os.path.dirname(script_dir)
+
+    if argv[:1] == ["serve"]:
+        serve_main(argv[1:], project_root)
+        return
+
+    args = parse_args(argv)
+    basepath = args.basepath
+    set_inline_parser(args.inline_parser)
+    set_inline_cache_size(args.inline_cache_size)
 
     dir_path_static = os.path.join(project_root, "static")
     dir_path_docs = os.path.join(project_root, "docs")
     dir_path_content = os.path.join(project_root, "content")
     template_path = os.path.join(project_root, "template.html")
+    dir_path_templates = os.path.join(project_root, "templates")
+
+    staged = None
+    dir_path_output = dir_path_docs
+    if args.clean or args.staged:
+        print("Staging docs directory...")
+        staged = StagedOutput(dir_path_docs)
+        dir_path_output = staged.begin()
+
+    summaries_path = os.path.join(project_root, SUMMARIES_PATH)
+    if args.clean:
+        # Every page is regenerated; pages identical to the previous
+        # generation keep the staged hard link rather than being rewritten
+        manifest = BuildManifest(dir_path_output, summaries_path=summaries_path)
+    else:
+        manifest = BuildManifest.load(dir_path_output, summaries_path)
+    templates = TemplateSet(
+        template_path, dir_path_templates, dir_path_content, basepath
+    )
+    for path in manifest.graph.changed():
+        print(
+            f"Template {os.path.relpath(path, project_root)} changed, used by "
+            f"{len(manifest.graph.dependents(path))} page(s)"
+        )
+    parse_cache = None
+    if args.parse_cache_size:
+        parse_cache = ParseCache(
+            os.path.join(project_root, PARSE_CACHE_DIRNAME),
+            args.parse_cache_size * 1024 * 1024,
+        )
+    collectors = []
+    if args.sitemap:
+        collectors.append(SitemapCollector(args.sitemap))
+    if args.search_index:
+        collectors.append(SearchIndexCollector())
+    profiler = None
+    if args.profile or args.cprofile:
+        profiler = BuildProfiler(
+            args.profile_top,
+            args.cprofile,
+            os.path.join(project_root, "profiles"),
+        )
 
-    print("Deleting docs directory...")
-    if os.path.exists(dir_path_docs):
-        shutil.rmtree(dir_path_docs)
+    # Walk content/ and static/ once; every later stage works from the plan
+    plan = BuildPlan.scan(dir_path_content, dir_path_static, dir_path_output)
 
-    print("Copying static files to docs directory...")
-    copy_files_recursive(dir_path_static, dir_path_docs)
+    # Front matter comes from page headers, re-read only for changed sources
+    metadata = MetadataIndex.load(
+        dir_path_content, os.path.join(project_root, METADATA_INDEX_PATH)
+    )
+    changed = metadata.update(plan.pages)
+    metadata.save()
+    if changed:
+        print(f"Metadata index: {len(changed)} page(s) added, changed or removed")
+    pages = plan.pages
+    if not args.drafts:
+        # Drafts are not seen by the manifest, so earlier output is pruned
+        pages = [job for job in pages if not is_draft(metadata.get(job))]
+
+    print("Syncing static files to docs directory...")
+    sync_static(
+        plan.static,
+        dir_path_output,
+        manifest,
+        use_hash=args.static_hash,
+        link=not args.no_link,
+        dirs=plan.static_dirs,
+    )
+    print("Resizing images...")
+    images = ImagePipeline(
+        os.path.join(project_root, IMAGE_CACHE_DIRNAME), args.image_widths
+    ).process(
+        plan.static,
+        dir_path_output,
+        manifest,
+        link=not args.no_link,
+        workers=args.jobs,
+    )
 
     print("Generating pages from content directory...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_docs, basepath)
+    try:
+        generate_pages(
+            pages,
+            templates,
+            basepath,
+            manifest,
+            args.jobs,
+            profiler,
+            parse_cache,
+            args.io_threads,
+            bool(collectors),
+            metadata,
+            images,
+        )
+        print("Generating blog listing pages...")
+        generate_listings(
+            metadata,
+            templates,
+            dir_path_output,
+            basepath,
+            manifest,
+            args.page_size,
+            bool(collectors),
+            args.drafts,
+        )
+    except Exception:
+        if staged is not None:
+            # The live docs directory stays exactly as it was
+            staged.abort()
+        else:
+            # Keep the pages that did build, but don't prune after a failure
+            manifest.save()
+        raise
+
+    for key in manifest.prune():
+        print(f"Removed stale page {key}")
+    written, removed = run_collectors(collectors, manifest, basepath)
+    if written:
+        print(f"Collectors wrote {len(written)} file(s)")
+    for key in removed:
+        print(f"Removed stale collector output {key}")
+    manifest.save()
+
+    if staged is not None:
+        if args.clean:
+            keep = {
+                MANIFEST_FILENAME,
+                DEPS_FILENAME,
+                *manifest.pages,
+                *manifest.assets,
+                *manifest.variants,
+            }
+            keep.update(
+                os.path.relpath(path, dir_path_output).replace(os.sep, "/")
+                for path in written
+            )
+            for key in staged.sweep(keep):
+                print(f"Removed untracked file {key}")
+        staged.commit()
+        print("Swapped the new build into the docs directory")
+
+    if parse_cache is not None:
+        evicted, remaining = parse_cache.prune()
+        print(f"Parse cache: {remaining} entries, {evicted} evicted")
+
+    cache = inline_cache_info()
+    lookups = cache.hits + cache.misses
+    if lookups:
+        print(
+            f"Inline cache: {cache.hits} hits, {cache.misses} misses "
+            f"({cache.hits / lookups:.1%} hit rate), {cache.currsize}/{cache.maxsize} "
+            "entries (main process only)"
+        )
+
+    if profiler is not None:
+        print(profiler.summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,565 @@
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_FILENAME = ".ssg-manifest.json"
+MANIFEST_VERSION = 2
+DEPS_FILENAME = ".ssg-deps.json"
+DEPS_VERSION = 1
+SUMMARIES_VERSION = 1
+
+
+def hash_file(path):
+    """
+    Compute the SHA-256 hex digest of a file's contents.
+
+    Args:
+        path (str): Path of the file to hash
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _temp_path(path):
+    # Unique per process and thread, so concurrent writers never collide
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+def atomic_write(path, data):
+    """
+    Write bytes to path so that readers see either the old or the new file.
+
+    The data goes to a temporary file next to path, which then replaces it,
+    so a crash mid-write never leaves a truncated file behind.
+
+    Args:
+        path (str): File to write
+        data (bytes): New contents
+    """
+    temp_path = _temp_path(path)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def write_if_changed(path, data):
+    """
+    Atomically write bytes to path unless it already holds exactly them.
+
+    An unchanged file keeps its modification time, so tools that detect
+    changes by mtime only see files whose contents really changed.
+
+    Args:
+        path (str): File to write
+        data (bytes): New contents
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+    """
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    atomic_write(path, data)
+    return True
+
+
+def write_chunks_if_changed(path, chunks):
+    """
+    Stream text chunks to path as UTF-8, unless it already holds exactly them.
+
+    The chunks go straight into a temporary file, hashed on the way, so the
+    whole text is never held in memory. The temporary file then replaces
+    path, or is discarded if path has the same size and hash; as with
+    write_if_changed(), an unchanged file keeps its modification time.
+
+    Args:
+        path (str): File to write
+        chunks (iterable): Strings to write, in order; may be a generator
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+    """
+    temp_path = _temp_path(path)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                digest.update(data)
+                size += len(data)
+                f.write(data)
+        try:
+            unchanged = (
+                os.path.getsize(path) == size
+                and hash_file(path) == digest.hexdigest()
+            )
+        except OSError:
+            unchanged = False
+        if unchanged:
+            os.remove(temp_path)
+            return False
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return True
+
+
+def remove_empty_dirs(root, dir_path):
+    """Remove dir_path and its parents while they are empty, stopping at root."""
+    root = os.path.abspath(root)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != root and dir_path.startswith(root + os.sep):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            return
+        dir_path = os.path.dirname(dir_path)
+
+
+def _load_summaries(path):
+    # The page summaries of BuildManifest; a missing or bad file loads empty
+    if path is None:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != SUMMARIES_VERSION:
+        return {}
+    return data.get("pages", {})
+
+
+class DependencyGraph:
+    """
+    Persistent record of the template files each generated page was built from.
+
+    Pages are keyed as in the manifest; dependencies (a page's template and
+    the partials it includes) are keyed by their path relative to the output
+    root, so the graph survives the project being moved. The hash recorded
+    for each dependency shows which of them changed since the last build.
+    """
+
+    def __init__(self, root, pages=None, files=None):
+        self.root = root
+        self.pages = pages if pages is not None else {}
+        self.files = files if files is not None else {}
+
+    @classmethod
+    def load(cls, root):
+        """Load the graph stored in an output directory; a bad one loads empty."""
+        path = os.path.join(root, DEPS_FILENAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(root)
+        if not isinstance(data, dict) or data.get("version") != DEPS_VERSION:
+            return cls(root)
+        return cls(root, data.get("pages", {}), data.get("files", {}))
+
+    def save(self):
+        """Write the graph next to the manifest, dropping files no page uses."""
+        used = {dep for deps in self.pages.values() for dep in deps}
+        self.files = {dep: self.files[dep] for dep in used if dep in self.files}
+        data = {"version": DEPS_VERSION, "pages": self.pages, "files": self.files}
+        atomic_write(
+            os.path.join(self.root, DEPS_FILENAME),
+            json.dumps(data, indent=1, sort_keys=True).encode("utf-8"),
+        )
+
+    def key(self, path):
+        """Return the graph key of a dependency's path."""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def record(self, page_key, dependencies):
+        """
+        Record the dependencies a page was just built from.
+
+        Args:
+            page_key (str): Manifest key of the page
+            dependencies (dict): Maps each file the page's template was read
+                from to its hash, as in CompiledTemplate.dependencies
+        """
+        keys = []
+        for path, file_hash in dependencies.items():
+            key = self.key(path)
+            self.files[key] = file_hash
+            keys.append(key)
+        self.pages[page_key] = sorted(keys)
+
+    def forget(self, page_key):
+        """Drop a page from the graph."""
+        self.pages.pop(page_key, None)
+
+    def tracks(self, path):
+        """Return True if some page was built from the file at path."""
+        return self.key(path) in self.files
+
+    def dependents(self, path):
+        """Return the keys of the pages built from a template or partial, sorted."""
+        key = self.key(path)
+        return sorted(page for page, deps in self.pages.items() if key in deps)
+
+    def changed(self):
+        """
+        Hash the recorded dependencies again and list the ones that changed.
+
+        Returns:
+            list: Paths of the dependencies now different or missing, sorted
+        """
+        changed = []
+        for key, file_hash in sorted(self.files.items()):
+            path = os.path.normpath(os.path.join(self.root, *key.split("/")))
+            try:
+                if hash_file(path) == file_hash:
+                    continue
+            except OSError:
+                pass
+            changed.append(path)
+        return changed
+
+
+class BuildManifest:
+    """
+    Persistent record of the pages generated into an output directory.
+
+    Each generated page is keyed by its path relative to the output root and
+    stores the hashes of the inputs that produced it, so a later build can
+    skip pages whose inputs are unchanged and remove pages whose sources
+    have disappeared. Sources are stored relative to the output root, like
+    the dependencies in the DependencyGraph, so the manifest survives the
+    project being moved or cloned elsewhere. The files written by collectors, such
+    as sitemap.xml, are listed as well, so they are removed once no
+    collector writes them any more. The static files synced into the output are listed
+    too, so stale ones can be removed without touching generated pages, and
+    so are the resized image variants made by the ImagePipeline.
+    The DependencyGraph of the templates each page used is loaded and saved
+    with the manifest, in a file of its own.
+
+    Page summaries for collectors hold the text of every page, so they are
+    not part of the manifest, which is published with the site. They are
+    kept in memory, and in summaries_path when one is given, typically
+    under the project's .cache directory. Each is stored with the source
+    hash it was made from and only used while the page still matches it.
+    """
+
+    def __init__(
+        self,
+        root,
+        pages=None,
+        assets=None,
+        graph=None,
+        variants=None,
+        collected=None,
+        summaries_path=None,
+        summaries=None,
+    ):
+        self.root = root
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else []
+        self.variants = variants if variants is not None else []
+        self.collected = collected if collected is not None else []
+        self.graph = graph if graph is not None else DependencyGraph(root)
+        self.summaries_path = summaries_path
+        self.summaries = summaries if summaries is not None else {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, root, summaries_path=None):
+        """
+        Load the manifest stored in an output directory.
+
+        A missing, unreadable or outdated manifest yields an empty one, which
+        simply makes the next build regenerate every page.
+
+        Args:
+            root (str): Output directory containing the manifest
+            summaries_path (str): Optional file the page summaries are kept in
+
+        Returns:
+            BuildManifest: The loaded manifest
+        """
+        summaries = _load_summaries(summaries_path)
+        path = os.path.join(root, MANIFEST_FILENAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(root, summaries_path=summaries_path, summaries=summaries)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(root, summaries_path=summaries_path, summaries=summaries)
+        return cls(
+            root,
+            data.get("pages", {}),
+            data.get("assets", []),
+            DependencyGraph.load(root),
+            data.get("variants", []),
+            data.get("collected", []),
+            summaries_path,
+            summaries,
+        )
+
+    def save(self):
+        """
+        Write the manifest and its dependency graph into the output directory.
+
+        The summaries go to summaries_path, if there is one, without those
+        of pages no longer in the manifest.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST_FILENAME)
+        data = {
+            "version": MANIFEST_VERSION,
+            "pages": self.pages,
+            "assets": sorted(self.assets),
+            "variants": sorted(self.variants),
+            "collected": sorted(self.collected),
+        }
+        atomic_write(path, json.dumps(data, indent=1, sort_keys=True).encode("utf-8"))
+        self.graph.save()
+        if self.summaries_path is not None:
+            self.summaries = {
+                key: value
+                for key, value in self.summaries.items()
+                if key in self.pages
+            }
+            os.makedirs(os.path.dirname(self.summaries_path), exist_ok=True)
+            data = {"version": SUMMARIES_VERSION, "pages": self.summaries}
+            atomic_write(
+                self.summaries_path,
+                json.dumps(data, separators=(",", ":")).encode("utf-8"),
+            )
+
+    def key(self, dest_path):
+        """Return the manifest key for an output path."""
+        return os.path.relpath(dest_path, self.root).replace(os.sep, "/")
+
+    def is_fresh(
+        self,
+        dest_path,
+        source_hash,
+        template_hash,
+        basepath,
+        source_mtime_ns=None,
+        source_size=None,
+        images_hash=None,
+        build_version=None,
+    ):
+        """
+        Check whether an output page is up to date with its inputs.
+
+        Marks the page as seen, so it survives the next call to prune(). When
+        the page is fresh and the source's mtime and size are given, they are
+        stored, so a source that was only touched is not hashed again.
+
+        Args:
+            dest_path (str): Path of the generated page
+            source_hash (str): Hash of the markdown source
+            template_hash (str): Hash of the template
+            basepath (str): Base path used for the build
+            source_mtime_ns (int): Optional modification time of the source
+            source_size (int): Optional size of the source
+            images_hash (str): ImageSet fingerprint of the build, if images
+                were processed
+            build_version (str): Version of the parser and renderer the page
+                is generated with; a page built by another version is stale
+
+        Returns:
+            bool: True if the page can be left as it is
+        """
+        key = self.key(dest_path)
+        self.seen.add(key)
+        entry = self.pages.get(key)
+        if entry is None or not os.path.isfile(dest_path):
+            return False
+        fresh = (
+            entry.get("source_hash") == source_hash
+            and entry.get("template_hash") == template_hash
+            and entry.get("basepath") == basepath
+            and entry.get("images_hash") == images_hash
+            and entry.get("build_version") == build_version
+        )
+        if fresh and source_mtime_ns is not None:
+            entry["source_mtime_ns"] = source_mtime_ns
+            entry["source_size"] = source_size
+        return fresh
+
+    def cached_source_hash(self, dest_path, mtime_ns, size):
+        """
+        Return the recorded hash of a page's source if the source looks unchanged.
+
+        Args:
+            dest_path (str): Path of the generated page
+            mtime_ns (int): Current modification time of the source, or None
+            size (int): Current size of the source
+
+        Returns:
+            str: The source hash recorded with the same mtime and size, or
+            None if the source has to be hashed again
+        """
+        if mtime_ns is None:
+            return None
+        entry = self.pages.get(self.key(dest_path))
+        if (
+            entry is None
+            or entry.get("source_mtime_ns") != mtime_ns
+            or entry.get("source_size") != size
+        ):
+            return None
+        return entry.get("source_hash")
+
+    def record(
+        self,
+        dest_path,
+        source_path,
+        source_hash,
+        template_hash,
+        basepath,
+        source_mtime_ns=None,
+        source_size=None,
+        summary=None,
+        dependencies=None,
+        images_hash=None,
+        build_version=None,
+    ):
+        """
+        Record the inputs of a generated page.
+
+        The optional PageSummary is kept with the summaries, and the optional
+        dependencies, CompiledTemplate.dependencies of the page's template,
+        go into the dependency graph. The optional images_hash is the
+        fingerprint of the ImageSet the page's images were sized with, and
+        build_version the version of the parser and renderer used.
+        A source_path of None marks a page generated from no single source,
+        such as a listing page.
+        """
+        key = self.key(dest_path)
+        self.seen.add(key)
+        if source_path is not None:
+            source_path = self.key(source_path)
+        entry = {
+            "source": source_path,
+            "source_hash": source_hash,
+            "template_hash": template_hash,
+            "basepath": basepath,
+        }
+        if source_mtime_ns is not None:
+            entry["source_mtime_ns"] = source_mtime_ns
+            entry["source_size"] = source_size
+        if images_hash is not None:
+            entry["images_hash"] = images_hash
+        if build_version is not None:
+            entry["build_version"] = build_version
+        if summary is not None:
+            self.summaries[key] = {
+                "source_hash": source_hash,
+                "summary": summary.to_dict(),
+            }
+        else:
+            self.summaries.pop(key, None)
+        self.pages[key] = entry
+        if dependencies is not None:
+            self.graph.record(key, dependencies)
+
+    def source(self, key):
+        """
+        Return the source path recorded for a page.
+
+        Args:
+            key (str): Manifest key of the page
+
+        Returns:
+            str: Path of the page's markdown source, or None if the page is
+            unknown or was not generated from a single source
+        """
+        source = self.pages.get(key, {}).get("source")
+        if source is None:
+            return None
+        return os.path.normpath(os.path.join(self.root, *source.split("/")))
+
+    def summary(self, dest_path):
+        """Return the summary recorded for a page, as a dict, or None."""
+        key = self.key(dest_path)
+        entry = self.pages.get(key)
+        stored = self.summaries.get(key)
+        if entry is None or stored is None:
+            return None
+        if stored.get("source_hash") != entry.get("source_hash"):
+            return None
+        return stored.get("summary")
+
+    def remove(self, dest_path):
+        """Delete a generated page and forget its entry."""
+        key = self.key(dest_path)
+        self.seen.discard(key)
+        self.pages.pop(key, None)
+        self.summaries.pop(key, None)
+        self.graph.forget(key)
+        if os.path.isfile(dest_path):
+            os.remove(dest_path)
+            remove_empty_dirs(self.root, os.path.dirname(dest_path))
+
+    def prune(self):
+        """
+        Delete outputs whose sources were not seen during this build.
+
+        Empty directories left behind are removed as well, up to the
+        output root.
+
+        Returns:
+            list: Manifest keys of the removed pages
+        """
+        removed = []
+        for key in sorted(set(self.pages) - self.seen):
+            dest_path = os.path.join(self.root, *key.split("/"))
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+                remove_empty_dirs(self.root, os.path.dirname(dest_path))
+            del self.pages[key]
+            self.summaries.pop(key, None)
+            self.graph.forget(key)
+            removed.append(key)
+        return removed
+
+    def update_collected(self, paths):
+        """
+        Record the files collectors wrote and delete the ones they no longer do.
+
+        Args:
+            paths (list): Paths of every file the collectors of this build
+                wrote, or left untouched because it was up to date
+
+        Returns:
+            list: Keys of the removed files, sorted
+        """
+        keys = {self.key(path) for path in paths}
+        removed = []
+        for key in sorted(set(self.collected) - keys):
+            path = os.path.join(self.root, *key.split("/"))
+            if os.path.isfile(path):
+                os.remove(path)
+                remove_empty_dirs(self.root, os.path.dirname(path))
+            removed.append(key)
+        self.collected = sorted(keys)
+        return removed
@@ -5,17 +5,24 @@
 from inline_markdown import (
     extract_markdown_images,
     extract_markdown_links,
+    register_inline_syntax,
     split_nodes_image,
     split_nodes_link,
+    split_nodes_syntaxes,
     text_to_textnodes,
+    unregister_inline_syntax,
 )
 
 # Import block markdown functions
 from block_markdown import (
+    Block,
     BlockType,
+    MarkdownDocument,
+    scan_blocks,
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    markdown_to_document,
     block_to_html_node,
     text_to_children,
     paragraph_to_html_node,
@@ -31,14 +38,21 @@ __all__ = [
     # Inline functions
     "extract_markdown_images",
     "extract_markdown_links",
+    "register_inline_syntax",
     "split_nodes_image",
     "split_nodes_link",
+    "split_nodes_syntaxes",
     "text_to_textnodes",
+    "unregister_inline_syntax",
     # Block functions
+    "Block",
     "BlockType",
+    "MarkdownDocument",
+    "scan_blocks",
     "markdown_to_blocks",
     "block_to_block_type",
     "markdown_to_html_node",
+    "markdown_to_document",
     "block_to_html_node",
     "text_to_children",
     "paragraph_to_html_node",
@@ -0,0 +1,129 @@
+import json
+import os
+
+from build_plan import as_page_job
+from front_matter import read_header
+from manifest import atomic_write
+
+METADATA_INDEX_PATH = os.path.join(".cache", "metadata.json")
+METADATA_INDEX_VERSION = 2
+
+
+def is_draft(metadata):
+    """Return True if a page's metadata marks it as a draft."""
+    return metadata.get("draft") is True
+
+
+class MetadataIndex:
+    """
+    Front matter and title of every page, read from the page headers only.
+
+    Pages are keyed by their source path relative to the content directory,
+    e.g. "blog/tom/index.md". An entry is reused while its source keeps the
+    size and modification time it was read with, so a build reads the header
+    of new and edited pages only, and never parses a body. Listing pages can
+    be built from the index without rendering the pages they list.
+
+    Args:
+        content_dir (str): Content directory the sources are under
+        path (str): Optional file the index is cached in between builds
+        entries (dict): Cached entries, as loaded by load()
+    """
+
+    def __init__(self, content_dir=None, path=None, entries=None):
+        self.content_dir = content_dir
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self.modified = False
+
+    @classmethod
+    def load(cls, content_dir, path):
+        """Load the cached index; a missing or outdated one loads empty."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(content_dir, path)
+        if not isinstance(data, dict) or data.get("version") != METADATA_INDEX_VERSION:
+            return cls(content_dir, path)
+        return cls(content_dir, path, data.get("pages", {}))
+
+    def save(self):
+        """Write the index to its cache file if it changed."""
+        if self.path is None or not self.modified:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {"version": METADATA_INDEX_VERSION, "pages": self.entries}
+        atomic_write(self.path, json.dumps(data, sort_keys=True).encode("utf-8"))
+        self.modified = False
+
+    def key(self, source_path):
+        """Return the index key of a markdown source."""
+        if self.content_dir is not None:
+            source_path = os.path.relpath(source_path, self.content_dir)
+        return source_path.replace(os.sep, "/")
+
+    def get(self, page):
+        """
+        Return the metadata of a page, reading its header if it changed.
+
+        Args:
+            page: BuildJob or (source_path, dest_path) tuple
+
+        Returns:
+            dict: The page's front matter, with "title" from its h1 if the
+            front matter has none
+        """
+        job = as_page_job(page)
+        mtime_ns, size = job.mtime_ns, job.size
+        if mtime_ns is None:
+            stat = os.stat(job.source)
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+        key = self.key(job.source)
+        entry = self.entries.get(key)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == mtime_ns
+            and entry["size"] == size
+        ):
+            return entry["metadata"]
+        metadata = read_header(job.source)
+        self.entries[key] = {"mtime_ns": mtime_ns, "size": size, "metadata": metadata}
+        self.modified = True
+        return metadata
+
+    def remove(self, source_path):
+        """Forget a deleted source."""
+        if self.entries.pop(self.key(source_path), None) is not None:
+            self.modified = True
+
+    def update(self, pages):
+        """
+        Bring the index up to date with every page of the site.
+
+        Args:
+            pages (list): BuildJob objects or (source_path, dest_path) tuples
+
+        Returns:
+            list: Keys of the pages whose metadata was added, changed or
+            removed, sorted
+        """
+        changed = []
+        keys = set()
+        for page in pages:
+            job = as_page_job(page)
+            key = self.key(job.source)
+            keys.add(key)
+            entry = self.entries.get(key)
+            before = entry["metadata"] if entry is not None else None
+            if self.get(job) != before:
+                changed.append(key)
+        for key in set(self.entries) - keys:
+            del self.entries[key]
+            self.modified = True
+            changed.append(key)
+        return sorted(changed)
+
+    def pages(self):
+        """Return (key, metadata) pairs for every indexed page, sorted by key."""
+        return [(key, self.entries[key]["metadata"]) for key in sorted(self.entries)]
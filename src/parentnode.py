@@ -2,10 +2,12 @@ from htmlnode import HTMLNode
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self):
+    def to_html_chunks(self):
         if self.tag is None:
             raise ValueError("ParentNode must have a tag")
 
@@ -16,8 +18,7 @@ class ParentNode(HTMLNode):
         if self.props:
             props_html = " " + self.props_to_html().strip()
 
-        children_html = ""
+        yield f"<{self.tag}{props_html}>"
         for child in self.children:
-            children_html += child.to_html()
-
-        return f"<{self.tag}{props_html}>{children_html}</{self.tag}>"
+            yield from child.to_html_chunks()
+        yield f"</{self.tag}>"
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from block_markdown import PARSER_VERSION
+from collectors import PageSummary
+from inline_patterns import syntax_fingerprint
+from template import LINK_PLACEHOLDER
+
+PARSE_CACHE_DIRNAME = os.path.join(".cache", "parse")
+PARSE_CACHE_SIZE = 128 * 1024 * 1024
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed and rendered markdown, shared between builds.
+
+    Each entry holds the title and the {{ Content }} HTML of one source, split
+    by split_links() so any base path can be applied with join_links(), and
+    the page's PageSummary when one was gathered for the collectors. A
+    template or base path change therefore skips parsing and rendering
+    entirely. Entries are keyed by a hash of the source and the parser
+    version, written atomically so parallel workers can share the cache, and
+    touched on every hit so prune() can evict the least recently used ones.
+
+    Args:
+        cache_dir (str): Directory holding the entries
+        max_bytes (int): Size prune() trims the cache down to
+    """
+
+    def __init__(self, cache_dir, max_bytes=PARSE_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, markdown, variant=None):
+        """
+        Return the cache key of a markdown source for the current parser.
+
+        The key covers the parser version and any inline syntaxes registered
+        beyond the built-in ones.
+
+        Args:
+            markdown (str): Markdown source text
+            variant (str): Optional fingerprint of other inputs the rendered
+                content depends on, such as ImageSet.fingerprint
+
+        Returns:
+            str: The key, or None if the source cannot be cached because it
+            contains the link placeholder character
+        """
+        if LINK_PLACEHOLDER in markdown:
+            return None
+        digest = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+        key = f"{digest}-{PARSER_VERSION}"
+        fingerprint = syntax_fingerprint()
+        if fingerprint:
+            key += f"-{fingerprint}"
+        if variant:
+            key += f"-{variant}"
+        return key
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        """
+        Look up a parsed source.
+
+        Args:
+            key (str): Key from key()
+
+        Returns:
+            tuple: (title, content_parts, summary) with summary a PageSummary
+            or None if the entry has none, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        summary = data.get("summary")
+        if summary is not None:
+            summary = PageSummary.from_dict(summary)
+        return data["title"], data["content"], summary
+
+    def put(self, key, title, content_parts, summary=None):
+        """Store the title, split_links() content and summary of a source."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {"title": title, "content": content_parts}
+        if summary is not None:
+            data["summary"] = summary.to_dict()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def entries(self):
+        """
+        List the cached entries.
+
+        Returns:
+            list: (mtime_ns, size, path) tuples, least recently used first
+        """
+        entries = []
+        try:
+            shards = os.scandir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        if entry.name.endswith(".json"):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def prune(self):
+        """
+        Evict the least recently used entries until the cache fits max_bytes.
+
+        Returns:
+            tuple: (evicted, remaining) entry counts
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted, len(entries) - evicted
+
+    def clear(self):
+        """Delete every entry."""
+        for _, _, path in self.entries():
+            os.remove(path)
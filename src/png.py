@@ -0,0 +1,351 @@
+"""A small PNG codec: enough to resize and recompress a site's images.
+
+Decoding covers 8-bit, non-interlaced images of every color type, which is
+what image editors and screenshot tools write by default; anything else
+raises ValueError, and the caller keeps the file as it is. Pixels are held
+as one bytearray of rows without filter bytes.
+
+Filtering is done a whole row at a time on Python integers, treating each
+byte as a lane of a wide register, so only the filters that depend on the
+previous byte of the same row (Sub, Average and Paeth) are decoded byte by
+byte, and encoding never is.
+"""
+
+import struct
+import zlib
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Samples per pixel of each supported color type, after palette expansion
+_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+# Bytes per IDAT chunk written by encode_png()
+_IDAT_SIZE = 1 << 16
+# Distance of each filtered byte from zero, as a signed value
+_MAGNITUDE = bytes(min(value, 256 - value) for value in range(256))
+
+
+class PngImage:
+    """
+    Decoded 8-bit pixels.
+
+    Args:
+        width (int): Width in pixels
+        height (int): Height in pixels
+        channels (int): Samples per pixel: 1 gray, 2 gray and alpha,
+            3 RGB or 4 RGBA
+        pixels (bytearray): Rows of width * channels samples, top to bottom
+    """
+
+    __slots__ = ("width", "height", "channels", "pixels")
+
+    def __init__(self, width, height, channels, pixels):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.pixels = pixels
+
+    def __repr__(self):
+        return f"PngImage({self.width}x{self.height}, {self.channels} channels)"
+
+
+def _chunks(data):
+    if not data.startswith(SIGNATURE):
+        raise ValueError("Not a PNG file")
+    pos = len(SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos : pos + 8])
+        body = data[pos + 8 : pos + 8 + length]
+        if len(body) != length:
+            break
+        yield kind, body
+        if kind == b"IEND":
+            return
+        pos += length + 12
+    raise ValueError("Truncated PNG file")
+
+
+def read_png_size(data):
+    """
+    Read the dimensions of a PNG from its header.
+
+    Args:
+        data (bytes): The file's contents; the first 24 bytes are enough
+
+    Returns:
+        tuple: (width, height)
+
+    Raises:
+        ValueError: If the data is not a PNG
+    """
+    if not data.startswith(SIGNATURE) or data[12:16] != b"IHDR":
+        raise ValueError("Not a PNG file")
+    return struct.unpack(">II", data[16:24])
+
+
+def _lanes(count, value):
+    return int.from_bytes(bytes([value]) * count, "big")
+
+
+def _add_rows(a, b):
+    # Bytewise (a + b) % 256 of two equally long rows, with no carry between
+    # bytes: add the low 7 bits of each lane, then xor in the top bits
+    count = len(a)
+    low = _lanes(count, 0x7F)
+    x = int.from_bytes(a, "big")
+    y = int.from_bytes(b, "big")
+    total = ((x & low) + (y & low)) ^ ((x ^ y) & ~low & ((1 << 8 * count) - 1))
+    return bytearray(total.to_bytes(count, "big"))
+
+
+def _subtract_rows(a, b):
+    # Bytewise (a - b) % 256: borrow from a top bit set in every lane of a
+    count = len(a)
+    high = _lanes(count, 0x80)
+    x = int.from_bytes(a, "big")
+    y = int.from_bytes(b, "big")
+    difference = ((x | high) - (y & ~high)) ^ ((x ^ ~y) & high)
+    return difference.to_bytes(count, "big")
+
+
+def _unfilter(raw, width, height, bpp):
+    stride = width * bpp
+    pixels = bytearray(height * stride)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        kind = raw[pos]
+        row = bytearray(raw[pos + 1 : pos + 1 + stride])
+        pos += stride + 1
+        if len(row) != stride:
+            raise ValueError("Truncated PNG image data")
+        if kind == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif kind == 2:
+            row = _add_rows(row, prev)
+        elif kind == 3:
+            for i in range(bpp):
+                row[i] = (row[i] + (prev[i] >> 1)) & 0xFF
+            for i in range(bpp, stride):
+                row[i] = (row[i] + ((row[i - bpp] + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(bpp):
+                row[i] = (row[i] + prev[i]) & 0xFF
+            for i in range(bpp, stride):
+                a = row[i - bpp]
+                b = prev[i]
+                c = prev[i - bpp]
+                pa = abs(b - c)
+                pb = abs(a - c)
+                pc = abs(a + b - 2 * c)
+                if pa <= pb and pa <= pc:
+                    predictor = a
+                elif pb <= pc:
+                    predictor = b
+                else:
+                    predictor = c
+                row[i] = (row[i] + predictor) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"Unknown PNG filter type {kind}")
+        pixels[y * stride : (y + 1) * stride] = row
+        prev = row
+    return pixels
+
+
+def decode_png(data):
+    """
+    Decode a PNG file.
+
+    Palette images are expanded to RGB, or to RGBA if the palette has
+    transparency. Ancillary chunks, such as color profiles, are ignored.
+
+    Args:
+        data (bytes): The file's contents
+
+    Returns:
+        PngImage: The decoded pixels
+
+    Raises:
+        ValueError: If the data is not a PNG or uses a bit depth, color type
+            or interlacing that is not supported
+    """
+    header = None
+    palette = transparency = None
+    idat = []
+    for kind, body in _chunks(data):
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"PLTE":
+            palette = body
+        elif kind == b"tRNS":
+            transparency = body
+        elif kind == b"IDAT":
+            idat.append(body)
+    if header is None:
+        raise ValueError("PNG file has no IHDR chunk")
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or color_type not in _CHANNELS or interlace:
+        raise ValueError(
+            f"Unsupported PNG: bit depth {depth}, color type {color_type}"
+            + (", interlaced" if interlace else "")
+        )
+    if not width or not height:
+        raise ValueError("PNG image is empty")
+
+    bpp = 1 if color_type == 3 else _CHANNELS[color_type]
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error as error:
+        raise ValueError(f"Corrupt PNG image data: {error}")
+    pixels = _unfilter(raw, width, height, bpp)
+    if color_type != 3:
+        return PngImage(width, height, bpp, pixels)
+
+    if palette is None:
+        raise ValueError("Palette PNG has no PLTE chunk")
+    channels = 4 if transparency else 3
+    table = []
+    for index in range(256):
+        color = palette[index * 3 : index * 3 + 3] or b"\x00\x00\x00"
+        if channels == 4:
+            alpha = transparency[index] if index < len(transparency) else 255
+            color += bytes([alpha])
+        table.append(color)
+    pixels = bytearray(b"".join(map(table.__getitem__, pixels)))
+    return PngImage(width, height, channels, pixels)
+
+
+def drop_opaque_alpha(image):
+    """
+    Return the image without its alpha channel if every pixel is opaque.
+
+    Args:
+        image (PngImage): Image to strip
+
+    Returns:
+        PngImage: A new image with one channel fewer, or image itself if it
+        has no alpha channel or is partly transparent
+    """
+    channels = image.channels
+    if channels not in (2, 4):
+        return image
+    alpha = image.pixels[channels - 1 :: channels]
+    if alpha.count(255) != len(alpha):
+        return image
+    pixels = bytearray(len(alpha) * (channels - 1))
+    for channel in range(channels - 1):
+        pixels[channel :: channels - 1] = image.pixels[channel::channels]
+    return PngImage(image.width, image.height, channels - 1, pixels)
+
+
+def _spans(source, target):
+    # Source pixels [start, end) averaged into each target pixel
+    spans = []
+    for x in range(target):
+        start = x * source // target
+        spans.append((start, max((x + 1) * source // target, start + 1)))
+    return spans
+
+
+def resize(image, width):
+    """
+    Scale an image down to a width, keeping its aspect ratio.
+
+    Each target pixel is the average of the source pixels it covers (a box
+    filter), which is sharp enough for downscaling photos and screenshots.
+
+    Args:
+        image (PngImage): Image to scale
+        width (int): Target width, at most the image's width
+
+    Returns:
+        PngImage: The scaled image
+
+    Raises:
+        ValueError: If width is not between 1 and the image's width
+    """
+    if not 1 <= width <= image.width:
+        raise ValueError(f"Cannot resize a {image.width}px wide image to {width}px")
+    height = max(1, round(image.height * width / image.width))
+    channels = image.channels
+    stride = image.width * channels
+    columns = _spans(image.width, width)
+    # Source pixels per target sample along a row
+    widths = [end - start for start, end in columns for _ in range(channels)]
+
+    # Sum each row across its columns, then the rows of each target row
+    rows = []
+    for y in range(image.height):
+        row = image.pixels[y * stride : (y + 1) * stride]
+        rows.append(
+            [
+                sum(row[start * channels + channel : end * channels : channels])
+                for start, end in columns
+                for channel in range(channels)
+            ]
+        )
+    pixels = bytearray()
+    for start, end in _spans(image.height, height):
+        count = end - start
+        totals = rows[start] if count == 1 else map(sum, zip(*rows[start:end]))
+        pixels += bytes(
+            (total + area // 2) // area
+            for total, area in zip(totals, (count * span for span in widths))
+        )
+    return PngImage(width, height, channels, pixels)
+
+
+def _chunk(kind, body):
+    return (
+        struct.pack(">I", len(body))
+        + kind
+        + body
+        + struct.pack(">I", zlib.crc32(kind + body))
+    )
+
+
+def encode_png(image, level=9):
+    """
+    Encode an image as a PNG file.
+
+    Each row is filtered with None, Sub or Up, whichever leaves the smallest
+    values for zlib to compress, the heuristic libpng uses by default.
+
+    Args:
+        image (PngImage): Image to encode
+        level (int): zlib compression level
+
+    Returns:
+        bytes: The file's contents
+    """
+    channels = image.channels
+    stride = image.width * channels
+    padding = bytes(channels)
+    prev = bytes(stride)
+    filtered = bytearray()
+    for y in range(image.height):
+        row = bytes(image.pixels[y * stride : (y + 1) * stride])
+        candidates = (
+            (0, row),
+            (1, _subtract_rows(row, padding + row[:-channels])),
+            (2, _subtract_rows(row, prev)),
+        )
+        kind, best = min(
+            candidates,
+            key=lambda candidate: sum(map(_MAGNITUDE.__getitem__, candidate[1])),
+        )
+        filtered.append(kind)
+        filtered += best
+        prev = row
+    data = zlib.compress(bytes(filtered), level)
+    header = struct.pack(
+        ">IIBBBBB", image.width, image.height, 8, _COLOR_TYPES[channels], 0, 0, 0
+    )
+    return b"".join(
+        [SIGNATURE, _chunk(b"IHDR", header)]
+        + [
+            _chunk(b"IDAT", data[pos : pos + _IDAT_SIZE])
+            for pos in range(0, len(data), _IDAT_SIZE)
+        ]
+        + [_chunk(b"IEND", b"")]
+    )
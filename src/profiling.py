@@ -0,0 +1,134 @@
+import cProfile
+import fnmatch
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+PAGE_STAGES = ("read", "parse", "render", "template", "write")
+
+
+class PageTimings:
+    """Per-stage wall-clock timings of a single generated page."""
+
+    def __init__(self, page, cprofile_path=None):
+        self.page = page
+        self.cprofile_path = cprofile_path
+        self.stages = dict.fromkeys(PAGE_STAGES, 0.0)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+
+    def profiled(self):
+        """Return a context that runs cProfile if this page was selected."""
+        if self.cprofile_path is None:
+            return nullcontext()
+        return self._cprofile()
+
+    @contextmanager
+    def _cprofile(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            os.makedirs(os.path.dirname(self.cprofile_path) or ".", exist_ok=True)
+            profile.dump_stats(self.cprofile_path)
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def __repr__(self):
+        return f"PageTimings(page={self.page}, total={self.total:.6f})"
+
+
+class _NullTimings:
+    def stage(self, name):
+        return nullcontext()
+
+    def profiled(self):
+        return nullcontext()
+
+
+NULL_TIMINGS = _NullTimings()
+
+
+class BuildProfiler:
+    """
+    Collects page timings over a build and summarizes them.
+
+    Args:
+        top (int): Number of slowest pages to list in the summary
+        cprofile_glob (str): Optional glob; matching source paths are run
+            under cProfile
+        cprofile_dir (str): Directory receiving the .prof dumps
+    """
+
+    def __init__(self, top=10, cprofile_glob=None, cprofile_dir="profiles"):
+        self.top = top
+        self.cprofile_glob = cprofile_glob
+        self.cprofile_dir = cprofile_dir
+        self.pages = []
+
+    def page(self, source_path):
+        """Create the timings object for a page about to be generated."""
+        cprofile_path = None
+        if self.cprofile_glob and fnmatch.fnmatch(source_path, self.cprofile_glob):
+            name = os.path.splitdrive(os.path.abspath(source_path))[1]
+            name = name.strip(os.sep).replace(os.sep, "__")
+            cprofile_path = os.path.join(self.cprofile_dir, name + ".prof")
+        return PageTimings(source_path, cprofile_path)
+
+    def add(self, timings):
+        """Record the timings of a finished page."""
+        self.pages.append(timings)
+
+    def totals(self):
+        """Return the time spent in each stage, summed over all pages."""
+        totals = dict.fromkeys(PAGE_STAGES, 0.0)
+        for timings in self.pages:
+            for stage, seconds in timings.stages.items():
+                totals[stage] += seconds
+        return totals
+
+    def slowest(self):
+        """Return the timings of the slowest pages, slowest first."""
+        return sorted(self.pages, key=lambda timings: timings.total, reverse=True)[
+            : self.top
+        ]
+
+    def summary(self):
+        """
+        Format the per-stage totals and the slowest pages.
+
+        Returns:
+            str: Human-readable profile summary
+        """
+        totals = self.totals()
+        grand_total = sum(totals.values())
+        lines = [f"Profiled {len(self.pages)} page(s) in {grand_total:.3f}s"]
+        for stage in PAGE_STAGES:
+            share = totals[stage] / grand_total * 100 if grand_total else 0.0
+            lines.append(f"  {stage:<10} {totals[stage]:9.3f}s {share:6.1f}%")
+
+        slowest = self.slowest()
+        if slowest:
+            lines.append(f"Slowest {len(slowest)} page(s), in milliseconds:")
+            header = "".join(f"{stage:>10}" for stage in PAGE_STAGES)
+            lines.append(f"  {'total':>10}{header}  page")
+            for timings in slowest:
+                stages = "".join(
+                    f"{timings.stages[stage] * 1000:10.2f}" for stage in PAGE_STAGES
+                )
+                lines.append(f"  {timings.total * 1000:10.2f}{stages}  {timings.page}")
+
+        dumps = [t.cprofile_path for t in self.pages if t.cprofile_path]
+        if dumps:
+            lines.append(f"Wrote {len(dumps)} cProfile dump(s) to {self.cprofile_dir}")
+        return "\n".join(lines)
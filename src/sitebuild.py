@@ -0,0 +1,225 @@
+"""Build a site in memory from any source of markdown pages.
+
+Usage:
+    from sitebuild import build_site
+    from template import CompiledTemplate
+
+    pages = dict(build_site({"index.md": "# Home"}, CompiledTemplate(source)))
+"""
+
+import os
+import zipfile
+
+from block_markdown import find_title
+from build_plan import PAGE, page_output_path, scan_tree
+from front_matter import split_front_matter
+from generate_page import BuildError, read_page_source, render_node, render_page
+from listings import PAGE_SIZE, site_listings
+from manifest import write_if_changed
+from metadata_index import MetadataIndex, is_draft
+from template import load_templates
+
+
+class ContentSource:
+    """
+    Base class for the markdown pages a site is built from.
+
+    Paths are relative to the content root and use "/" on every platform.
+    """
+
+    def paths(self):
+        """Return the paths of the markdown pages, sorted."""
+        raise NotImplementedError("Subclasses should implement this method")
+
+    def read(self, path):
+        """Return the markdown text of the page at path."""
+        raise NotImplementedError("Subclasses should implement this method")
+
+
+class DictSource(ContentSource):
+    """
+    Pages held in a dict mapping paths to markdown as str or UTF-8 bytes.
+
+    Keys not ending in ".md" are ignored, as in a content directory.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paths(self):
+        return sorted(path for path in self.pages if path.endswith(".md"))
+
+    def read(self, path):
+        markdown = self.pages[path]
+        if isinstance(markdown, bytes):
+            return markdown.decode("utf-8")
+        return markdown
+
+
+class ZipSource(ContentSource):
+    """
+    Pages inside a zip archive.
+
+    Args:
+        archive (str or file or ZipFile): The archive or a path to it
+        root (str): Directory inside the archive that holds the content,
+            e.g. "content/"; the default is the archive root
+    """
+
+    def __init__(self, archive, root=""):
+        if not isinstance(archive, zipfile.ZipFile):
+            archive = zipfile.ZipFile(archive)
+        self.archive = archive
+        self.root = root.strip("/") + "/" if root.strip("/") else ""
+
+    def paths(self):
+        prefix = self.root
+        return sorted(
+            name[len(prefix) :]
+            for name in self.archive.namelist()
+            if name.startswith(prefix) and name.endswith(".md")
+        )
+
+    def read(self, path):
+        return self.archive.read(self.root + path).decode("utf-8")
+
+
+class DirectorySource(ContentSource):
+    """Pages in a content directory on disk, found by one scandir walk."""
+
+    def __init__(self, dir_path):
+        self.dir_path = dir_path
+
+    def paths(self):
+        jobs, _ = scan_tree(self.dir_path, "", PAGE)
+        return [
+            os.path.relpath(job.source, self.dir_path).replace(os.sep, "/")
+            for job in jobs
+        ]
+
+    def read(self, path):
+        return read_page_source(os.path.join(self.dir_path, *path.split("/")))
+
+
+def open_source(content_source):
+    """
+    Wrap a dict, zip archive or directory path as a ContentSource.
+
+    Args:
+        content_source: A ContentSource, a dict of pages, a ZipFile, or the
+            path of a directory or zip archive
+
+    Returns:
+        ContentSource: The wrapped source
+
+    Raises:
+        ValueError: If the source is of none of these kinds
+    """
+    if isinstance(content_source, ContentSource):
+        return content_source
+    if isinstance(content_source, dict):
+        return DictSource(content_source)
+    if isinstance(content_source, zipfile.ZipFile):
+        return ZipSource(content_source)
+    if isinstance(content_source, (str, os.PathLike)):
+        if os.path.isdir(content_source):
+            return DirectorySource(os.fspath(content_source))
+        if zipfile.is_zipfile(content_source):
+            return ZipSource(content_source)
+    raise ValueError(f"Unsupported content source: {content_source!r}")
+
+
+def build_site(
+    content_source,
+    template,
+    basepath="/",
+    parse_cache=None,
+    drafts=False,
+    images=None,
+    page_size=PAGE_SIZE,
+):
+    """
+    Render every page of a site without writing anything.
+
+    Pages go through the same render_page() as a build on disk, and the
+    blog's archive and tag pages follow them, laid out by site_listings()
+    from the front matter gathered on the way. Given the ImageSet the CLI
+    sized images with, as returned by ImagePipeline.process(), the HTML is
+    identical to the files the CLI writes; without one, images have no
+    dimensions or srcset. Pages are rendered lazily, one per iteration, so a
+    large site can be streamed; dict(build_site(...)) collects it all.
+
+    Args:
+        content_source: Pages to build; anything open_source() accepts
+        template (str, CompiledTemplate or TemplateSet): Template or path to
+            one, or a TemplateSet choosing one per page; use
+            CompiledTemplate(source) for a template held in memory
+        basepath (str): Base path for root-relative links
+        parse_cache (ParseCache): Optional cache of rendered page content
+        drafts (bool): Also build pages whose front matter has draft: true
+        images (ImageSet): Optional processed images to size <img> tags with
+        page_size (int): Posts per listing page
+
+    Yields:
+        tuple: (path, html) for each page, e.g. ("blog/post.html", "<html>...")
+
+    Raises:
+        BuildError: If a page fails to render; pages before it were yielded
+    """
+    source = open_source(content_source)
+    templates = load_templates(template, basepath)
+    # What read_header() would find for each page, drafts included, as in
+    # the metadata index the CLI lays out listings from
+    index = MetadataIndex()
+    for path in source.paths():
+        try:
+            markdown = source.read(path)
+            metadata, body = split_front_matter(markdown, path)
+            header = dict(metadata)
+            if "title" not in header:
+                title = find_title(body)
+                if title is not None:
+                    header["title"] = title
+            index.entries[path] = {"mtime_ns": None, "size": None, "metadata": header}
+            if is_draft(metadata) and not drafts:
+                continue
+            template = templates.for_page(path, metadata.get("template"))
+            html = "".join(
+                render_page(
+                    markdown, template, basepath, None, parse_cache, images=images
+                )
+            )
+        except Exception as error:
+            raise BuildError([(path, error)]) from error
+        yield page_output_path(path), html
+
+    for listing in site_listings(index, page_size, drafts):
+        template = templates.for_page(listing.source_key())
+        html = "".join(
+            render_node(listing.to_node(), listing.heading(), template, basepath)
+        )
+        yield listing.key, html
+
+
+def write_site(pages, dest_dir_path):
+    """
+    Write (path, html) pairs, such as the output of build_site(), to disk.
+
+    Each page is written atomically and only if its contents changed.
+
+    Args:
+        pages (iterable): (path, html) pairs with "/"-separated paths
+        dest_dir_path (str): Output directory
+
+    Returns:
+        tuple: (written, unchanged) page counts
+    """
+    written = unchanged = 0
+    for path, html in pages:
+        dest_path = os.path.join(dest_dir_path, *path.split("/"))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if write_if_changed(dest_path, html.encode("utf-8")):
+            written += 1
+        else:
+            unchanged += 1
+    return written, unchanged
@@ -0,0 +1,134 @@
+import os
+import shutil
+
+from manifest import remove_empty_dirs
+
+# renameat2() arguments for atomically exchanging two paths on Linux
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def link_tree(source_dir_path, dest_dir_path):
+    """
+    Mirror a directory tree with hard links instead of copies.
+
+    Files that cannot be hard linked, for example across filesystems, are
+    copied instead.
+
+    Args:
+        source_dir_path (str): Directory to mirror
+        dest_dir_path (str): New directory to create
+
+    Returns:
+        int: Number of files linked or copied
+    """
+    os.mkdir(dest_dir_path)
+    count = 0
+    with os.scandir(source_dir_path) as entries:
+        entries = list(entries)
+    for entry in entries:
+        dest_path = os.path.join(dest_dir_path, entry.name)
+        if entry.is_dir(follow_symlinks=False):
+            count += link_tree(entry.path, dest_path)
+            continue
+        try:
+            os.link(entry.path, dest_path, follow_symlinks=False)
+        except OSError:
+            shutil.copy2(entry.path, dest_path, follow_symlinks=False)
+        count += 1
+    return count
+
+
+def _exchange(path_a, path_b):
+    # Swap two paths in one step where the platform supports it
+    try:
+        import ctypes
+
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError, TypeError):
+        return False
+    result = renameat2(
+        AT_FDCWD, os.fsencode(path_a), AT_FDCWD, os.fsencode(path_b), RENAME_EXCHANGE
+    )
+    return result == 0
+
+
+class StagedOutput:
+    """
+    Builds the next generation of an output directory beside the live one.
+
+    begin() fills a staging directory with hard links to every file of the
+    current output, and the build then runs against the staging directory.
+    Every writer in the build replaces files (by rename or by unlinking
+    first) rather than writing into them, so the live generation the links
+    share is never modified, and files the build leaves alone cost one link
+    each. commit() swaps the staging directory into place, atomically where
+    the platform can exchange two directories, so readers never see a
+    half-built site; abort() drops it and leaves the live output as it was.
+
+    Args:
+        dest_dir_path (str): The live output directory
+    """
+
+    def __init__(self, dest_dir_path):
+        self.dest_dir_path = dest_dir_path
+        parent, name = os.path.split(os.path.abspath(dest_dir_path))
+        self.staging_dir_path = os.path.join(parent, f".{name}.staging")
+
+    def begin(self):
+        """
+        Create the staging directory from the current output.
+
+        Returns:
+            str: Path of the staging directory to build into
+        """
+        # Left over from an interrupted build
+        shutil.rmtree(self.staging_dir_path, ignore_errors=True)
+        if os.path.isdir(self.dest_dir_path):
+            link_tree(self.dest_dir_path, self.staging_dir_path)
+        else:
+            os.makedirs(self.staging_dir_path)
+        return self.staging_dir_path
+
+    def sweep(self, keep):
+        """
+        Delete staged files the build did not produce.
+
+        Args:
+            keep (set): Paths to keep, relative to the output root with "/"
+
+        Returns:
+            list: Relative paths of the deleted files, sorted
+        """
+        removed = []
+        root = self.staging_dir_path
+        for dir_path, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                key = os.path.relpath(path, root).replace(os.sep, "/")
+                if key not in keep:
+                    os.remove(path)
+                    removed.append(key)
+        for key in removed:
+            remove_empty_dirs(root, os.path.dirname(os.path.join(root, key)))
+        return sorted(removed)
+
+    def commit(self):
+        """Swap the staged output into place and delete the old generation."""
+        staging = self.staging_dir_path
+        dest = self.dest_dir_path
+        if not os.path.exists(dest):
+            os.rename(staging, dest)
+            return
+        if not _exchange(staging, dest):
+            # Two renames: the output is missing only between them
+            old = staging + ".old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.rename(dest, old)
+            os.rename(staging, dest)
+            staging = old
+        shutil.rmtree(staging)
+
+    def abort(self):
+        """Drop the staged output, leaving the live output untouched."""
+        shutil.rmtree(self.staging_dir_path, ignore_errors=True)
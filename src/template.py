@@ -0,0 +1,349 @@
+import hashlib
+import os
+import re
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+PARTIAL_PATTERN = re.compile(r"\{\{> ([\w./-]+) \}\}")
+LINK_ATTRIBUTES = ("href", "src")
+# Holds a comma-separated list of "url width" candidates
+SRCSET_ATTRIBUTE = "srcset"
+# Stands in for the base path in split_links(); markdown never produces it
+LINK_PLACEHOLDER = "\x00"
+
+
+def apply_basepath(html, basepath):
+    """Point root-relative href and src attributes in raw HTML at basepath."""
+    if basepath == "/":
+        return html
+    for attribute in LINK_ATTRIBUTES:
+        html = html.replace(f'{attribute}="/', f'{attribute}="{basepath}')
+    return html
+
+
+def _rebase_srcset(srcset, basepath):
+    return ", ".join(
+        basepath + candidate[1:] if candidate.startswith("/") else candidate
+        for candidate in srcset.split(", ")
+    )
+
+
+def rebase_links(node, basepath):
+    """
+    Point root-relative href, src and srcset props of a node tree at basepath.
+
+    The tree is not modified: nodes that need new props are copied, along
+    with their ancestors, and every other subtree is shared with the input.
+
+    Args:
+        node (HTMLNode): Root of the tree to rebase
+        basepath (str): Base path replacing the leading "/"
+
+    Returns:
+        HTMLNode: The rebased tree
+    """
+    if basepath == "/":
+        return node
+
+    props = node.props
+    if props and (
+        SRCSET_ATTRIBUTE in props
+        or any(
+            str(props.get(attribute, "")).startswith("/")
+            for attribute in LINK_ATTRIBUTES
+        )
+    ):
+        props = dict(props)
+        for attribute in LINK_ATTRIBUTES:
+            value = props.get(attribute)
+            if isinstance(value, str) and value.startswith("/"):
+                props[attribute] = basepath + value[1:]
+        if SRCSET_ATTRIBUTE in props:
+            props[SRCSET_ATTRIBUTE] = _rebase_srcset(props[SRCSET_ATTRIBUTE], basepath)
+
+    children = node.children
+    if children:
+        rebased = [rebase_links(child, basepath) for child in children]
+        if any(new is not old for new, old in zip(rebased, children)):
+            children = rebased
+
+    if props is node.props and children is node.children:
+        return node
+    if isinstance(node, ParentNode):
+        return ParentNode(node.tag, children, props)
+    return LeafNode(node.tag, node.value, props)
+
+
+def split_links(node):
+    """
+    Render a node tree with its base path left open.
+
+    Args:
+        node (HTMLNode): Root of a tree whose links are not yet rebased
+
+    Returns:
+        list: HTML fragments split where the leading "/" of each root-relative
+        href or src goes; join_links() puts them back together
+    """
+    return rebase_links(node, LINK_PLACEHOLDER).to_html().split(LINK_PLACEHOLDER)
+
+
+def join_links(parts, basepath):
+    """Join split_links() fragments, giving the HTML rebased to basepath."""
+    return basepath.join(parts)
+
+
+def hash_text(text):
+    """Return the SHA-256 hex digest of a string's UTF-8 encoding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_template_file(path):
+    """
+    Read a template or partial file.
+
+    Returns:
+        tuple: (text, hash) where text has its newlines normalized to "\\n"
+        and hash is the SHA-256 hex digest of the file's bytes
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    return text, hashlib.sha256(data).hexdigest()
+
+
+def expand_partials(source, partials_dir, dependencies, _including=()):
+    """
+    Inline the {{> name }} includes of a template, recursively.
+
+    Args:
+        source (str): Template source
+        partials_dir (str): Directory holding the partials, as name.html
+        dependencies (dict): Filled in with the path and hash of every
+            partial read
+        _including (tuple): Partials being expanded, to detect cycles
+
+    Returns:
+        str: The source with every include replaced by its partial
+
+    Raises:
+        ValueError: If a partial is missing or includes itself
+    """
+
+    def include(match):
+        name = match.group(1)
+        if name in _including:
+            raise ValueError(f"Partial includes itself: {' -> '.join(_including)}")
+        path = os.path.join(partials_dir, *name.split("/")) + ".html"
+        try:
+            partial, dependencies[path] = read_template_file(path)
+        except FileNotFoundError:
+            raise ValueError(f"Partial not found: {name} ({path})")
+        return expand_partials(
+            partial, partials_dir, dependencies, _including + (name,)
+        )
+
+    return PARTIAL_PATTERN.sub(include, source)
+
+
+class CompiledTemplate:
+    """
+    An HTML template split into static segments and named slots.
+
+    The template's own links are rebased once at compile time, so rendering
+    a page is a single join of the segments with the slot values. With a
+    partials directory, {{> name }} includes are inlined first; the hash
+    covers the expanded source, so it changes with any partial used.
+
+    Args:
+        source (str): Template source
+        basepath (str): Base path for the template's own links
+        partials_dir (str): Optional directory of partials for {{> name }}
+        dependencies (dict): Files the source was read from, mapping each
+            path to its hash; partials read here are added
+    """
+
+    def __init__(self, source, basepath="/", partials_dir=None, dependencies=None):
+        self.dependencies = dict(dependencies or {})
+        if partials_dir is not None:
+            source = expand_partials(source, partials_dir, self.dependencies)
+        self.source = source
+        self.basepath = basepath
+        self.hash = hash_text(source)
+
+        parts = SLOT_PATTERN.split(apply_basepath(source, basepath))
+        # Even indexes are static text, odd indexes are slot names
+        self.segments = parts[::2]
+        self.slots = parts[1::2]
+
+    @classmethod
+    def load(cls, template_path, basepath="/", partials_dir=None):
+        """
+        Read and compile a template file.
+
+        Args:
+            template_path (str): Path of the HTML template
+            basepath (str): Base path for the template's own links
+            partials_dir (str): Optional directory of partials for {{> name }}
+
+        Returns:
+            CompiledTemplate: The compiled template
+        """
+        source, file_hash = read_template_file(template_path)
+        return cls(source, basepath, partials_dir, {template_path: file_hash})
+
+    def render(self, title, content):
+        """
+        Fill the template's slots.
+
+        Args:
+            title (str): Value for {{ Title }}
+            content (str): Rendered HTML for {{ Content }}
+
+        Returns:
+            str: The complete page
+        """
+        return "".join(self.render_chunks(title, [content]))
+
+    def render_chunks(self, title, content_chunks):
+        """
+        Fill the template's slots, yielding the page as string fragments.
+
+        Args:
+            title (str): Value for {{ Title }}
+            content_chunks (iterable): HTML fragments for {{ Content }}, such
+                as the output of HTMLNode.to_html_chunks()
+
+        Yields:
+            str: Fragments of the complete page
+        """
+        if self.slots.count("Content") > 1:
+            # A generator can only be consumed once, so render it up front
+            content_chunks = ["".join(content_chunks)]
+        yield self.segments[0]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot == "Title":
+                yield title
+            else:
+                yield from content_chunks
+            yield segment
+
+    def __repr__(self):
+        return f"CompiledTemplate(slots={self.slots}, basepath={self.basepath})"
+
+
+def load_template(template, basepath="/"):
+    """Return template compiled for basepath, loading it first if it is a path."""
+    if isinstance(template, CompiledTemplate):
+        if template.basepath == basepath:
+            return template
+        return CompiledTemplate(
+            template.source, basepath, dependencies=template.dependencies
+        )
+    return CompiledTemplate.load(template, basepath)
+
+
+class TemplateSet:
+    """
+    Chooses and compiles the template of each page.
+
+    A page uses the template named for it, if any, or else the template of
+    its nearest content directory that has one: pages under content/blog/
+    use templates/blog.html, and pages under content/blog/tom/ use
+    templates/blog/tom.html when it exists. Every other page uses the
+    default template. All of them can include partials from
+    templates/partials/. Each template is compiled once per build.
+
+    Args:
+        default (str or CompiledTemplate): The default template or its path
+        templates_dir (str): Optional directory of named and per-directory
+            templates, with partials in its partials/ subdirectory
+        content_dir (str): Content directory that page sources are under
+        basepath (str): Base path for the templates' own links
+    """
+
+    def __init__(self, default, templates_dir=None, content_dir=None, basepath="/"):
+        self.templates_dir = templates_dir
+        self.content_dir = content_dir
+        self.basepath = basepath
+        self.partials_dir = None
+        if templates_dir is not None:
+            self.partials_dir = os.path.join(templates_dir, "partials")
+        if isinstance(default, CompiledTemplate):
+            self.default = load_template(default, basepath)
+        else:
+            self.default = CompiledTemplate.load(default, basepath, self.partials_dir)
+        self._compiled = {}
+        self._by_dir = {}
+
+    def named(self, name):
+        """
+        Return the template templates/<name>.html.
+
+        Raises:
+            ValueError: If there is no such template
+        """
+        if self.templates_dir is not None:
+            path = os.path.join(self.templates_dir, *name.split("/")) + ".html"
+            if os.path.isfile(path):
+                return self._load(path)
+        raise ValueError(f"Template not found: {name}")
+
+    def for_source(self, source_path, name=None):
+        """Return the template of the page generated from a file in content_dir."""
+        if self.content_dir is not None:
+            source_path = os.path.relpath(source_path, self.content_dir)
+        return self.for_page(source_path.replace(os.sep, "/"), name)
+
+    def for_page(self, path, name=None):
+        """
+        Return the template of a page.
+
+        Args:
+            path (str): Path of the page's source relative to the content
+                directory, with "/", e.g. "blog/tom/index.md"
+            name (str): Optional template name chosen by the page itself
+
+        Returns:
+            CompiledTemplate: The page's template
+        """
+        if name is not None:
+            return self.named(name)
+        if self.templates_dir is None:
+            return self.default
+        rel_dir = path.rpartition("/")[0]
+        template = self._by_dir.get(rel_dir)
+        if template is None:
+            template = self._by_dir[rel_dir] = self._for_dir(rel_dir)
+        return template
+
+    def _for_dir(self, rel_dir):
+        while rel_dir:
+            path = os.path.join(self.templates_dir, *rel_dir.split("/")) + ".html"
+            if os.path.isfile(path):
+                return self._load(path)
+            rel_dir = rel_dir.rpartition("/")[0]
+        return self.default
+
+    def _load(self, path):
+        template = self._compiled.get(path)
+        if template is None:
+            template = CompiledTemplate.load(path, self.basepath, self.partials_dir)
+            self._compiled[path] = template
+        return template
+
+    def __repr__(self):
+        return f"TemplateSet({self.templates_dir}, basepath={self.basepath})"
+
+
+def load_templates(template, basepath="/"):
+    """Return a TemplateSet for a template, its path, or a TemplateSet."""
+    if isinstance(template, TemplateSet):
+        if template.basepath != basepath:
+            raise ValueError(
+                f"TemplateSet is for base path {template.basepath}, not {basepath}"
+            )
+        return template
+    return TemplateSet(template, basepath=basepath)
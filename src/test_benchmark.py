@@ -0,0 +1,66 @@
+import unittest
+
+from benchmark import (
+    MIXES,
+    STAGES,
+    generate_corpus,
+    run_benchmark,
+    run_memory_benchmark,
+    run_pattern_benchmark,
+)
+from block_markdown import inline_cache_info, markdown_to_html_node
+from extract_title import extract_title
+from inline_markdown import get_inline_parser
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        self.assertEqual(
+            list(generate_corpus(5, "mixed", seed=3)),
+            list(generate_corpus(5, "mixed", seed=3)),
+        )
+        self.assertNotEqual(
+            list(generate_corpus(5, "mixed", seed=3)),
+            list(generate_corpus(5, "mixed", seed=4)),
+        )
+
+    def test_every_mix_parses(self):
+        for mix in MIXES:
+            with self.subTest(mix=mix):
+                for markdown in generate_corpus(20, mix):
+                    self.assertTrue(extract_title(markdown).startswith("Page "))
+                    markdown_to_html_node(markdown).to_html()
+
+    def test_unknown_mix(self):
+        with self.assertRaises(ValueError):
+            list(generate_corpus(1, "tables"))
+
+    def test_run_benchmark_reports_every_stage(self):
+        result = run_benchmark(3, "links", "scan")
+        self.assertEqual(result["pages"], 3)
+        self.assertEqual(result["parser"], "scan")
+        self.assertEqual(list(result["stages"]), list(STAGES))
+        self.assertGreater(result["markdown_bytes"], 0)
+        self.assertEqual(get_inline_parser(), "split")
+
+    def test_run_memory_benchmark(self):
+        cache_size = inline_cache_info().maxsize
+        result = run_memory_benchmark(5, "lists")
+        self.assertGreater(result["peak_traced_bytes"], 0)
+        self.assertEqual(
+            result["bytes_per_page"], round(result["peak_traced_bytes"] / 5, 1)
+        )
+        self.assertEqual(inline_cache_info().maxsize, cache_size)
+
+    def test_run_pattern_benchmark(self):
+        result = run_pattern_benchmark(texts=5, repeat=1)
+        self.assertEqual(
+            sorted(result["cases"]), ["extract_images", "extract_links", "scan_tokens"]
+        )
+        for case in result["cases"].values():
+            self.assertGreater(case["before_ns"], 0)
+            self.assertGreater(case["after_ns"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from build_plan import PAGE, STATIC, BuildJob, BuildPlan, as_page_job, scan_tree
+
+
+class TestBuildPlan(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.static_dir = os.path.join(self.temp_dir, "static")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        for rel_path, content in [
+            ("content/index.md", "# Home"),
+            ("content/blog/b.md", "# B"),
+            ("content/blog/a.md", "# A"),
+            ("content/notes.txt", "not markdown"),
+            ("static/index.css", "body {}"),
+            ("static/images/a.png", "png"),
+        ]:
+            path = os.path.join(self.temp_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+        os.makedirs(os.path.join(self.static_dir, "empty"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_scan_pages(self):
+        jobs, dirs = scan_tree(self.content_dir, self.dest_dir, PAGE)
+        self.assertEqual(
+            [job.key for job in jobs], ["blog/a.html", "blog/b.html", "index.html"]
+        )
+        self.assertEqual(dirs, ["blog"])
+        job = jobs[0]
+        self.assertEqual(job.source, os.path.join(self.content_dir, "blog", "a.md"))
+        self.assertEqual(job.dest, os.path.join(self.dest_dir, "blog", "a.html"))
+        self.assertEqual(job.kind, PAGE)
+
+    def test_jobs_carry_source_stat(self):
+        jobs, _ = scan_tree(self.static_dir, self.dest_dir, STATIC)
+        for job in jobs:
+            with self.subTest(key=job.key):
+                stat = os.stat(job.source)
+                self.assertEqual(job.mtime_ns, stat.st_mtime_ns)
+                self.assertEqual(job.size, stat.st_size)
+                self.assertEqual((job.ino, job.dev), (stat.st_ino, stat.st_dev))
+
+    def test_scan_plan(self):
+        plan = BuildPlan.scan(self.content_dir, self.static_dir, self.dest_dir)
+        self.assertEqual(len(plan.pages), 3)
+        self.assertEqual(
+            [job.key for job in plan.static], ["images/a.png", "index.css"]
+        )
+        self.assertEqual(plan.static_dirs, ["empty", "images"])
+
+    def test_as_page_job(self):
+        job = as_page_job(("a.md", "a.html"))
+        self.assertEqual(job, BuildJob("a.md", "a.html", PAGE))
+        self.assertIsNone(job.mtime_ns)
+        self.assertIs(as_page_job(job), job)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from block_markdown import markdown_to_html_node
+from collectors import (
+    PageSummary,
+    SearchIndexCollector,
+    SitemapCollector,
+    page_url,
+    run_collectors,
+    shard_name,
+)
+from generate_page import collect_pages, generate_pages
+from manifest import BuildManifest
+from parse_cache import ParseCache
+
+
+class TestPageSummary(unittest.TestCase):
+    def test_fill_from_node_tree(self):
+        markdown = (
+            "# Title\n\nSome **bold**text and [a link](/x).\n\n"
+            "## Section one\n\n- first\n- second\n\n```\ncode here\n```"
+        )
+        summary = PageSummary().fill(markdown_to_html_node(markdown), "Title")
+        self.assertEqual(summary.title, "Title")
+        self.assertEqual(summary.headings, [[1, "Title"], [2, "Section one"]])
+        self.assertEqual(
+            summary.text,
+            "Title Some boldtext and a link. Section one first second code here",
+        )
+
+    def test_dict_round_trip(self):
+        summary = PageSummary("T", [[1, "T"]], "T body")
+        self.assertEqual(PageSummary.from_dict(summary.to_dict()), summary)
+
+
+class TestCollectors(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "/")
+        self.assertEqual(page_url("blog/post/index.html", "/repo/"), "/repo/blog/post/")
+        self.assertEqual(page_url("about.html"), "/about.html")
+
+    def test_sitemap(self):
+        collector = SitemapCollector("https://example.com/")
+        collector.add("/", PageSummary("Home", [], ""), 0)
+        collector.add("/a&b/", PageSummary("A", [], ""))
+        (path,) = collector.write(self.temp_dir)
+        with open(path) as f:
+            sitemap = f.read()
+        self.assertIn(
+            "<url><loc>https://example.com/</loc><lastmod>1970-01-01</lastmod></url>",
+            sitemap,
+        )
+        self.assertIn("<url><loc>https://example.com/a&amp;b/</loc></url>", sitemap)
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("gandalf"), "ga")
+        self.assertEqual(shard_name("gandalf", 3), "gan")
+        self.assertEqual(shard_name("éowyn"), "_")
+        self.assertEqual(shard_name("__init__"), "_")
+
+    def test_search_index(self):
+        search_dir = os.path.join(self.temp_dir, "search")
+        os.makedirs(search_dir)
+        with open(os.path.join(search_dir, "zz.json"), "w") as f:
+            f.write("{}")
+
+        collector = SearchIndexCollector()
+        collector.add("/", PageSummary("Home", [[1, "Home"]], "Home of Gandalf a"))
+        collector.add("/b/", PageSummary("B", [[1, "B"]], "gandalf GAME game"))
+        collector.write(self.temp_dir)
+
+        def load(name):
+            with open(os.path.join(search_dir, name)) as f:
+                return json.load(f)
+
+        self.assertEqual(
+            load("_pages.json"),
+            [{"u": "/", "t": "Home", "h": ["Home"]}, {"u": "/b/", "t": "B", "h": ["B"]}],
+        )
+        self.assertEqual(load("ga.json"), {"game": [1], "gandalf": [0, 1]})
+        self.assertEqual(load("ho.json"), {"home": [0]})
+        # Stale shards go, single-letter words are not indexed
+        self.assertEqual(
+            sorted(os.listdir(search_dir)), ["_pages.json", "ga.json", "ho.json", "of.json"]
+        )
+
+
+class TestCollectedBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.template_path = os.path.join(self.temp_dir, "template.html")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        with open(self.template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.write("index.md", "# Home\n\nWelcome")
+        self.write(os.path.join("blog", "index.md"), "# Blog\n\n## Posts")
+        self.summaries_path = os.path.join(self.temp_dir, ".cache", "summaries.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.content_dir, name), "w") as f:
+            f.write(content)
+
+    def build(self, collect=True, collectors=None, **kwargs):
+        manifest = BuildManifest.load(self.dest_dir, self.summaries_path)
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        generate_pages(
+            pages, self.template_path, manifest=manifest, collect=collect, **kwargs
+        )
+        manifest.prune()
+        collector = SearchIndexCollector()
+        if collectors is None:
+            collectors = [collector]
+        run_collectors(collectors, manifest)
+        manifest.save()
+        return collector
+
+    def test_skipped_pages_are_still_collected(self):
+        self.build()
+        index = os.path.join(self.dest_dir, "index.html")
+        os.utime(index, ns=(0, 0))
+        collector = self.build()
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        self.assertEqual(
+            collector.pages,
+            [
+                {"u": "/", "t": "Home", "h": ["Home"]},
+                {"u": "/blog/", "t": "Blog", "h": ["Blog", "Posts"]},
+            ],
+        )
+        self.assertEqual(collector.postings["welcome"], [0])
+
+    def test_summaries_are_kept_out_of_the_output(self):
+        self.build()
+        # The manifest and dependency graph are published with the site
+        for name in os.listdir(self.dest_dir):
+            if name.startswith("."):
+                with open(os.path.join(self.dest_dir, name)) as f:
+                    self.assertNotIn("Welcome", f.read())
+        with open(self.summaries_path) as f:
+            self.assertIn("Welcome", f.read())
+
+        # Without the stored summaries, every page is summarized again
+        os.remove(self.summaries_path)
+        self.assertEqual(len(self.build().pages), 2)
+
+    def test_dropped_collectors_remove_their_output(self):
+        sitemap = SitemapCollector("https://example.com")
+        self.build(collectors=[sitemap, SearchIndexCollector()])
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "sitemap.xml")))
+        self.assertTrue(os.path.isdir(os.path.join(self.dest_dir, "search")))
+
+        self.build(collectors=[sitemap])
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "search")))
+        self.build(collectors=[])
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "sitemap.xml")))
+        self.assertEqual(BuildManifest.load(self.dest_dir).collected, [])
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "index.html")))
+
+    def test_pages_built_without_summaries_are_regenerated(self):
+        self.assertEqual(self.build(collect=False).pages, [])
+        self.assertEqual(len(self.build().pages), 2)
+
+    def test_pipelined_and_cached_builds_collect(self):
+        cache = ParseCache(os.path.join(self.temp_dir, "cache"))
+        # Fills the parse cache without summaries, then with them
+        self.build(collect=False, parse_cache=cache)
+        shutil.rmtree(self.dest_dir)
+        expected = self.build(parse_cache=cache, io_threads=2).pages
+        self.assertEqual(len(expected), 2)
+        shutil.rmtree(self.dest_dir)
+        self.assertEqual(self.build(parse_cache=cache).pages, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,55 +1,90 @@
 import os
 import tempfile
 import shutil
-from copystatic import copy_files_recursive
-
-
-def test_copy_function_manually():
-    """Manual test for the copy function with nested directories."""
-
-    # Create temporary directories for testing
-    temp_dir = tempfile.mkdtemp()
-    source_dir = os.path.join(temp_dir, "test_static")
-    dest_dir = os.path.join(temp_dir, "test_public")
-
-    try:
-        # Create test directory structure
-        os.makedirs(source_dir)
-        os.makedirs(os.path.join(source_dir, "css"))
-        os.makedirs(os.path.join(source_dir, "js"))
-        os.makedirs(os.path.join(source_dir, "images", "nested"))
-
-        # Create test files
-        with open(os.path.join(source_dir, "index.html"), "w") as f:
-            f.write("<html><body>Test</body></html>")
-
-        with open(os.path.join(source_dir, "css", "style.css"), "w") as f:
-            f.write("body { color: blue; }")
-
-        with open(os.path.join(source_dir, "js", "script.js"), "w") as f:
-            f.write("console.log('test');")
-
-        with open(os.path.join(source_dir, "images", "nested", "test.png"), "w") as f:
-            f.write("fake image data")
-
-        copy_files_recursive(source_dir, dest_dir)
-
-        assert os.path.exists(os.path.join(dest_dir, "index.html"))
-        assert os.path.exists(os.path.join(dest_dir, "css", "style.css"))
-        assert os.path.exists(os.path.join(dest_dir, "js", "script.js"))
-        assert os.path.exists(os.path.join(dest_dir, "images", "nested", "test.png"))
-
-        with open(os.path.join(dest_dir, "should_remain.txt"), "w") as f:
-            f.write("This should remain")
-
-        copy_files_recursive(source_dir, dest_dir)
-
-        assert os.path.exists(os.path.join(dest_dir, "should_remain.txt"))
-        assert os.path.exists(os.path.join(dest_dir, "index.html"))
-
-    finally:
-        shutil.rmtree(temp_dir)
+import unittest
+from copystatic import place_file, sync_files_recursive
+from manifest import BuildManifest
+
+
+class TestSyncFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.temp_dir, "static")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        os.makedirs(os.path.join(self.source_dir, "images"))
+        self.write(os.path.join(self.source_dir, "index.css"), "body {}")
+        self.write(os.path.join(self.source_dir, "images", "a.png"), "png data")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_first_sync_copies_everything(self):
+        updated, removed = sync_files_recursive(self.source_dir, self.dest_dir)
+        self.assertEqual(updated, ["images/a.png", "index.css"])
+        self.assertEqual(removed, [])
+        self.assertEqual(
+            self.read(os.path.join(self.dest_dir, "images", "a.png")), "png data"
+        )
+
+    def test_second_sync_skips_unchanged(self):
+        for link in (True, False):
+            with self.subTest(link=link):
+                shutil.rmtree(self.dest_dir, ignore_errors=True)
+                sync_files_recursive(self.source_dir, self.dest_dir, link=link)
+                updated, _ = sync_files_recursive(
+                    self.source_dir, self.dest_dir, link=link
+                )
+                self.assertEqual(updated, [])
+
+    def test_changed_file_is_updated(self):
+        sync_files_recursive(self.source_dir, self.dest_dir, link=False)
+        source = os.path.join(self.source_dir, "index.css")
+        self.write(source, "body { color: red; }")
+        updated, _ = sync_files_recursive(self.source_dir, self.dest_dir, link=False)
+        self.assertEqual(updated, ["index.css"])
+        self.assertEqual(
+            self.read(os.path.join(self.dest_dir, "index.css")), "body { color: red; }"
+        )
+
+    def test_hash_mode_ignores_mtime(self):
+        sync_files_recursive(self.source_dir, self.dest_dir, link=False)
+        os.utime(os.path.join(self.dest_dir, "index.css"), ns=(0, 0))
+        updated, _ = sync_files_recursive(
+            self.source_dir, self.dest_dir, use_hash=True, link=False
+        )
+        self.assertEqual(updated, [])
+        updated, _ = sync_files_recursive(self.source_dir, self.dest_dir, link=False)
+        self.assertEqual(updated, ["index.css"])
+
+    def test_stale_files_removed_with_manifest(self):
+        manifest = BuildManifest(self.dest_dir)
+        sync_files_recursive(self.source_dir, self.dest_dir, manifest)
+        self.write(os.path.join(self.dest_dir, "page.html"), "generated")
+        shutil.rmtree(os.path.join(self.source_dir, "images"))
+        _, removed = sync_files_recursive(self.source_dir, self.dest_dir, manifest)
+        self.assertEqual(removed, ["images/a.png"])
+        self.assertEqual(manifest.assets, ["index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "page.html")))
+
+    def test_place_file_never_writes_through_links(self):
+        source = os.path.join(self.source_dir, "index.css")
+        dest = os.path.join(self.temp_dir, "linked.css")
+        os.link(source, dest)
+        other = os.path.join(self.temp_dir, "other.css")
+        self.write(other, "other")
+        self.assertEqual(place_file(other, dest, link=False), "copy")
+        self.assertEqual(self.read(source), "body {}")
+        self.assertEqual(self.read(dest), "other")
 
 
 if __name__ == "__main__":
-    test_copy_function_manually()
+    unittest.main()
@@ -0,0 +1,301 @@
+import http.client
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import devserver
+from devserver import (
+    LIVERELOAD_SCRIPT,
+    ReloadBroadcaster,
+    SiteWatcher,
+    diff_snapshots,
+    make_server,
+    snapshot,
+)
+from images import ImagePipeline
+from png import PngImage, encode_png
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), (["b", "d"], ["c"]))
+
+    def test_snapshot_files_and_directories(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(temp_dir, "dir", "sub"))
+            paths = [
+                os.path.join(temp_dir, "file.txt"),
+                os.path.join(temp_dir, "dir", "sub", "x.md"),
+            ]
+            for path in paths:
+                with open(path, "w") as f:
+                    f.write("x")
+            state = snapshot(
+                [paths[0], os.path.join(temp_dir, "dir"), os.path.join(temp_dir, "nope")]
+            )
+            self.assertEqual(sorted(state), sorted(paths))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.static_dir = os.path.join(self.temp_dir, "static")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.template_path = os.path.join(self.temp_dir, "template.html")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        os.makedirs(self.static_dir)
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home")
+        self.write(os.path.join(self.content_dir, "blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static_dir, "index.css"), "body {}")
+        self.broadcaster = ReloadBroadcaster()
+        self.watcher = SiteWatcher(
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.dest_dir,
+            broadcaster=self.broadcaster,
+        )
+        self.watcher.build()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest_dir, *parts)) as f:
+            return f.read()
+
+    def test_initial_build(self):
+        self.assertIn("<title>Home</title>", self.read("index.html"))
+        self.assertEqual(self.read("index.css"), "body {}")
+
+    def test_no_change_no_rebuild(self):
+        self.assertFalse(self.watcher.poll())
+        self.assertEqual(self.broadcaster.version, 0)
+
+    def test_changed_page_rebuilds_only_that_page(self):
+        post = os.path.join(self.dest_dir, "blog", "post.html")
+        os.utime(post, ns=(0, 0))
+        self.write(os.path.join(self.content_dir, "index.md"), "# New Home")
+        self.assertTrue(self.watcher.poll())
+        self.assertIn("<title>New Home</title>", self.read("index.html"))
+        self.assertEqual(os.stat(post).st_mtime_ns, 0)
+        self.assertEqual(self.broadcaster.version, 1)
+
+    def test_new_and_deleted_pages(self):
+        self.write(os.path.join(self.content_dir, "new.md"), "# New")
+        os.remove(os.path.join(self.content_dir, "blog", "post.md"))
+        self.watcher.poll()
+        self.assertIn("<title>New</title>", self.read("new.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog")))
+        self.assertNotIn("blog/post.html", self.watcher.manifest.pages)
+
+    def test_template_change_rebuilds_everything(self):
+        self.write(self.template_path, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.watcher.poll()
+        self.assertIn("<h2>Home</h2>", self.read("index.html"))
+        self.assertIn("<h2>Post</h2>", self.read("blog", "post.html"))
+
+    def test_template_change_after_moving_the_project(self):
+        # The manifest and dependency graph were written by another checkout
+        moved_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, moved_dir)
+        moved = os.path.join(moved_dir, "site")
+        shutil.move(self.temp_dir, moved)
+        os.makedirs(self.temp_dir)
+        watcher = SiteWatcher(
+            os.path.join(moved, "content"),
+            os.path.join(moved, "static"),
+            os.path.join(moved, "template.html"),
+            os.path.join(moved, "docs"),
+        )
+        watcher.build()
+        self.write(
+            os.path.join(moved, "template.html"), "<h2>{{ Title }}</h2>{{ Content }}"
+        )
+        self.assertTrue(watcher.poll())
+        with open(os.path.join(moved, "docs", "blog", "post.html")) as f:
+            self.assertIn("<h2>Post</h2>", f.read())
+
+    def write_image(self, width):
+        path = os.path.join(self.static_dir, "images", "photo.png")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(encode_png(PngImage(width, 10, 1, bytearray(width * 10))))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def image_watcher(self):
+        return SiteWatcher(
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.dest_dir,
+            image_pipeline=ImagePipeline(
+                os.path.join(self.temp_dir, ".cache", "images"), (20,)
+            ),
+        )
+
+    def test_pages_keep_their_image_srcset(self):
+        self.write_image(40)
+        self.write(
+            os.path.join(self.content_dir, "index.md"),
+            "# Home\n\n![P](/images/photo.png)",
+        )
+        watcher = self.image_watcher()
+        watcher.build()
+        self.assertIn(
+            'width="40" height="10" srcset="/images/_variants/photo-20w.png 20w, '
+            '/images/photo.png 40w"',
+            self.read("index.html"),
+        )
+        self.assertTrue(
+            os.path.isfile(
+                os.path.join(self.dest_dir, "images", "_variants", "photo-20w.png")
+            )
+        )
+
+        # A fresh watcher, as after a CLI build, finds every page up to date
+        with unittest.mock.patch("generate_page.generate_page") as generate_page:
+            self.image_watcher().build()
+        generate_page.assert_not_called()
+
+        # A resized image gets new variants and the pages showing it update
+        self.write_image(60)
+        self.assertTrue(watcher.poll())
+        self.assertIn(
+            'width="60" height="10" srcset="/images/_variants/photo-20w.png 20w, '
+            '/images/photo.png 60w"',
+            self.read("index.html"),
+        )
+
+    def test_partial_change_rebuilds_dependents(self):
+        templates_dir = os.path.join(self.temp_dir, "templates")
+        nav = os.path.join(templates_dir, "partials", "nav.html")
+        os.makedirs(os.path.dirname(nav))
+        self.write(nav, "<nav>old</nav>")
+        watcher = SiteWatcher(
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.dest_dir,
+            templates_dir=templates_dir,
+        )
+        watcher.build()
+        # A new directory template can change any page's template
+        self.write(
+            os.path.join(templates_dir, "blog.html"), "{{> nav }}{{ Content }}"
+        )
+        self.assertTrue(watcher.poll())
+        self.assertIn("<nav>old</nav>", self.read("blog", "post.html"))
+
+        self.write(nav, "<nav>new</nav>")
+        with unittest.mock.patch.object(
+            devserver, "generate_pages", wraps=devserver.generate_pages
+        ) as generate_pages:
+            self.assertTrue(watcher.poll())
+        self.assertEqual(
+            generate_pages.call_args.args[0],
+            [
+                (
+                    os.path.join(self.content_dir, "blog", "post.md"),
+                    os.path.join(self.dest_dir, "blog", "post.html"),
+                )
+            ],
+        )
+        self.assertIn("<nav>new</nav>", self.read("blog", "post.html"))
+
+    def test_new_post_updates_listings(self):
+        os.makedirs(os.path.join(self.content_dir, "blog", "tom"))
+        self.write(
+            os.path.join(self.content_dir, "blog", "tom", "index.md"),
+            "---\ntags: [tolkien]\ndraft: true\n---\n# Tom",
+        )
+        self.assertTrue(self.watcher.poll())
+        self.assertIn('<a href="/blog/tom/">Tom</a>', self.read("blog", "index.html"))
+        self.assertIn("Tom", self.read("blog", "tags", "tolkien", "index.html"))
+
+        os.remove(os.path.join(self.content_dir, "blog", "tom", "index.md"))
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog", "tags")))
+
+    def test_static_change_resyncs(self):
+        self.write(os.path.join(self.static_dir, "index.css"), "body { margin: 0; }")
+        self.watcher.poll()
+        self.assertEqual(self.read("index.css"), "body { margin: 0; }")
+
+    def test_invalid_markdown_keeps_watching(self):
+        self.write(os.path.join(self.content_dir, "index.md"), "no title")
+        self.assertFalse(self.watcher.poll())
+        self.write(os.path.join(self.content_dir, "index.md"), "# Fixed")
+        self.assertTrue(self.watcher.poll())
+        self.assertIn("<title>Fixed</title>", self.read("index.html"))
+
+
+class TestLiveReloadServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, "blog"))
+        with open(os.path.join(self.temp_dir, "blog", "index.html"), "w") as f:
+            f.write("<html><body><p>hi</p></body></html>")
+        with open(os.path.join(self.temp_dir, "index.css"), "w") as f:
+            f.write("body {}")
+        self.broadcaster = ReloadBroadcaster()
+        self.server = make_server(self.temp_dir, self.broadcaster, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.port = self.server.server_port
+
+    def tearDown(self):
+        self.broadcaster.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def get(self, path):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        connection.request("GET", path)
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response, body
+
+    def test_html_gets_reload_script(self):
+        response, body = self.get("/blog/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            body, b"<html><body><p>hi</p>" + LIVERELOAD_SCRIPT + b"</body></html>"
+        )
+
+    def test_other_files_served_unchanged(self):
+        response, body = self.get("/index.css")
+        self.assertEqual(body, b"body {}")
+
+    def test_event_stream_reports_reload(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        connection.request("GET", "/__livereload")
+        response = connection.getresponse()
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        self.broadcaster.notify()
+        self.assertEqual(response.fp.readline(), b"data: reload\n")
+        connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
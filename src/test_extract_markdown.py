@@ -8,8 +8,10 @@ from inline_markdown import (
     text_to_textnodes,
 )
 from block_markdown import (
+    Block,
     markdown_to_blocks,
     block_to_block_type,
+    scan_blocks,
     BlockType,
 )
 from textnode import TextNode, TextType
@@ -621,6 +623,83 @@ Paragraph with [link](https://example.com) and ![image](https://example.com/img.
         self.assertEqual(blocks, expected)
 
 
+    def test_markdown_to_blocks_triple_newline(self):
+        self.assertEqual(
+            markdown_to_blocks("- a\n\n\n- b\n  c"), ["- a", "- b\n  c"]
+        )
+
+    def test_markdown_to_blocks_crlf(self):
+        md = "# Title\r\n\r\nFirst line\r\nSecond line\r\n\r\n- item\r\n"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["# Title", "First line\nSecond line", "- item"],
+        )
+        self.assertEqual(markdown_to_blocks(md), markdown_to_blocks(md.replace("\r\n", "\n")))
+
+    def test_markdown_to_blocks_whitespace_only_line_separates(self):
+        self.assertEqual(
+            markdown_to_blocks("First block\n   \nSecond block\n\t\n\nThird"),
+            ["First block", "Second block", "Third"],
+        )
+
+    def test_markdown_to_blocks_fenced_code_keeps_blank_lines(self):
+        md = "Intro\n\n```\ndef f():\n\n\n    return 1\n```\n\nAfter"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["Intro", "```\ndef f():\n\n\n    return 1\n```", "After"],
+        )
+
+    def test_markdown_to_blocks_unclosed_fence(self):
+        md = "```\nno closing fence\n\nNext block\n\n```\nstill open"
+        self.assertEqual(
+            markdown_to_blocks(md),
+            ["```\nno closing fence", "Next block", "```\nstill open"],
+        )
+
+
+class TestScanBlocks(unittest.TestCase):
+    def test_blocks_are_classified(self):
+        md = """# Title
+
+Some text
+
+```
+x = 1
+
+y = 2
+```
+
+> quoted
+
+- one
+* two
+
+1. first
+2. second"""
+        self.assertEqual(
+            scan_blocks(md),
+            [
+                Block(BlockType.HEADING, "# Title"),
+                Block(BlockType.PARAGRAPH, "Some text"),
+                Block(BlockType.CODE, "```\nx = 1\n\ny = 2\n```"),
+                Block(BlockType.QUOTE, "> quoted"),
+                Block(BlockType.UNORDERED_LIST, "- one\n* two"),
+                Block(BlockType.ORDERED_LIST, "1. first\n2. second"),
+            ],
+        )
+
+    def test_types_match_block_to_block_type(self):
+        md = "> a\nb\n\n- a\nb\n\n1. a\n3. b\n\n```\ncode\n```\ntrailing"
+        for block in scan_blocks(md):
+            with self.subTest(block=block):
+                self.assertEqual(block.block_type, block_to_block_type(block.text))
+                self.assertEqual(block.block_type, BlockType.PARAGRAPH)
+
+    def test_empty(self):
+        self.assertEqual(scan_blocks(""), [])
+        self.assertEqual(scan_blocks("\r\n \r\n"), [])
+
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_block_to_block_type_heading_h1(self):
         block = "# This is a heading"
@@ -742,6 +821,13 @@ class TestBlockToBlockType(unittest.TestCase):
         result = block_to_block_type(block)
         self.assertEqual(result, BlockType.QUOTE)
 
+    def test_block_to_block_type_long_ordered_list(self):
+        block = "\n".join(f"{i}. Item {i}" for i in range(1, 13))
+        self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
+        self.assertEqual(
+            block_to_block_type(block.replace("11. ", "12. ")), BlockType.PARAGRAPH
+        )
+
     def test_block_to_block_type_heading_variations(self):
         test_cases = [
             ("# H1", BlockType.HEADING),
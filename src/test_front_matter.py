@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from front_matter import read_header, split_front_matter
+from generate_page import render_page
+from template import CompiledTemplate
+
+POST = """---
+date: 2024-03-01
+tags: [tolkien, "essays"]
+template: post
+draft: true
+---
+# Why Tom Bombadil Was a Mistake
+
+Body text.
+"""
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_split(self):
+        metadata, body = split_front_matter(POST)
+        self.assertEqual(
+            metadata,
+            {
+                "date": "2024-03-01",
+                "tags": ["tolkien", "essays"],
+                "template": "post",
+                "draft": True,
+            },
+        )
+        self.assertEqual(body, "# Why Tom Bombadil Was a Mistake\n\nBody text.\n")
+
+    def test_no_front_matter(self):
+        markdown = "# Title\n\n---\n\ntext"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+        self.assertEqual(split_front_matter("----\nx"), ({}, "----\nx"))
+
+    def test_values(self):
+        metadata, _ = split_front_matter(
+            "---\ntitle: 'A: B'\ntags: []\n# comment\n\nweight: 3\n---\n"
+        )
+        self.assertEqual(metadata, {"title": "A: B", "tags": [], "weight": "3"})
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle: A\n# Title")
+        with self.assertRaises(ValueError):
+            split_front_matter("---\nnot a pair\n---\n")
+
+    def test_title_and_template_must_be_strings(self):
+        for line in ("title: true", "title: [a, b]", "template: [post]"):
+            with self.assertRaises(ValueError) as context:
+                split_front_matter(f"---\n{line}\n---\n", "content/a.md")
+            self.assertIn("must be a string", str(context.exception))
+            self.assertIn("content/a.md", str(context.exception))
+        metadata, _ = split_front_matter("---\ntitle: 2024\n---\n")
+        self.assertEqual(metadata, {"title": "2024"})
+
+
+class TestReadHeader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "index.md")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def test_front_matter_and_title(self):
+        self.write(POST)
+        metadata, _ = split_front_matter(POST)
+        metadata["title"] = "Why Tom Bombadil Was a Mistake"
+        self.assertEqual(read_header(self.path), metadata)
+
+    def test_front_matter_title_wins(self):
+        self.write("---\ntitle: Short\n---\n# Long Title\n")
+        self.assertEqual(read_header(self.path), {"title": "Short"})
+
+    def test_plain_page(self):
+        self.write("Intro\n\n# Title\n\ntext")
+        self.assertEqual(read_header(self.path), {"title": "Title"})
+
+    def test_invalid_front_matter_names_the_file(self):
+        self.write("---\ntitle: [a, b]\n---\n")
+        with self.assertRaises(ValueError) as context:
+            read_header(self.path)
+        self.assertIn(self.path, str(context.exception))
+
+    def test_title_is_the_page_title(self):
+        template = CompiledTemplate("{{ Title }}")
+        for markdown in (
+            "```\n# not a title\n```\n\n# Title",
+            "```\n\n# not a title\n\n```\n\ntext\n# Title",
+            "Intro\n# Early\n\n# Title",
+            "> # quoted\n\n# Title",
+            "Intro\n# Title",
+        ):
+            with self.subTest(markdown=markdown):
+                self.write(markdown)
+                self.assertEqual(read_header(self.path), {"title": "Title"})
+                self.assertEqual("".join(render_page(markdown, template)), "Title")
+
+    def test_reading_stops_at_limit(self):
+        self.write("text\n" * 100 + "# Late title\n")
+        self.assertEqual(read_header(self.path, limit=100), {})
+        self.assertEqual(read_header(self.path), {"title": "Late title"})
+        self.write("---\n" + "a: b\n" * 100)
+        with self.assertRaises(ValueError):
+            read_header(self.path, limit=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,19 @@
 import unittest
+import unittest.mock
 import tempfile
 import os
 import shutil
-from generate_page import generate_page
+import generate_page as generate_page_module
+from generate_page import (
+    BuildError,
+    collect_pages,
+    generate_page,
+    generate_pages,
+    write_page,
+)
+from manifest import BuildManifest
+from parse_cache import ParseCache
+from template import TemplateSet
 
 
 class TestGeneratePage(unittest.TestCase):
@@ -63,6 +74,40 @@ This is **bold** text and this is _italic_ text.
         self.assertIn("<ul>", result)
         self.assertIn("<li>Item 1</li>", result)
 
+    def test_generate_page_title_outside_heading_block(self):
+        """A "# " line inside a paragraph still titles the page."""
+        markdown_path = os.path.join(self.temp_dir, "test.md")
+        with open(markdown_path, "w") as f:
+            f.write("Intro line\n# Late Title")
+        template_path = os.path.join(self.temp_dir, "template.html")
+        with open(template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>")
+        output_path = os.path.join(self.temp_dir, "output.html")
+        generate_page(markdown_path, template_path, output_path)
+        with open(output_path, "r") as f:
+            self.assertEqual(f.read(), "<title>Late Title</title>")
+
+        with open(markdown_path, "w") as f:
+            f.write("## No title")
+        with self.assertRaises(ValueError) as context:
+            generate_page(markdown_path, template_path, output_path)
+        self.assertIn("No h1 header found", str(context.exception))
+
+    def test_generate_page_front_matter(self):
+        """Front matter is left out of the page and its title wins."""
+        markdown_path = os.path.join(self.temp_dir, "test.md")
+        with open(markdown_path, "w") as f:
+            f.write("---\ntitle: Short\ntags: [a]\n---\n# Long Title")
+        template_path = os.path.join(self.temp_dir, "template.html")
+        with open(template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        output_path = os.path.join(self.temp_dir, "output.html")
+        generate_page(markdown_path, template_path, output_path)
+        with open(output_path, "r") as f:
+            self.assertEqual(
+                f.read(), "<title>Short</title><div><h1>Long Title</h1></div>"
+            )
+
     def test_generate_page_creates_directories(self):
         """Test that generate_page creates necessary directories."""
         # Create test files
@@ -92,6 +137,31 @@ This is **bold** text and this is _italic_ text.
         self.assertIn("<title>Test</title>", result)
         self.assertIn("<h1>Test</h1>", result)
 
+    def test_write_page_streams_generator(self):
+        """Test that write_page writes each fragment as it is produced."""
+        output_path = os.path.join(self.temp_dir, "nested", "page.html")
+        consumed = []
+
+        def chunks():
+            for chunk in ("<p>", "streamed", "</p>"):
+                if consumed:
+                    # The previous fragment already went to the temporary file
+                    temp_files = [
+                        name
+                        for name in os.listdir(os.path.dirname(output_path))
+                        if name.endswith(".tmp")
+                    ]
+                    self.assertEqual(len(temp_files), 1)
+                consumed.append(chunk)
+                yield chunk
+
+        self.assertTrue(write_page(output_path, chunks()))
+        self.assertEqual(len(consumed), 3)
+        with open(output_path) as f:
+            self.assertEqual(f.read(), "<p>streamed</p>")
+        consumed.clear()
+        self.assertFalse(write_page(output_path, chunks()))
+
     def test_generate_page_real_content(self):
         """Test with real Tolkien content."""
         markdown_content = """# Tolkien Fan Club
@@ -140,5 +210,177 @@ Here's the deal, **I like Tolkien**.
         self.assertIn('"I am in fact a Hobbit in all but size."', result)
 
 
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.template_path = os.path.join(self.temp_dir, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for rel_path, content in [
+            ("index.md", "# Home"),
+            ("blog/b.md", "# B"),
+            ("blog/a.md", "# A"),
+            ("notes.txt", "not markdown"),
+        ]:
+            path = os.path.join(self.content_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_collect_pages_sorted(self):
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        self.assertEqual(
+            pages,
+            [
+                (
+                    os.path.join(self.content_dir, "blog", "a.md"),
+                    os.path.join(self.dest_dir, "blog", "a.html"),
+                ),
+                (
+                    os.path.join(self.content_dir, "blog", "b.md"),
+                    os.path.join(self.dest_dir, "blog", "b.html"),
+                ),
+                (
+                    os.path.join(self.content_dir, "index.md"),
+                    os.path.join(self.dest_dir, "index.html"),
+                ),
+            ],
+        )
+
+    def test_front_matter_chooses_template(self):
+        templates_dir = os.path.join(self.temp_dir, "templates")
+        os.makedirs(templates_dir)
+        with open(os.path.join(templates_dir, "post.html"), "w") as f:
+            f.write("<post>{{ Title }}</post>")
+        with open(os.path.join(self.content_dir, "blog", "a.md"), "w") as f:
+            f.write("---\ntemplate: post\n---\n# A")
+        templates = TemplateSet(self.template_path, templates_dir, self.content_dir)
+        generate_pages(collect_pages(self.content_dir, self.dest_dir), templates)
+        with open(os.path.join(self.dest_dir, "blog", "a.html")) as f:
+            self.assertEqual(f.read(), "<post>A</post>")
+        with open(os.path.join(self.dest_dir, "blog", "b.html")) as f:
+            self.assertTrue(f.read().startswith("<title>B</title>"))
+
+        with open(os.path.join(self.content_dir, "blog", "a.md"), "w") as f:
+            f.write("---\ntemplate: missing\n---\n# A")
+        with self.assertRaises(ValueError):
+            generate_pages(collect_pages(self.content_dir, self.dest_dir), templates)
+
+    def test_generate_pages_parallel(self):
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        generate_pages(pages, self.template_path, jobs=2)
+        with open(os.path.join(self.dest_dir, "blog", "a.html")) as f:
+            self.assertIn("<title>A</title>", f.read())
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "index.html")))
+
+    def test_generate_pages_parallel_collects_errors_in_order(self):
+        for name in ("z.md", "c.md"):
+            with open(os.path.join(self.content_dir, name), "w") as f:
+                f.write("no title here")
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        with self.assertRaises(BuildError) as context:
+            generate_pages(pages, self.template_path, jobs=2)
+        failed = [path for path, _ in context.exception.failures]
+        self.assertEqual(
+            failed,
+            [
+                os.path.join(self.content_dir, "c.md"),
+                os.path.join(self.content_dir, "z.md"),
+            ],
+        )
+        self.assertIsInstance(context.exception.failures[0][1], ValueError)
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "index.html")))
+
+    def read_outputs(self):
+        outputs = {}
+        for source, dest in collect_pages(self.content_dir, self.dest_dir):
+            with open(dest) as f:
+                outputs[dest] = f.read()
+        return outputs
+
+    def test_generate_pages_io_threads(self):
+        for i in range(20):
+            with open(os.path.join(self.content_dir, f"p{i:02}.md"), "w") as f:
+                f.write(f"# Page {i}\n\nBody of page {i}")
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        generate_pages(pages, self.template_path)
+        serial = self.read_outputs()
+        shutil.rmtree(self.dest_dir)
+
+        manifest = BuildManifest(self.dest_dir)
+        generate_pages(pages, self.template_path, manifest=manifest, io_threads=2)
+        self.assertEqual(self.read_outputs(), serial)
+        self.assertEqual(len(manifest.pages), len(pages))
+
+    def test_io_threads_read_ahead_is_bounded(self):
+        for i in range(30):
+            with open(os.path.join(self.content_dir, f"p{i:02}.md"), "w") as f:
+                f.write(f"# Page {i}")
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        reads = []
+        ahead = []
+        real_read = generate_page_module.read_page_source
+        real_render = generate_page_module.render_page
+
+        def read(path, timings=None):
+            reads.append(path)
+            return real_read(path, timings)
+
+        def render(*args):
+            ahead.append(len(reads) - len(ahead))
+            return real_render(*args)
+
+        with unittest.mock.patch.object(
+            generate_page_module, "read_page_source", read
+        ), unittest.mock.patch.object(generate_page_module, "render_page", render):
+            generate_pages(pages, self.template_path, io_threads=2)
+        self.assertEqual(len(ahead), len(pages))
+        # The page being rendered plus at most 2 * io_threads read ahead
+        self.assertLessEqual(max(ahead), 5)
+
+    def test_io_threads_error_stops_build(self):
+        with open(os.path.join(self.content_dir, "blog", "c.md"), "w") as f:
+            f.write("no title here")
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        manifest = BuildManifest(self.dest_dir)
+        with self.assertRaises(ValueError):
+            generate_pages(pages, self.template_path, manifest=manifest, io_threads=2)
+        self.assertEqual(sorted(manifest.pages), ["blog/a.html", "blog/b.html"])
+
+    def test_parse_cache_skips_parsing_on_template_and_basepath_change(self):
+        with open(os.path.join(self.content_dir, "index.md"), "w") as f:
+            f.write("# Home\n\n[blog](/blog/a.html) and `href=\"/code\"`")
+        index = os.path.join(self.dest_dir, "index.html")
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        cache = ParseCache(os.path.join(self.temp_dir, "cache"))
+
+        generate_pages(pages, self.template_path, "/repo/", parse_cache=cache)
+        with open(index) as f:
+            cached_build = f.read()
+        generate_pages(pages, self.template_path, "/repo/")
+        with open(index) as f:
+            self.assertEqual(f.read(), cached_build)
+        self.assertIn('<a href="/repo/blog/a.html">', cached_build)
+        self.assertIn('<code>href="/code"</code>', cached_build)
+
+        # A hit must not parse: make parsing impossible and rebuild
+        with open(self.template_path, "w") as f:
+            f.write("<h1>{{ Title }}</h1>{{ Content }}")
+        with unittest.mock.patch(
+            "generate_page.markdown_to_document", side_effect=AssertionError
+        ):
+            generate_pages(pages, self.template_path, "/", parse_cache=cache)
+        with open(index) as f:
+            html = f.read()
+        self.assertIn("<h1>Home</h1>", html)
+        self.assertIn('<a href="/blog/a.html">', html)
+        self.assertEqual(len(cache.entries()), 3)
+
+
 if __name__ == "__main__":
     unittest.main()
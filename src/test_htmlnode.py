@@ -1,6 +1,8 @@
 import unittest
 
 from htmlnode import HTMLNode
+from leafnode import LeafNode
+from parentnode import ParentNode
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -58,6 +60,12 @@ class TestHTMLNode(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             node.to_html()
 
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            LeafNode("b", "x").extra = 1
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,222 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import images
+from build_plan import STATIC, scan_tree
+from generate_page import generate_pages, render_page
+from images import ImageInfo, ImagePipeline, ImageSet, add_image_sizes
+from leafnode import LeafNode
+from manifest import BuildManifest
+from parentnode import ParentNode
+from png import PngImage, encode_png
+from template import CompiledTemplate
+
+
+def make_image(width, height):
+    pixels = bytearray((x + y) % 256 for y in range(height) for x in range(width * 3))
+    return encode_png(PngImage(width, height, 3, pixels))
+
+
+class TestAddImageSizes(unittest.TestCase):
+    def setUp(self):
+        self.images = ImageSet(
+            {"/images/a.png": ImageInfo(800, 400, [(480, "/images/a-480w.png")])}
+        )
+
+    def test_known_image_gets_srcset(self):
+        image = LeafNode("img", "", {"src": "/images/a.png", "alt": "A"})
+        tree = ParentNode("p", [image, LeafNode(None, "text")])
+        sized = add_image_sizes(tree, self.images)
+        self.assertEqual(
+            sized.to_html(),
+            '<p><img src="/images/a.png" alt="A" width="800" height="400" '
+            'srcset="/images/a-480w.png 480w, /images/a.png 800w" '
+            'sizes="(max-width: 800px) 100vw, 800px"></img>text</p>',
+        )
+        # The input tree, which the inline cache may share, is untouched
+        self.assertEqual(image.props, {"src": "/images/a.png", "alt": "A"})
+        self.assertIs(sized.children[1], tree.children[1])
+
+    def test_unknown_image_is_shared(self):
+        tree = ParentNode("p", [LeafNode("img", "", {"src": "/other.png"})])
+        self.assertIs(add_image_sizes(tree, self.images), tree)
+
+    def test_render_page_rebases_srcset(self):
+        template = CompiledTemplate("{{ Title }}|{{ Content }}", "/site/")
+        markdown = "# T\n\n![A](/images/a.png)"
+        html = "".join(render_page(markdown, template, "/site/", images=self.images))
+        self.assertIn('src="/site/images/a.png"', html)
+        self.assertIn(
+            'srcset="/site/images/a-480w.png 480w, /site/images/a.png 800w"', html
+        )
+
+
+class TestImagePipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.static_dir = os.path.join(self.temp_dir, "static")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.cache_dir = os.path.join(self.temp_dir, ".cache", "images")
+        os.makedirs(os.path.join(self.static_dir, "images"))
+        os.makedirs(os.path.join(self.dest_dir, "images"))
+        self.write("images/wide.png", make_image(40, 20))
+        self.write("images/small.png", make_image(8, 8))
+        self.write("images/broken.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 40)
+        self.write("logo.png", make_image(40, 20))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, key, data):
+        with open(os.path.join(self.static_dir, *key.split("/")), "wb") as f:
+            f.write(data)
+
+    def process(self, widths=(10, 20), manifest=None, workers=1):
+        jobs, _ = scan_tree(self.static_dir, self.dest_dir, STATIC)
+        return ImagePipeline(self.cache_dir, widths).process(
+            jobs, self.dest_dir, manifest, workers=workers
+        )
+
+    def cached_files(self):
+        return sorted(
+            name
+            for _, _, names in os.walk(self.cache_dir)
+            for name in names
+            if name != "index.json"
+        )
+
+    def test_variants_are_made_for_wide_images(self):
+        image_set = self.process()
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.dest_dir, "images", "_variants"))),
+            ["wide-10w.png", "wide-20w.png"],
+        )
+        wide = image_set.get("/images/wide.png")
+        self.assertEqual((wide.width, wide.height), (40, 20))
+        self.assertEqual(
+            wide.variants,
+            [
+                (10, "/images/_variants/wide-10w.png"),
+                (20, "/images/_variants/wide-20w.png"),
+            ],
+        )
+        small = image_set.get("/images/small.png")
+        self.assertEqual((small.width, small.variants), (8, []))
+        # Only static/images is processed, and undecodable files are skipped
+        self.assertIsNone(image_set.get("/logo.png"))
+        self.assertIsNone(image_set.get("/images/broken.png"))
+
+    def test_unchanged_images_are_not_decoded_again(self):
+        first = self.process()
+        with unittest.mock.patch.object(images, "decode_png") as decode_png:
+            with unittest.mock.patch.object(images, "hash_file") as hash_file:
+                second = self.process()
+        decode_png.assert_not_called()
+        hash_file.assert_not_called()
+        self.assertEqual(first.fingerprint, second.fingerprint)
+
+    def test_worker_processes_make_the_same_variants(self):
+        self.write("images/other.png", make_image(30, 10))
+        image_set = self.process(workers=2)
+        self.assertEqual(
+            image_set.get("/images/other.png").variants,
+            [
+                (10, "/images/_variants/other-10w.png"),
+                (20, "/images/_variants/other-20w.png"),
+            ],
+        )
+        self.assertIsNone(image_set.get("/images/broken.png"))
+        path = os.path.join(self.dest_dir, "images", "_variants", "other-20w.png")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(24)[16:24], bytes([0, 0, 0, 20, 0, 0, 0, 7]))
+
+    def test_cache_of_edited_and_removed_images_is_pruned(self):
+        self.process()
+        before = self.cached_files()
+        # wide: info and two variants; small: info only
+        self.assertEqual(len(before), 4)
+        self.write("images/wide.png", make_image(30, 20))
+        os.remove(os.path.join(self.static_dir, "images", "small.png"))
+        self.process()
+        after = self.cached_files()
+        self.assertEqual(len(after), 3)
+        self.assertFalse(set(before) & set(after))
+
+    def test_stale_variants_are_removed(self):
+        manifest = BuildManifest(self.dest_dir)
+        self.process(manifest=manifest)
+        self.assertEqual(
+            manifest.variants,
+            ["images/_variants/wide-10w.png", "images/_variants/wide-20w.png"],
+        )
+        self.process(widths=(10,), manifest=manifest)
+        self.assertEqual(manifest.variants, ["images/_variants/wide-10w.png"])
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.dest_dir, "images", "_variants", "wide-20w.png")
+            )
+        )
+
+    def test_static_file_in_the_way_of_a_variant_is_kept(self):
+        manifest = BuildManifest(self.dest_dir)
+        self.process(manifest=manifest)
+        # A real file at a variant's path, synced from static/ like any other
+        os.makedirs(os.path.join(self.static_dir, "images", "_variants"))
+        self.write("images/_variants/wide-10w.png", b"mine")
+        with open(
+            os.path.join(self.dest_dir, "images", "_variants", "wide-10w.png"), "wb"
+        ) as f:
+            f.write(b"mine")
+        image_set = self.process(manifest=manifest)
+        self.assertEqual(
+            image_set.get("/images/wide.png").variants,
+            [(20, "/images/_variants/wide-20w.png")],
+        )
+        self.assertEqual(manifest.variants, ["images/_variants/wide-20w.png"])
+        path = os.path.join(self.dest_dir, "images", "_variants", "wide-10w.png")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"mine")
+
+    def test_copied_variants_are_not_compared_byte_by_byte(self):
+        jobs, _ = scan_tree(self.static_dir, self.dest_dir, STATIC)
+        pipeline = ImagePipeline(self.cache_dir, (10,))
+        pipeline.process(jobs, self.dest_dir, link=False)
+        dest_path = os.path.join(self.dest_dir, "images", "_variants", "wide-10w.png")
+        before = os.stat(dest_path)
+        with unittest.mock.patch("filecmp.cmp", side_effect=AssertionError):
+            with unittest.mock.patch.object(images, "place_file") as place_file:
+                pipeline.process(jobs, self.dest_dir, link=False)
+        place_file.assert_not_called()
+        self.assertEqual(os.stat(dest_path).st_ino, before.st_ino)
+
+        # A copy that no longer matches the cached variant is replaced
+        os.utime(dest_path, ns=(0, 0))
+        pipeline.process(jobs, self.dest_dir, link=False)
+        self.assertNotEqual(os.stat(dest_path).st_mtime_ns, 0)
+
+    def test_image_change_regenerates_pages(self):
+        content_dir = os.path.join(self.temp_dir, "content")
+        os.makedirs(content_dir)
+        with open(os.path.join(content_dir, "index.md"), "w") as f:
+            f.write("# Home\n\n![Wide](/images/wide.png)")
+        template = CompiledTemplate("{{ Title }}|{{ Content }}")
+        manifest = BuildManifest(self.dest_dir)
+        dest_path = os.path.join(self.dest_dir, "index.html")
+        pages = [(os.path.join(content_dir, "index.md"), dest_path)]
+
+        generate_pages(pages, template, "/", manifest, images=self.process())
+        with unittest.mock.patch("generate_page.generate_page") as generate_page:
+            generate_pages(pages, template, "/", manifest, images=self.process())
+        generate_page.assert_not_called()
+
+        self.write("images/wide.png", make_image(60, 20))
+        generate_pages(pages, template, "/", manifest, images=self.process())
+        with open(dest_path) as f:
+            self.assertIn('width="60" height="20"', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from block_markdown import inline_cache_info, text_to_children
+from inline_markdown import text_to_textnodes
+from inline_patterns import (
+    LINK_PATTERN,
+    inline_syntaxes,
+    register_inline_syntax,
+    syntax_fingerprint,
+    token_pattern,
+    unregister_inline_syntax,
+)
+from parse_cache import ParseCache
+from textnode import TextNode, TextType
+
+
+def autolink_node(match):
+    url = match.group("autolink_url")
+    return TextNode(url, TextType.LINK, url)
+
+
+class TestInlinePatterns(unittest.TestCase):
+    def tearDown(self):
+        if "autolink" in [syntax.name for syntax in inline_syntaxes()]:
+            unregister_inline_syntax("autolink")
+
+    def register_autolink(self):
+        register_inline_syntax(
+            "autolink", r"<(?P<autolink_url>https?://[^<>\s]+)>", autolink_node
+        )
+
+    def test_builtin_syntaxes(self):
+        self.assertEqual([syntax.name for syntax in inline_syntaxes()], ["image", "link"])
+        self.assertEqual(syntax_fingerprint(), "")
+        self.assertEqual(LINK_PATTERN.findall("[a](/b) ![c](/d)"), [("a", "/b")])
+
+    def test_token_pattern_matches_spans_whole(self):
+        match = token_pattern().search("see [a *b* c](/x*y) now")
+        self.assertEqual(match.lastgroup, "link")
+        self.assertEqual(match.group("link_text", "link_url"), ("a *b* c", "/x*y"))
+        self.assertIsNone(token_pattern().search("[a **b**](/x)").group("link"))
+
+    def test_registered_syntax_in_both_parsers(self):
+        self.register_autolink()
+        text = "Go to <https://example.com> or [home](/) **now**"
+        expected = [
+            TextNode("Go to ", TextType.TEXT),
+            TextNode("https://example.com", TextType.LINK, "https://example.com"),
+            TextNode(" or ", TextType.TEXT),
+            TextNode("home", TextType.LINK, "/"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("now", TextType.BOLD),
+        ]
+        for parser in ("split", "scan"):
+            with self.subTest(parser=parser):
+                self.assertEqual(text_to_textnodes(text, parser), expected)
+
+        unregister_inline_syntax("autolink")
+        self.assertEqual(
+            text_to_textnodes("<https://example.com>", "scan"),
+            [TextNode("<https://example.com>", TextType.TEXT)],
+        )
+
+    def test_registration_clears_inline_cache(self):
+        text_to_children("<https://example.com>")
+        self.assertGreater(inline_cache_info().currsize, 0)
+        self.register_autolink()
+        self.assertEqual(inline_cache_info().currsize, 0)
+        self.assertEqual(text_to_children("<https://example.com>")[0].tag, "a")
+
+    def test_registration_changes_parse_cache_key(self):
+        cache = ParseCache("unused")
+        key = cache.key("# Title")
+        self.register_autolink()
+        self.assertNotEqual(syntax_fingerprint(), "")
+        self.assertNotEqual(cache.key("# Title"), key)
+        unregister_inline_syntax("autolink")
+        self.assertEqual(cache.key("# Title"), key)
+
+    def test_invalid_registrations(self):
+        self.register_autolink()
+        with self.assertRaises(ValueError):
+            self.register_autolink()
+        with self.assertRaises(ValueError):
+            register_inline_syntax("bold", r"~~", autolink_node)
+        with self.assertRaises(ValueError):
+            # Group names must stay unique across syntaxes
+            register_inline_syntax("broken", r"(?P<link_url>x)", autolink_node)
+        self.assertEqual(
+            [syntax.name for syntax in inline_syntaxes()], ["image", "link", "autolink"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
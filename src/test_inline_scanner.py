@@ -0,0 +1,98 @@
+import random
+import unittest
+
+from inline_markdown import get_inline_parser, set_inline_parser, text_to_textnodes
+from inline_scanner import scan_inline
+from textnode import TextNode, TextType
+
+
+class TestScanInline(unittest.TestCase):
+    def test_mixed_inline_markdown(self):
+        text = (
+            "This is **text** with an _italic_ word and a `code block` and an "
+            "![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a "
+            "[link](https://boot.dev)"
+        )
+        self.assertListEqual(
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode(
+                    "obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"
+                ),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+            scan_inline(text),
+        )
+
+    def test_plain_and_empty_text(self):
+        self.assertListEqual([TextNode("plain", TextType.TEXT)], scan_inline("plain"))
+        self.assertListEqual([], scan_inline(""))
+
+    def test_delimiters_inside_bold_are_literal(self):
+        self.assertListEqual(
+            [TextNode("a _b_ `c`", TextType.BOLD)], scan_inline("**a _b_ `c`**")
+        )
+
+    def test_empty_delimiters_are_dropped(self):
+        self.assertListEqual(
+            [TextNode("a", TextType.TEXT), TextNode("b", TextType.TEXT)],
+            scan_inline("a****b"),
+        )
+
+    def test_underscore_in_link_url_splits_like_split_path(self):
+        text = "[a](c_d) and e_f"
+        self.assertListEqual(text_to_textnodes(text, "split"), scan_inline(text))
+
+    def test_unmatched_delimiter_errors_match_split_path(self):
+        for text in ["**bold", "_a **b** c_", "`a _b_ c`", "`code", "a _b"]:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError) as split_error:
+                    text_to_textnodes(text, "split")
+                with self.assertRaises(ValueError) as scan_error:
+                    scan_inline(text)
+                self.assertEqual(str(split_error.exception), str(scan_error.exception))
+
+    def test_matches_split_path_on_random_input(self):
+        pieces = ["a", " ", "**", "_", "`", "![x](u)", "[y](v)", "!", "[", "]",
+                  "(", ")", "*", "![p_q](r)", "[s](t_u)"]
+        rnd = random.Random(5)
+        for _ in range(2000):
+            text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 10)))
+            try:
+                expected = text_to_textnodes(text, "split")
+            except ValueError as error:
+                with self.assertRaises(ValueError) as context:
+                    scan_inline(text)
+                self.assertEqual(str(error), str(context.exception))
+                continue
+            self.assertListEqual(expected, scan_inline(text), text)
+
+
+class TestInlineParserFlag(unittest.TestCase):
+    def tearDown(self):
+        set_inline_parser("split")
+
+    def test_default_parser(self):
+        self.assertEqual(get_inline_parser(), "split")
+
+    def test_set_inline_parser(self):
+        set_inline_parser("scan")
+        self.assertEqual(get_inline_parser(), "scan")
+        self.assertListEqual(
+            [TextNode("x", TextType.BOLD)], text_to_textnodes("**x**")
+        )
+
+    def test_unknown_parser(self):
+        with self.assertRaises(ValueError):
+            set_inline_parser("regex")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,11 @@ class TestLeafNode(unittest.TestCase):
         node = LeafNode("p", "Test")
         self.assertIsNone(node.children)
 
+    def test_leaf_to_html_chunks(self):
+        node = LeafNode("a", "link", {"href": "/x"})
+        self.assertEqual(list(node.to_html_chunks()), ['<a href="/x">link</a>'])
+        self.assertEqual(list(LeafNode(None, "raw").to_html_chunks()), ["raw"])
+
 
 if __name__ == "__main__":
     unittest.main()
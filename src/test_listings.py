@@ -0,0 +1,215 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from build_plan import PAGE, scan_tree
+from listings import (
+    Listing,
+    blog_posts,
+    generate_listings,
+    paginate,
+    plan_listings,
+    tag_slug,
+)
+from manifest import BuildManifest
+from metadata_index import MetadataIndex
+from template import TemplateSet
+
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.template_path = os.path.join(self.temp_dir, "template.html")
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.post("tom", "2024-03-01", "[tolkien, Middle Earth]")
+        self.post("glorfindel", "2023-05-01", "[tolkien]")
+        self.post("majesty", "2024-01-01", "[tolkien]", draft=True)
+        self.post("undated", None, "[]")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home")
+        self.write(os.path.join(self.content_dir, "blog", "notes.md"), "# Notes")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def post(self, slug, date, tags, draft=False):
+        lines = ["---", f"tags: {tags}"]
+        if date:
+            lines.append(f"date: {date}")
+        if draft:
+            lines.append("draft: true")
+        lines += ["---", f"# Post {slug}", "", "Body"]
+        self.write(
+            os.path.join(self.content_dir, "blog", slug, "index.md"), "\n".join(lines)
+        )
+
+    def index(self):
+        index = MetadataIndex(self.content_dir)
+        pages, _ = scan_tree(self.content_dir, self.dest_dir, PAGE)
+        index.update(pages)
+        return index
+
+    def build(self, page_size=10):
+        manifest = BuildManifest.load(self.dest_dir)
+        generated = generate_listings(
+            self.index(),
+            TemplateSet(self.template_path, content_dir=self.content_dir),
+            self.dest_dir,
+            "/repo/",
+            manifest,
+            page_size,
+        )
+        manifest.save()
+        return generated
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest_dir, *parts)) as f:
+            return f.read()
+
+    def test_blog_posts(self):
+        posts = blog_posts(self.index())
+        self.assertEqual(
+            [key for key, _ in posts],
+            [
+                "blog/tom/index.html",
+                "blog/glorfindel/index.html",
+                "blog/undated/index.html",
+            ],
+        )
+        with_drafts = blog_posts(self.index(), drafts=True)
+        self.assertEqual(with_drafts[1][0], "blog/majesty/index.html")
+
+    def test_paginate(self):
+        posts = [(f"blog/{n}/index.html", {"title": str(n)}) for n in range(5)]
+        pages = paginate("blog", "Blog", posts, 2)
+        self.assertEqual(
+            [(page.key, page.newer, page.older) for page in pages],
+            [
+                ("blog/index.html", None, "blog/page/2/index.html"),
+                ("blog/page/2/index.html", "blog/index.html", "blog/page/3/index.html"),
+                ("blog/page/3/index.html", "blog/page/2/index.html", None),
+            ],
+        )
+        self.assertEqual(
+            pages[1].to_node().to_html(),
+            "<div><h1>Blog (page 2 of 3)</h1><ul>"
+            '<li><a href="/blog/2/">2</a></li><li><a href="/blog/3/">3</a></li></ul>'
+            '<p><a href="/blog/">Newer posts</a> <a href="/blog/page/3/">Older posts</a>'
+            "</p></div>",
+        )
+        self.assertEqual(paginate("blog", "Blog", [], 2), [])
+
+    def test_plan_listings(self):
+        listings = plan_listings(blog_posts(self.index()))
+        self.assertEqual(
+            [listing.key for listing in listings],
+            [
+                "blog/index.html",
+                "blog/tags/middle-earth/index.html",
+                "blog/tags/tolkien/index.html",
+            ],
+        )
+        self.assertEqual(listings[1].title, 'Posts tagged "Middle Earth"')
+        self.assertEqual(tag_slug(" C++ & Rust "), "c-rust")
+        self.assertEqual(
+            Listing("blog/tags/a/index.html", "", []).source_key(),
+            "blog/tags/a/index.md",
+        )
+
+    def test_listing_pages_use_the_page_pipeline(self):
+        self.build()
+        self.assertEqual(
+            self.read("blog", "tags", "tolkien", "index.html"),
+            '<title>Posts tagged "tolkien"</title><div><h1>Posts tagged "tolkien"</h1>'
+            '<ul><li><a href="/repo/blog/tom/">Post tom</a> (2024-03-01)</li>'
+            '<li><a href="/repo/blog/glorfindel/">Post glorfindel</a> (2023-05-01)'
+            "</li></ul></div>",
+        )
+
+    def test_only_affected_listings_are_regenerated(self):
+        self.assertEqual(
+            self.build(),
+            [
+                "blog/index.html",
+                "blog/tags/middle-earth/index.html",
+                "blog/tags/tolkien/index.html",
+            ],
+        )
+        self.assertEqual(self.build(), [])
+
+        # A body edit changes nothing listed
+        path = os.path.join(self.content_dir, "blog", "tom", "index.md")
+        with open(path) as f:
+            source = f.read()
+        self.write(path, source + "\n\nMore body")
+        self.assertEqual(self.build(), [])
+
+        # A new title shows on the archive and its tag, not on other tags
+        self.post("glorfindel", "2023-05-01", "[tolkien, elves]")
+        self.assertEqual(self.build(), ["blog/tags/elves/index.html"])
+        self.write(path, source.replace("# Post tom", "# Tom") + "\n\nMore body")
+        self.assertEqual(
+            self.build(),
+            [
+                "blog/index.html",
+                "blog/tags/middle-earth/index.html",
+                "blog/tags/tolkien/index.html",
+            ],
+        )
+
+        # Dropping the last post of a tag deletes the tag's pages
+        self.post("tom", "2024-03-01", "[tolkien]")
+        self.assertEqual(
+            self.build(), ["blog/index.html", "blog/tags/tolkien/index.html"]
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest_dir, "blog", "tags", "middle-earth"))
+        )
+        self.assertNotIn(
+            "blog/tags/middle-earth/index.html", BuildManifest.load(self.dest_dir).pages
+        )
+
+    def test_pagination_change(self):
+        self.build()
+        self.assertEqual(
+            self.build(page_size=2),
+            ["blog/index.html", "blog/page/2/index.html"],
+        )
+        self.assertIn('href="/repo/blog/page/2/"', self.read("blog", "index.html"))
+
+    def test_titles_and_tags_are_not_parsed_as_markdown(self):
+        self.write(
+            os.path.join(self.content_dir, "blog", "tom", "index.md"),
+            "---\ntitle: Using snake_case and **bold** <names>\n"
+            "tags: [c_sharp, **strong**]\ndate: 2024-03-01\n---\n# Tom",
+        )
+        self.assertIn("blog/tags/c_sharp/index.html", self.build())
+        self.assertIn(
+            '<a href="/repo/blog/tom/">Using snake_case and **bold** &lt;names&gt;</a>',
+            self.read("blog", "index.html"),
+        )
+        self.assertIn(
+            '<h1>Posts tagged "**strong**"</h1>',
+            self.read("blog", "tags", "strong", "index.html"),
+        )
+
+    def test_content_page_takes_precedence(self):
+        self.write(os.path.join(self.content_dir, "blog", "index.md"), "# My Blog")
+        self.assertNotIn("blog/index.html", self.build())
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest_dir, "blog", "index.html"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
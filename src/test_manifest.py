@@ -0,0 +1,305 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import generate_page
+from collectors import PageSummary
+from generate_page import generate_pages_recursive
+
+real_generate_page = generate_page.generate_page
+from template import TemplateSet
+from manifest import (
+    BuildManifest,
+    MANIFEST_FILENAME,
+    atomic_write,
+    hash_file,
+    write_chunks_if_changed,
+    write_if_changed,
+)
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.template_path = os.path.join(self.temp_dir, "template.html")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        self.write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home")
+        self.write(os.path.join(self.content_dir, "blog", "post.md"), "# Post")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def build(self, basepath="/", template=None):
+        manifest = BuildManifest.load(self.dest_dir)
+        generate_pages_recursive(
+            self.content_dir,
+            template or self.template_path,
+            self.dest_dir,
+            basepath,
+            manifest,
+        )
+        removed = manifest.prune()
+        manifest.save()
+        return removed
+
+    def mtimes(self):
+        return {
+            name: os.stat(os.path.join(self.dest_dir, name)).st_mtime_ns
+            for name in ("index.html", os.path.join("blog", "post.html"))
+        }
+
+    def test_hash_file(self):
+        path = os.path.join(self.temp_dir, "a.txt")
+        self.write(path, "abc")
+        self.assertEqual(
+            hash_file(path),
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad",
+        )
+
+    def test_load_missing_manifest_is_empty(self):
+        manifest = BuildManifest.load(self.dest_dir)
+        self.assertEqual(manifest.pages, {})
+
+    def test_load_corrupt_manifest_is_empty(self):
+        os.makedirs(self.dest_dir)
+        self.write(os.path.join(self.dest_dir, MANIFEST_FILENAME), "{not json")
+        self.assertEqual(BuildManifest.load(self.dest_dir).pages, {})
+
+    def test_first_build_records_every_page(self):
+        self.build()
+        manifest = BuildManifest.load(self.dest_dir)
+        self.assertEqual(sorted(manifest.pages), ["blog/post.html", "index.html"])
+        entry = manifest.pages["index.html"]
+        self.assertEqual(entry["basepath"], "/")
+        self.assertEqual(entry["template_hash"], hash_file(self.template_path))
+        # Sources are relative to the output root, so docs/ can be committed
+        self.assertEqual(entry["source"], "../content/index.md")
+        self.assertEqual(
+            manifest.source("index.html"),
+            os.path.join(self.content_dir, "index.md"),
+        )
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        before = self.mtimes()
+        os.utime(os.path.join(self.dest_dir, "index.html"), ns=(0, 0))
+        self.build()
+        after = self.mtimes()
+        self.assertEqual(after["index.html"], 0)
+        self.assertEqual(
+            before[os.path.join("blog", "post.html")],
+            after[os.path.join("blog", "post.html")],
+        )
+
+    def test_unchanged_source_is_not_rehashed(self):
+        self.build()
+        entry = BuildManifest.load(self.dest_dir).pages["index.html"]
+        source = os.path.join(self.content_dir, "index.md")
+        self.assertEqual(entry["source_mtime_ns"], os.stat(source).st_mtime_ns)
+        self.assertEqual(entry["source_size"], os.stat(source).st_size)
+
+        with unittest.mock.patch("generate_page.hash_file") as hash_file_mock:
+            self.build()
+        hash_file_mock.assert_not_called()
+
+        # A touched source is hashed again, is still fresh, and its new
+        # mtime is stored for the next build
+        stat = os.stat(source)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        before = self.mtimes()
+        self.build()
+        self.assertEqual(self.mtimes(), before)
+        self.assertEqual(
+            BuildManifest.load(self.dest_dir).pages["index.html"]["source_mtime_ns"],
+            stat.st_mtime_ns + 10**9,
+        )
+
+    def test_changed_source_is_regenerated(self):
+        self.build()
+        self.write(os.path.join(self.content_dir, "index.md"), "# New Home")
+        self.build()
+        with open(os.path.join(self.dest_dir, "index.html")) as f:
+            self.assertIn("<title>New Home</title>", f.read())
+
+    def test_template_change_regenerates_all_pages(self):
+        self.build()
+        self.write(self.template_path, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.build()
+        with open(os.path.join(self.dest_dir, "blog", "post.html")) as f:
+            self.assertIn("<h2>Post</h2>", f.read())
+
+    def test_basepath_change_regenerates_pages(self):
+        self.write(os.path.join(self.content_dir, "index.md"), "# Home\n\n[a](/a)")
+        self.build()
+        self.build("/repo/")
+        with open(os.path.join(self.dest_dir, "index.html")) as f:
+            self.assertIn('href="/repo/a"', f.read())
+
+    def generated(self, **patches):
+        # Pages the build regenerates, with module globals of generate_page
+        # patched; identical output is never rewritten, so mtimes cannot tell
+        with unittest.mock.patch.multiple(
+            generate_page, generate_page=unittest.mock.DEFAULT, **patches
+        ) as mocks:
+            mocks["generate_page"].side_effect = real_generate_page
+            self.build()
+        generate = mocks["generate_page"]
+        return sorted(call.args[0] for call in generate.call_args_list)
+
+    def test_parser_change_regenerates_pages(self):
+        self.build()
+        self.assertEqual(self.generated(), [])
+        self.assertEqual(len(self.generated(PARSER_VERSION=999)), 2)
+        self.assertEqual(self.generated(PARSER_VERSION=999), [])
+        self.assertEqual(
+            len(self.generated(PARSER_VERSION=999, get_inline_parser=lambda: "x")), 2
+        )
+        entry = BuildManifest.load(self.dest_dir).pages["index.html"]
+        self.assertEqual(entry["build_version"], "999-x")
+
+    def test_summary_must_match_the_source_hash(self):
+        summaries_path = os.path.join(self.temp_dir, ".cache", "summaries.json")
+        manifest = BuildManifest(self.dest_dir, summaries_path=summaries_path)
+        dest_path = os.path.join(self.dest_dir, "index.html")
+        source_path = os.path.join(self.content_dir, "index.md")
+        summary = PageSummary("Home", [[1, "Home"]], "Home")
+        manifest.record(dest_path, source_path, "a", "t", "/", summary=summary)
+        manifest.save()
+
+        loaded = BuildManifest.load(self.dest_dir, summaries_path)
+        self.assertEqual(loaded.summary(dest_path), summary.to_dict())
+        # Summaries shared with another output directory may not match
+        loaded.pages["index.html"]["source_hash"] = "b"
+        self.assertIsNone(loaded.summary(dest_path))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.dest_dir, "index.html"))
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.dest_dir, "index.html")))
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        shutil.rmtree(os.path.join(self.content_dir, "blog"))
+        removed = self.build()
+        self.assertEqual(removed, ["blog/post.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest_dir, "blog")))
+        self.assertNotIn("blog/post.html", BuildManifest.load(self.dest_dir).pages)
+
+    def test_identical_output_is_not_rewritten(self):
+        self.build()
+        before = self.mtimes()
+        # Without a manifest every page is regenerated, but none is rewritten
+        os.remove(os.path.join(self.dest_dir, MANIFEST_FILENAME))
+        self.build()
+        self.assertEqual(self.mtimes(), before)
+        self.assertEqual(
+            sorted(BuildManifest.load(self.dest_dir).pages),
+            ["blog/post.html", "index.html"],
+        )
+
+    def test_template_change_regenerates_only_dependents(self):
+        templates_dir = os.path.join(self.temp_dir, "templates")
+        blog_template = os.path.join(templates_dir, "blog.html")
+        nav = os.path.join(templates_dir, "partials", "nav.html")
+        os.makedirs(os.path.dirname(nav))
+        self.write(blog_template, "{{> nav }}<h1>{{ Title }}</h1>{{ Content }}")
+        self.write(nav, "<nav>old</nav>")
+
+        def build():
+            self.build(
+                template=TemplateSet(self.template_path, templates_dir, self.content_dir)
+            )
+
+        build()
+        graph = BuildManifest.load(self.dest_dir).graph
+        self.assertEqual(graph.dependents(nav), ["blog/post.html"])
+        self.assertEqual(graph.dependents(self.template_path), ["index.html"])
+        self.assertEqual(graph.changed(), [])
+
+        before = self.mtimes()
+        self.write(nav, "<nav>new</nav>")
+        self.assertEqual(BuildManifest.load(self.dest_dir).graph.changed(), [nav])
+        build()
+        self.assertEqual(self.mtimes()["index.html"], before["index.html"])
+        with open(os.path.join(self.dest_dir, "blog", "post.html")) as f:
+            self.assertTrue(f.read().startswith("<nav>new</nav>"))
+
+        shutil.rmtree(os.path.join(self.content_dir, "blog"))
+        build()
+        graph = BuildManifest.load(self.dest_dir).graph
+        self.assertEqual(graph.dependents(nav), [])
+        self.assertEqual(sorted(graph.files), ["../template.html"])
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "page.html")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_if_changed(self):
+        self.assertTrue(write_if_changed(self.path, b"one"))
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(write_if_changed(self.path, b"one"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertTrue(write_if_changed(self.path, b"two"))
+        self.assertTrue(write_if_changed(self.path, b"three"))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"three")
+        self.assertEqual(os.listdir(self.temp_dir), ["page.html"])
+
+    def test_write_chunks_if_changed_streams(self):
+        def chunks(text):
+            for i, char in enumerate(text):
+                if i:
+                    # Earlier chunks are already in the temporary file
+                    names = os.listdir(self.temp_dir)
+                    self.assertEqual(len([n for n in names if n.endswith(".tmp")]), 1)
+                yield char
+
+        self.assertTrue(write_chunks_if_changed(self.path, chunks("one")))
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(write_chunks_if_changed(self.path, chunks("one")))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertTrue(write_chunks_if_changed(self.path, chunks("onf")))
+        self.assertTrue(write_chunks_if_changed(self.path, chunks("ünë")))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), "ünë".encode("utf-8"))
+        self.assertEqual(os.listdir(self.temp_dir), ["page.html"])
+
+    def test_failed_chunk_keeps_old_file(self):
+        def chunks():
+            yield "new"
+            raise RuntimeError("render failed")
+
+        atomic_write(self.path, b"old")
+        with self.assertRaises(RuntimeError):
+            write_chunks_if_changed(self.path, chunks())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertEqual(os.listdir(self.temp_dir), ["page.html"])
+
+    def test_failed_write_keeps_old_file(self):
+        atomic_write(self.path, b"old")
+        with unittest.mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                atomic_write(self.path, b"new")
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertEqual(os.listdir(self.temp_dir), ["page.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,14 @@
 import unittest
-from block_markdown import markdown_to_html_node, BlockType
+from block_markdown import (
+    INLINE_CACHE_SIZE,
+    markdown_to_html_node,
+    BlockType,
+    clear_inline_cache,
+    inline_cache_info,
+    markdown_to_document,
+    set_inline_cache_size,
+    text_to_children,
+)
 from parentnode import ParentNode
 from leafnode import LeafNode
 
@@ -111,6 +120,18 @@ def hello():
         )
         self.assertEqual(result.to_html(), expected.to_html())
 
+    def test_ordered_list_past_nine_items(self):
+        markdown = "\n".join(f"{i}. Item {i}" for i in range(1, 12))
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertIn("<li>Item 9</li><li>Item 10</li><li>Item 11</li></ol>", html)
+
+    def test_crlf_line_endings(self):
+        markdown = "# Title\n\nSome text\nwrapped\n\n- one\n- two\n"
+        self.assertEqual(
+            markdown_to_html_node(markdown.replace("\n", "\r\n")).to_html(),
+            markdown_to_html_node(markdown).to_html(),
+        )
+
     def test_paragraph_with_inline_formatting(self):
         markdown = "This has **bold** and _italic_ and `code` text."
         result = markdown_to_html_node(markdown)
@@ -170,5 +191,70 @@ print("Hello, world!")
         self.assertEqual(result.to_html(), expected.to_html())
 
 
+class TestInlineCache(unittest.TestCase):
+    def setUp(self):
+        clear_inline_cache()
+
+    def tearDown(self):
+        set_inline_cache_size(INLINE_CACHE_SIZE)
+
+    def test_repeated_spans_hit_cache(self):
+        markdown = "- [Home](/)\n- [Blog](/blog)\n\n- [Home](/)\n- [Blog](/blog)"
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(html.count('<a href="/">Home</a>'), 2)
+        info = inline_cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
+    def test_returns_fresh_list(self):
+        first = text_to_children("some **bold** text")
+        first.append(LeafNode(None, "extra"))
+        second = text_to_children("some **bold** text")
+        self.assertEqual(len(second), 3)
+        self.assertIs(first[0], second[0])
+
+    def test_cache_is_bounded(self):
+        set_inline_cache_size(2)
+        for text in ("a", "b", "c", "a"):
+            text_to_children(text)
+        info = inline_cache_info()
+        self.assertEqual(info.currsize, 2)
+        self.assertEqual((info.hits, info.misses), (0, 4))
+
+    def test_disabled_cache(self):
+        set_inline_cache_size(0)
+        text_to_children("x")
+        text_to_children("x")
+        self.assertEqual(inline_cache_info().hits, 0)
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                text_to_children("**unclosed")
+        self.assertEqual(inline_cache_info().currsize, 0)
+
+
+class TestMarkdownToDocument(unittest.TestCase):
+    def test_title_and_node(self):
+        markdown = "Intro\n\n#   The Title  \n\n## Sub\n\n# Second"
+        document = markdown_to_document(markdown)
+        self.assertEqual(document.title, "The Title")
+        self.assertIs(document.title_node, document.node.children[1])
+        self.assertEqual(document.title_node.to_html(), "<h1>  The Title</h1>")
+        self.assertEqual(
+            document.node.to_html(), markdown_to_html_node(markdown).to_html()
+        )
+
+    def test_title_is_first_line_of_heading_block(self):
+        document = markdown_to_document("# Title\nmore")
+        self.assertEqual(document.title, "Title")
+
+    def test_no_title(self):
+        for markdown in ("## Sub", "#", "```\n# not a title\n```", ""):
+            with self.subTest(markdown=markdown):
+                document = markdown_to_document(markdown)
+                self.assertIsNone(document.title)
+                self.assertIsNone(document.title_node)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import metadata_index
+from build_plan import PAGE, scan_tree
+from metadata_index import MetadataIndex, is_draft
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.index_path = os.path.join(self.temp_dir, ".cache", "metadata.json")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        self.write("index.md", "# Home")
+        self.write("blog/post.md", "---\ntags: [a, b]\ndraft: true\n---\n# Post")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        path = os.path.join(self.content_dir, *path.split("/"))
+        with open(path, "w") as f:
+            f.write(content)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def update(self):
+        index = MetadataIndex.load(self.content_dir, self.index_path)
+        pages, _ = scan_tree(self.content_dir, "docs", PAGE)
+        changed = index.update(pages)
+        index.save()
+        return index, changed
+
+    def test_first_update_reads_every_header(self):
+        index, changed = self.update()
+        self.assertEqual(changed, ["blog/post.md", "index.md"])
+        self.assertEqual(
+            index.pages(),
+            [
+                ("blog/post.md", {"tags": ["a", "b"], "draft": True, "title": "Post"}),
+                ("index.md", {"title": "Home"}),
+            ],
+        )
+        self.assertTrue(is_draft(index.pages()[0][1]))
+
+    def test_unchanged_sources_are_not_read(self):
+        self.update()
+        with unittest.mock.patch.object(metadata_index, "read_header") as read_header:
+            index, changed = self.update()
+        read_header.assert_not_called()
+        self.assertEqual(changed, [])
+        self.assertFalse(index.modified)
+
+    def test_body_edit_is_not_a_metadata_change(self):
+        self.update()
+        self.write("index.md", "# Home\n\nNew text")
+        self.write("blog/post.md", "---\ntags: [a]\n---\n# Post")
+        _, changed = self.update()
+        self.assertEqual(changed, ["blog/post.md"])
+
+    def test_removed_source(self):
+        self.update()
+        os.remove(os.path.join(self.content_dir, "index.md"))
+        index, changed = self.update()
+        self.assertEqual(changed, ["index.md"])
+        self.assertEqual([key for key, _ in index.pages()], ["blog/post.md"])
+
+    def test_get_without_scan(self):
+        index = MetadataIndex(self.content_dir)
+        source = os.path.join(self.content_dir, "index.md")
+        self.assertEqual(index.get((source, "index.html")), {"title": "Home"})
+        index.remove(source)
+        self.assertEqual(index.pages(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
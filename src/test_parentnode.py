@@ -112,6 +112,29 @@ class TestParentNode(unittest.TestCase):
         self.assertIn('href="https://example.com"', result)
         self.assertIn("</article>", result)
 
+    def test_to_html_chunks(self):
+        node = ParentNode(
+            "p", [LeafNode("b", "Bold"), ParentNode("span", [LeafNode(None, "x")])]
+        )
+        chunks = list(node.to_html_chunks())
+        self.assertEqual(
+            chunks, ["<p>", "<b>Bold</b>", "<span>", "x", "</span>", "</p>"]
+        )
+        self.assertEqual("".join(chunks), node.to_html())
+
+    def test_to_html_chunks_is_lazy(self):
+        node = ParentNode("div", [ParentNode(None, [LeafNode(None, "x")])])
+        chunks = node.to_html_chunks()
+        self.assertEqual(next(chunks), "<div>")
+        with self.assertRaises(ValueError):
+            next(chunks)
+
+    def test_to_html_deeply_nested(self):
+        node = LeafNode(None, "x")
+        for _ in range(200):
+            node = ParentNode("span", [node])
+        self.assertEqual(node.to_html(), "<span>" * 200 + "x" + "</span>" * 200)
+
 
 if __name__ == "__main__":
     unittest.main()
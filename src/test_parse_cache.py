@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from block_markdown import PARSER_VERSION
+from collectors import PageSummary
+from parse_cache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(os.path.join(self.temp_dir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_key_tracks_source_and_parser_version(self):
+        key = self.cache.key("# Title")
+        self.assertEqual(key, self.cache.key("# Title"))
+        self.assertNotEqual(key, self.cache.key("# Other"))
+        self.assertTrue(key.endswith(f"-{PARSER_VERSION}"))
+
+    def test_placeholder_character_is_not_cached(self):
+        self.assertIsNone(self.cache.key("# Title\x00"))
+
+    def test_round_trip(self):
+        key = self.cache.key("# Title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", ['<a href="', 'x">x</a>'])
+        self.assertEqual(
+            self.cache.get(key), ("Title", ['<a href="', 'x">x</a>'], None)
+        )
+
+    def test_round_trip_with_summary(self):
+        key = self.cache.key("# Title")
+        summary = PageSummary("Title", [[1, "Title"]], "Title")
+        self.cache.put(key, "Title", ["<h1>Title</h1>"], summary)
+        self.assertEqual(self.cache.get(key), ("Title", ["<h1>Title</h1>"], summary))
+
+    def test_corrupt_entry_is_a_miss(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "Title", ["<h1>Title</h1>"])
+        _, _, path = self.cache.entries()[0]
+        with open(path, "w") as f:
+            f.write("{not json")
+        self.assertIsNone(self.cache.get(key))
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(f"# Page {i}") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, f"Page {i}", ["x" * 100])
+            path = self.cache._path(key)
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        # A hit makes the oldest entry the most recently used
+        self.assertIsNotNone(self.cache.get(keys[0]))
+
+        entry_size = os.path.getsize(self.cache._path(keys[1]))
+        self.cache.max_bytes = entry_size * 2
+        self.assertEqual(self.cache.prune(), (1, 2))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_prune_missing_directory(self):
+        self.assertEqual(self.cache.prune(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
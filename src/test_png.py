@@ -0,0 +1,133 @@
+import struct
+import unittest
+import zlib
+
+from png import (
+    PngImage,
+    decode_png,
+    drop_opaque_alpha,
+    encode_png,
+    read_png_size,
+    resize,
+)
+
+
+def _chunk(kind, body):
+    return (
+        struct.pack(">I", len(body))
+        + kind
+        + body
+        + struct.pack(">I", zlib.crc32(kind + body))
+    )
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _filter_row(kind, row, prev, bpp):
+    # Straightforward reference filters, to check the decoder against
+    out = bytearray()
+    for i, value in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        predictor = [0, a, b, (a + b) // 2, _paeth(a, b, c)][kind]
+        out.append((value - predictor) & 0xFF)
+    return out
+
+
+def make_png(width, height, color_type, rows, filters, extra=b"", depth=8):
+    bpp = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+    raw = bytearray()
+    prev = bytes(width * bpp)
+    for kind, row in zip(filters, rows):
+        raw.append(kind)
+        raw += _filter_row(kind, row, prev, bpp)
+        prev = row
+    header = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _chunk(b"IHDR", header)
+        + extra
+        + _chunk(b"IDAT", zlib.compress(bytes(raw)))
+        + _chunk(b"IEND", b"")
+    )
+
+
+class TestDecodePng(unittest.TestCase):
+    def test_every_filter_type(self):
+        rows = [bytes((x * 37 + y * 91) % 256 for x in range(12)) for y in range(5)]
+        data = make_png(4, 5, 2, rows, [0, 1, 2, 3, 4])
+        image = decode_png(data)
+        self.assertEqual((image.width, image.height, image.channels), (4, 5, 3))
+        self.assertEqual(bytes(image.pixels), b"".join(rows))
+
+    def test_palette_with_transparency(self):
+        palette = _chunk(b"PLTE", bytes([255, 0, 0, 0, 0, 255]))
+        transparency = _chunk(b"tRNS", bytes([0]))
+        data = make_png(2, 1, 3, [bytes([0, 1])], [0], palette + transparency)
+        image = decode_png(data)
+        self.assertEqual(image.channels, 4)
+        self.assertEqual(bytes(image.pixels), bytes([255, 0, 0, 0, 0, 0, 255, 255]))
+
+    def test_unsupported_bit_depth(self):
+        data = make_png(1, 1, 0, [bytes(1)], [0], depth=16)
+        with self.assertRaises(ValueError):
+            decode_png(data)
+
+    def test_not_a_png(self):
+        with self.assertRaises(ValueError):
+            decode_png(b"GIF89a")
+        with self.assertRaises(ValueError):
+            read_png_size(b"GIF89a")
+
+    def test_read_png_size(self):
+        data = make_png(3, 2, 0, [bytes(3), bytes(3)], [0, 0])
+        self.assertEqual(read_png_size(data[:24]), (3, 2))
+
+
+class TestEncodePng(unittest.TestCase):
+    def test_round_trip(self):
+        for channels in (1, 2, 3, 4):
+            pixels = bytearray((i * 7) % 256 for i in range(6 * 4 * channels))
+            image = PngImage(6, 4, channels, pixels)
+            decoded = decode_png(encode_png(image))
+            self.assertEqual(decoded.channels, channels)
+            self.assertEqual(decoded.pixels, pixels)
+
+    def test_drop_opaque_alpha(self):
+        opaque = PngImage(2, 1, 4, bytearray([1, 2, 3, 255, 4, 5, 6, 255]))
+        stripped = drop_opaque_alpha(opaque)
+        self.assertEqual(stripped.channels, 3)
+        self.assertEqual(stripped.pixels, bytearray([1, 2, 3, 4, 5, 6]))
+
+        translucent = PngImage(1, 1, 4, bytearray([1, 2, 3, 128]))
+        self.assertIs(drop_opaque_alpha(translucent), translucent)
+
+
+class TestResize(unittest.TestCase):
+    def test_box_average(self):
+        image = PngImage(4, 2, 1, bytearray([0, 10, 20, 30, 40, 50, 60, 70]))
+        half = resize(image, 2)
+        self.assertEqual((half.width, half.height), (2, 1))
+        # (0 + 10 + 40 + 50) / 4 and (20 + 30 + 60 + 70) / 4
+        self.assertEqual(half.pixels, bytearray([25, 45]))
+
+    def test_keeps_aspect_ratio(self):
+        image = PngImage(100, 50, 3, bytearray(100 * 50 * 3))
+        scaled = resize(image, 30)
+        self.assertEqual((scaled.width, scaled.height), (30, 15))
+        self.assertEqual(len(scaled.pixels), 30 * 15 * 3)
+
+    def test_cannot_enlarge(self):
+        with self.assertRaises(ValueError):
+            resize(PngImage(2, 2, 1, bytearray(4)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from generate_page import collect_pages, generate_pages
+from profiling import PAGE_STAGES, BuildProfiler, PageTimings
+
+
+class TestPageTimings(unittest.TestCase):
+    def test_stage_accumulates(self):
+        timings = PageTimings("a.md")
+        with timings.stage("parse"):
+            pass
+        with timings.stage("parse"):
+            pass
+        self.assertGreater(timings.stages["parse"], 0)
+        self.assertEqual(timings.stages["read"], 0)
+        self.assertEqual(timings.total, sum(timings.stages.values()))
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        self.template_path = os.path.join(self.temp_dir, "template.html")
+        os.makedirs(os.path.join(self.content_dir, "blog"))
+        with open(self.template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        for rel_path in ("index.md", os.path.join("blog", "post.md")):
+            with open(os.path.join(self.content_dir, rel_path), "w") as f:
+                f.write("# Title\n\nSome **bold** text")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_slowest_and_totals(self):
+        profiler = BuildProfiler(top=1)
+        for page, seconds in (("a.md", 0.5), ("b.md", 2.0), ("c.md", 1.0)):
+            timings = PageTimings(page)
+            timings.stages["parse"] = seconds
+            profiler.add(timings)
+        self.assertEqual([t.page for t in profiler.slowest()], ["b.md"])
+        self.assertEqual(profiler.totals()["parse"], 3.5)
+        summary = profiler.summary()
+        self.assertIn("Profiled 3 page(s)", summary)
+        self.assertIn("b.md", summary)
+        self.assertNotIn("c.md", summary)
+
+    def test_profiled_build_records_every_stage(self):
+        profiler = BuildProfiler()
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        generate_pages(pages, self.template_path, profiler=profiler)
+        self.assertEqual(len(profiler.pages), 2)
+        for timings in profiler.pages:
+            for stage in PAGE_STAGES:
+                self.assertGreater(timings.stages[stage], 0, stage)
+        with open(os.path.join(self.dest_dir, "index.html")) as f:
+            self.assertEqual(
+                f.read(), "<title>Title</title><div><h1>Title</h1>"
+                "<p>Some <b>bold</b> text</p></div>"
+            )
+
+    def test_parallel_build_returns_timings(self):
+        profiler = BuildProfiler()
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        generate_pages(pages, self.template_path, jobs=2, profiler=profiler)
+        self.assertEqual(
+            [t.page for t in profiler.pages], [source for source, _ in pages]
+        )
+        self.assertTrue(all(t.total > 0 for t in profiler.pages))
+
+    def test_cprofile_dump_for_matching_pages(self):
+        profile_dir = os.path.join(self.temp_dir, "profiles")
+        profiler = BuildProfiler(cprofile_glob="*/blog/*", cprofile_dir=profile_dir)
+        pages = collect_pages(self.content_dir, self.dest_dir)
+        generate_pages(pages, self.template_path, profiler=profiler)
+        dumps = os.listdir(profile_dir)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].endswith("blog__post.md.prof"))
+        pstats.Stats(os.path.join(profile_dir, dumps[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+import main
+from generate_page import BuildError, generate_pages_recursive
+from images import ImageInfo, ImageSet
+from sitebuild import (
+    DictSource,
+    DirectorySource,
+    ZipSource,
+    build_site,
+    open_source,
+    page_output_path,
+    write_site,
+)
+from template import CompiledTemplate, TemplateSet
+
+TEMPLATE = CompiledTemplate('<title>{{ Title }}</title><a href="/">{{ Content }}</a>')
+PAGES = {
+    "index.md": "# Home\n\n[Post](/blog/post.html)",
+    "blog/post.md": b"# Post\n\nText",
+    "images/logo.png": b"\x89PNG",
+}
+BLOG_POST = """---
+title: snake_case names
+date: 2024-03-01
+tags: [Middle Earth]
+---
+# Tom Bombadil
+"""
+
+
+class TestSiteBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_page_output_path(self):
+        self.assertEqual(page_output_path("index.md"), "index.html")
+        self.assertEqual(page_output_path("blog/post.md"), "blog/post.html")
+
+    def test_build_from_dict(self):
+        site = dict(build_site(PAGES, TEMPLATE, "/repo/"))
+        self.assertEqual(sorted(site), ["blog/post.html", "index.html"])
+        self.assertEqual(
+            site["index.html"],
+            '<title>Home</title><a href="/repo/"><div><h1>Home</h1>'
+            '<p><a href="/repo/blog/post.html">Post</a></p></div></a>',
+        )
+
+    def test_build_from_zip(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for path, markdown in PAGES.items():
+                archive.writestr("site/content/" + path, markdown)
+            archive.writestr("README.md", "# Not content")
+        source = ZipSource(buffer, root="site/content")
+        self.assertEqual(source.paths(), ["blog/post.md", "index.md"])
+        self.assertEqual(dict(build_site(source, TEMPLATE)), dict(build_site(PAGES, TEMPLATE)))
+
+    def test_directory_matches_build_on_disk(self):
+        content_dir = os.path.join(self.temp_dir, "content")
+        dest_dir = os.path.join(self.temp_dir, "docs")
+        write_site(
+            ((path, markdown if isinstance(markdown, str) else markdown.decode())
+             for path, markdown in PAGES.items() if path.endswith(".md")),
+            content_dir,
+        )
+        generate_pages_recursive(content_dir, TEMPLATE, dest_dir, "/repo/")
+        site = dict(build_site(content_dir, TEMPLATE, "/repo/"))
+        self.assertIsInstance(open_source(content_dir), DirectorySource)
+        for path, html in site.items():
+            with open(os.path.join(dest_dir, *path.split("/"))) as f:
+                self.assertEqual(f.read(), html)
+
+    def test_site_matches_cli_build(self):
+        content_dir = os.path.join(self.temp_dir, "content")
+        write_site(
+            [
+                ("index.md", "# Home\n\n[Blog](/blog/)"),
+                ("blog/tom/index.md", BLOG_POST),
+                ("blog/ents/index.md", "---\ndate: 2024-01-05\n---\n# Ents"),
+                ("blog/draft/index.md", "---\ndraft: true\n---\n# Draft"),
+            ],
+            content_dir,
+        )
+        write_site(
+            [
+                ("template.html", "<title>{{ Title }}</title>{{ Content }}"),
+                ("templates/blog.html", '<a href="/">Blog</a>{{ Content }}'),
+                ("static/index.css", "body {}"),
+            ],
+            self.temp_dir,
+        )
+        main.main(["/repo/", "--page-size", "1"], project_root=self.temp_dir)
+
+        templates = TemplateSet(
+            os.path.join(self.temp_dir, "template.html"),
+            os.path.join(self.temp_dir, "templates"),
+            content_dir,
+            "/repo/",
+        )
+        site = dict(build_site(content_dir, templates, "/repo/", page_size=1))
+        self.assertIn("blog/index.html", site)
+        self.assertIn("blog/page/2/index.html", site)
+        self.assertIn("blog/tags/middle-earth/index.html", site)
+        dest_dir = os.path.join(self.temp_dir, "docs")
+        built = {}
+        for dir_path, _, names in os.walk(dest_dir):
+            for name in names:
+                if name.endswith(".html"):
+                    path = os.path.join(dir_path, name)
+                    with open(path) as f:
+                        key = os.path.relpath(path, dest_dir).replace(os.sep, "/")
+                        built[key] = f.read()
+        self.assertEqual(site, built)
+
+    def test_pages_are_streamed(self):
+        reads = []
+
+        class CountingSource(DictSource):
+            def read(self, path):
+                reads.append(path)
+                return super().read(path)
+
+        pages = build_site(CountingSource(PAGES), TEMPLATE)
+        self.assertEqual(reads, [])
+        self.assertEqual(next(pages)[0], "blog/post.html")
+        self.assertEqual(reads, ["blog/post.md"])
+
+    def test_failed_page_names_its_path(self):
+        pages = build_site({"a.md": "# A", "b.md": "no title"}, TEMPLATE)
+        self.assertEqual(next(pages)[0], "a.html")
+        with self.assertRaises(BuildError) as context:
+            next(pages)
+        self.assertEqual(context.exception.failures[0][0], "b.md")
+
+    def test_drafts(self):
+        pages = dict(PAGES, **{"draft.md": "---\ndraft: true\n---\n# Draft"})
+        self.assertNotIn("draft.html", dict(build_site(pages, TEMPLATE)))
+        self.assertIn("draft.html", dict(build_site(pages, TEMPLATE, drafts=True)))
+
+    def test_images(self):
+        images = ImageSet({"/images/logo.png": ImageInfo(40, 20)})
+        pages = {"index.md": "# Home\n\n![Logo](/images/logo.png)"}
+        site = dict(build_site(pages, TEMPLATE, images=images))
+        self.assertIn('alt="Logo" width="40" height="20"', site["index.html"])
+
+    def test_unsupported_source(self):
+        with self.assertRaises(ValueError):
+            open_source(os.path.join(self.temp_dir, "missing"))
+
+    def test_write_site(self):
+        pages = [("index.html", "<p>home</p>"), ("blog/post.html", "<p>post</p>")]
+        self.assertEqual(write_site(pages, self.temp_dir), (2, 0))
+        self.assertEqual(write_site(pages, self.temp_dir), (0, 2))
+        with open(os.path.join(self.temp_dir, "blog", "post.html")) as f:
+            self.assertEqual(f.read(), "<p>post</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import staging
+from manifest import write_if_changed
+from staging import StagedOutput, link_tree
+
+
+class TestStagedOutput(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dest_dir = os.path.join(self.temp_dir, "docs")
+        os.makedirs(os.path.join(self.dest_dir, "blog"))
+        self.write(os.path.join(self.dest_dir, "index.html"), "home")
+        self.write(os.path.join(self.dest_dir, "blog", "post.html"), "post")
+        self.staged = StagedOutput(self.dest_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def read(self, *parts):
+        with open(os.path.join(*parts)) as f:
+            return f.read()
+
+    def test_link_tree(self):
+        copy = os.path.join(self.temp_dir, "copy")
+        self.assertEqual(link_tree(self.dest_dir, copy), 2)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(copy, "blog", "post.html"),
+                os.path.join(self.dest_dir, "blog", "post.html"),
+            )
+        )
+
+    def test_begin_replaces_leftover_staging(self):
+        os.makedirs(os.path.join(self.staged.staging_dir_path, "stale"))
+        staging_dir = self.staged.begin()
+        self.assertEqual(os.path.dirname(staging_dir), self.temp_dir)
+        self.assertEqual(sorted(os.listdir(staging_dir)), ["blog", "index.html"])
+
+    def test_staged_writes_leave_live_output_alone(self):
+        staging_dir = self.staged.begin()
+        write_if_changed(os.path.join(staging_dir, "index.html"), b"new home")
+        self.assertFalse(
+            write_if_changed(os.path.join(staging_dir, "blog", "post.html"), b"post")
+        )
+        self.assertEqual(self.read(self.dest_dir, "index.html"), "home")
+
+        self.staged.commit()
+        self.assertEqual(self.read(self.dest_dir, "index.html"), "new home")
+        self.assertEqual(self.read(self.dest_dir, "blog", "post.html"), "post")
+        self.assertEqual(os.listdir(self.temp_dir), ["docs"])
+
+    def test_commit_without_exchange(self):
+        staging_dir = self.staged.begin()
+        self.write(os.path.join(staging_dir, "new.html"), "new")
+        with unittest.mock.patch.object(staging, "_exchange", return_value=False):
+            self.staged.commit()
+        self.assertEqual(self.read(self.dest_dir, "new.html"), "new")
+        self.assertEqual(os.listdir(self.temp_dir), ["docs"])
+
+    def test_commit_first_build(self):
+        shutil.rmtree(self.dest_dir)
+        staging_dir = self.staged.begin()
+        self.write(os.path.join(staging_dir, "index.html"), "home")
+        self.staged.commit()
+        self.assertEqual(self.read(self.dest_dir, "index.html"), "home")
+
+    def test_sweep(self):
+        staging_dir = self.staged.begin()
+        self.assertEqual(self.staged.sweep({"index.html"}), ["blog/post.html"])
+        self.assertEqual(os.listdir(staging_dir), ["index.html"])
+
+    def test_abort(self):
+        staging_dir = self.staged.begin()
+        os.remove(os.path.join(staging_dir, "index.html"))
+        self.staged.abort()
+        self.assertFalse(os.path.exists(staging_dir))
+        self.assertEqual(self.read(self.dest_dir, "index.html"), "home")
+
+
+if __name__ == "__main__":
+    unittest.main()
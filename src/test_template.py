@@ -0,0 +1,233 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from leafnode import LeafNode
+from parentnode import ParentNode
+from template import (
+    CompiledTemplate,
+    TemplateSet,
+    apply_basepath,
+    join_links,
+    load_template,
+    load_templates,
+    rebase_links,
+    split_links,
+)
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_split_into_segments_and_slots(self):
+        template = CompiledTemplate("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+
+    def test_render(self):
+        template = CompiledTemplate("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render("Hi", "<p>x</p>"),
+            "<title>Hi</title><main><p>x</p></main>",
+        )
+
+    def test_render_repeated_slot(self):
+        template = CompiledTemplate("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render("A", ""), "A - A")
+
+    def test_render_chunks_streams_content(self):
+        template = CompiledTemplate("<main>{{ Content }}</main>")
+        chunks = list(template.render_chunks("", iter(["<p>", "x", "</p>"])))
+        self.assertEqual(chunks, ["<main>", "<p>", "x", "</p>", "</main>"])
+
+    def test_render_chunks_repeated_content(self):
+        template = CompiledTemplate("{{ Content }}|{{ Content }}")
+        chunks = template.render_chunks("", iter(["a", "b"]))
+        self.assertEqual("".join(chunks), "ab|ab")
+
+    def test_basepath_applied_to_template_links(self):
+        template = CompiledTemplate(
+            '<link href="/index.css"><script src="/app.js"></script>{{ Content }}',
+            "/repo/",
+        )
+        result = template.render("", '<a href="/raw">')
+        self.assertIn('href="/repo/index.css"', result)
+        self.assertIn('src="/repo/app.js"', result)
+        # Slot values are inserted as they are
+        self.assertIn('<a href="/raw">', result)
+
+    def test_hash_tracks_source(self):
+        a = CompiledTemplate("{{ Content }}")
+        b = CompiledTemplate("{{ Content }}", "/repo/")
+        c = CompiledTemplate("<div>{{ Content }}</div>")
+        self.assertEqual(a.hash, b.hash)
+        self.assertNotEqual(a.hash, c.hash)
+
+    def test_load_template(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "template.html")
+            with open(path, "w") as f:
+                f.write('<link href="/a.css">{{ Content }}')
+            template = load_template(path, "/b/")
+            self.assertEqual(template.segments[0], '<link href="/b/a.css">')
+            self.assertIs(load_template(template, "/b/"), template)
+            self.assertEqual(
+                load_template(template, "/").segments[0], '<link href="/a.css">'
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_apply_basepath_default_is_noop(self):
+        html = '<a href="/x">'
+        self.assertIs(apply_basepath(html, "/"), html)
+
+
+class TestRebaseLinks(unittest.TestCase):
+    def test_rebases_href_and_src(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/index.html"}),
+                LeafNode("img", "", {"src": "/images/a.png", "alt": "a"}),
+                LeafNode("a", "ext", {"href": "https://example.com"}),
+            ],
+        )
+        self.assertEqual(
+            rebase_links(node, "/repo/").to_html(),
+            '<p><a href="/repo/index.html">home</a>'
+            '<img src="/repo/images/a.png" alt="a"></img>'
+            '<a href="https://example.com">ext</a></p>',
+        )
+
+    def test_does_not_modify_input(self):
+        link = LeafNode("a", "home", {"href": "/"})
+        text = ParentNode("p", [LeafNode(None, "plain")])
+        node = ParentNode("div", [ParentNode("p", [link]), text])
+        rebased = rebase_links(node, "/repo/")
+        self.assertEqual(link.props, {"href": "/"})
+        self.assertIsNot(rebased, node)
+        self.assertIs(rebased.children[1], text)
+
+    def test_default_basepath_returns_same_tree(self):
+        node = ParentNode("p", [LeafNode("a", "x", {"href": "/a"})])
+        self.assertIs(rebase_links(node, "/"), node)
+
+    def test_text_content_is_not_rebased(self):
+        node = ParentNode("pre", [LeafNode("code", 'href="/not-a-link"')])
+        self.assertEqual(
+            rebase_links(node, "/repo/").to_html(),
+            '<pre><code>href="/not-a-link"</code></pre>',
+        )
+
+
+class TestSplitLinks(unittest.TestCase):
+    def test_join_matches_rebase(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/index.html"}),
+                LeafNode("code", 'href="/not-a-link"'),
+                LeafNode("img", "", {"src": "/a.png", "alt": "a"}),
+                LeafNode("a", "ext", {"href": "https://example.com"}),
+            ],
+        )
+        parts = split_links(node)
+        self.assertEqual(len(parts), 3)
+        for basepath in ("/", "/repo/"):
+            with self.subTest(basepath=basepath):
+                self.assertEqual(
+                    join_links(parts, basepath),
+                    rebase_links(node, basepath).to_html(),
+                )
+
+
+class TestTemplateSet(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.templates_dir = os.path.join(self.temp_dir, "templates")
+        self.content_dir = os.path.join(self.temp_dir, "content")
+        self.default_path = os.path.join(self.temp_dir, "template.html")
+        self.write(self.default_path, "<main>{{ Content }}</main>")
+        self.write(
+            os.path.join(self.templates_dir, "blog.html"),
+            '{{> nav }}<article>{{ Content }}</article>',
+        )
+        self.write(
+            os.path.join(self.templates_dir, "partials", "nav.html"),
+            "<nav>{{> links }}</nav>",
+        )
+        self.write(
+            os.path.join(self.templates_dir, "partials", "links.html"),
+            '<a href="/">Home</a>',
+        )
+        self.templates = TemplateSet(
+            self.default_path, self.templates_dir, self.content_dir, "/repo/"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def source(self, *parts):
+        return os.path.join(self.content_dir, *parts)
+
+    def test_directory_templates(self):
+        blog = self.templates.for_source(self.source("blog", "tom", "index.md"))
+        self.assertEqual(
+            blog.render("", "x"),
+            '<nav><a href="/repo/">Home</a></nav><article>x</article>',
+        )
+        self.assertIs(self.templates.for_page("blog/post.md"), blog)
+        self.assertIs(
+            self.templates.for_source(self.source("index.md")), self.templates.default
+        )
+        self.assertIs(self.templates.for_page("blogs/post.md"), self.templates.default)
+
+    def test_dependencies(self):
+        blog = self.templates.for_page("blog/post.md")
+        partials = os.path.join(self.templates_dir, "partials")
+        self.assertEqual(
+            sorted(blog.dependencies),
+            [
+                os.path.join(self.templates_dir, "blog.html"),
+                os.path.join(partials, "links.html"),
+                os.path.join(partials, "nav.html"),
+            ],
+        )
+        self.assertEqual(list(self.templates.default.dependencies), [self.default_path])
+
+    def test_hash_covers_partials(self):
+        before = self.templates.for_page("blog/post.md").hash
+        self.write(os.path.join(self.templates_dir, "partials", "links.html"), "")
+        after = TemplateSet(self.default_path, self.templates_dir, basepath="/repo/")
+        self.assertNotEqual(after.for_page("blog/post.md").hash, before)
+        self.assertEqual(after.default.hash, self.templates.default.hash)
+
+    def test_named_template(self):
+        template = self.templates.for_page("index.md", "blog")
+        self.assertIs(template, self.templates.for_page("blog/post.md"))
+        with self.assertRaises(ValueError):
+            self.templates.named("missing")
+
+    def test_partial_errors(self):
+        partials = os.path.join(self.templates_dir, "partials")
+        with self.assertRaises(ValueError):
+            CompiledTemplate("{{> missing }}", partials_dir=partials)
+        self.write(os.path.join(partials, "loop.html"), "{{> loop }}")
+        with self.assertRaises(ValueError):
+            CompiledTemplate("{{> loop }}", partials_dir=partials)
+
+    def test_load_templates(self):
+        self.assertIs(load_templates(self.templates, "/repo/"), self.templates)
+        with self.assertRaises(ValueError):
+            load_templates(self.templates, "/")
+        single = load_templates(self.default_path)
+        self.assertIs(single.for_page("blog/post.md"), single.default)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text_type", "text", "url")
+
     def __init__(self, text, text_type: TextType, url=None):
         self.text_type = text_type
         self.text = text